@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.database import get_db
+from app.database import get_write_db
 from app.core.security import (
     create_access_token,
     get_current_user,
@@ -16,7 +16,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 @router.post("/wallet-login", response_model=TokenResponse)
 async def wallet_login(
     wallet_data: WalletLogin,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """Login or register user with wallet (Phantom, etc.)"""
     # Verify signature
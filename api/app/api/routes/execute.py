@@ -3,24 +3,24 @@ from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from uuid import UUID
-from app.database import get_db
+from app.database import get_read_db
 from app.core.security import get_current_user
 from app.core.x402 import generate_x402_response
 from app.core.session import get_session_manager
+from app.core.cache import get_robot_cache
+from app.core.serialization import render
 from app.models.user import User
-from app.models.robot import Robot
 from app.schemas.payment import ExecutePayload, ExecuteResponse
 from app.services.robot_executor import robot_executor
-from sqlalchemy import select
 
 router = APIRouter(prefix="/execute", tags=["Execution"])
 
 
-@router.post("/{robot_id}", response_model=None)
+@router.post("/{robot_id}", response_model=ExecuteResponse, responses={402: {"description": "Payment Required (x402)"}})
 async def execute_robot(
     robot_id: str,
     payload: ExecutePayload,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     x_session_id: Optional[str] = Header(None)
 ):
@@ -28,8 +28,7 @@ async def execute_robot(
     Execute a robot task. Returns 402 Payment Required if payment not completed.
     """
     # Get robot
-    result = await db.execute(select(Robot).where(Robot.id == robot_id))
-    robot = result.scalar_one_or_none()
+    robot = await get_robot_cache().get(robot_id, db)
 
     if not robot:
         raise HTTPException(status_code=404, detail="Robot not found")
@@ -39,57 +38,17 @@ async def execute_robot(
 
     session_manager = get_session_manager()
 
-    # Check if session exists and is paid
-    if x_session_id:
-        session = await session_manager.get_session(x_session_id)
-
-        if session and session.status == "paid":
-            # Verify session belongs to this user and robot
-            if str(session.user_id) != str(current_user.id):
-                raise HTTPException(status_code=403, detail="Invalid session")
-
-            if str(session.robot_id) != str(robot_id):
-                raise HTTPException(status_code=400, detail="Session does not match robot")
-
-            # Execute the robot (convert IDs to UUID for executor)
-            try:
-                result = await robot_executor.execute(
-                    robot_id=UUID(robot_id),
-                    user_id=UUID(str(current_user.id)),
-                    session_id=UUID(session.id),
-                    payload=payload.model_dump(),
-                    db=db
-                )
-            except ValueError as e:
-                raise HTTPException(status_code=400, detail=f"Invalid ID format: {str(e)}")
-
-            return result
-
-    # Check if robot is locked by another user
-    is_locked = await session_manager.is_robot_locked(robot_id)
-    if is_locked:
-        lock_info = await session_manager.get_robot_lock_info(robot_id)
-        ttl = await session_manager.get_robot_ttl(robot_id)
-
-        # If locked by another user, return error
-        if lock_info and str(lock_info.get('user_id')) != str(current_user.id):
-            minutes_remaining = (ttl // 60) if ttl else 0
-            raise HTTPException(
-                status_code=409,
-                detail=f"Robot is currently in use by another user. Try again in {minutes_remaining} minutes."
-            )
-
     # Calculate amount based on rental plan or base price
     amount = float(robot.price)
-    duration_minutes = 10  # Default duration
     if payload.rental_plan_index is not None and robot.rental_plans:
         if 0 <= payload.rental_plan_index < len(robot.rental_plans):
             selected_plan = robot.rental_plans[payload.rental_plan_index]
             amount = float(selected_plan.get('price', robot.price))
-            duration_minutes = selected_plan.get('duration_minutes', 10)
 
-    # No valid paid session - create new session and return 402
-    new_session = await session_manager.create_session(
+    # One atomic Redis call: paid session check, robot lock check and, if
+    # payment is still required, creation of the new pending session
+    admission = await session_manager.admit_execution(
+        session_id=x_session_id,
         user_id=str(current_user.id),
         robot_id=str(robot_id),
         amount=amount,
@@ -97,12 +56,56 @@ async def execute_robot(
         service_payload=payload.model_dump()
     )
 
-    # Return 402 Payment Required
+    if admission.outcome == "paid":
+        session = admission.session
+
+        # Verify session belongs to this user and robot
+        if str(session.user_id) != str(current_user.id):
+            raise HTTPException(status_code=403, detail="Invalid session")
+
+        if str(session.robot_id) != str(robot_id):
+            raise HTTPException(status_code=400, detail="Session does not match robot")
+
+        # Execute the robot (convert IDs to UUID for executor)
+        try:
+            result = await robot_executor.execute(
+                robot_id=UUID(robot_id),
+                user_id=UUID(str(current_user.id)),
+                session_id=UUID(session.id),
+                payload=payload.model_dump(),
+                db=db,
+                robot=robot
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid ID format: {str(e)}")
+
+        return render(ExecuteResponse, result)
+
+    # Robot is locked by another user
+    if admission.outcome == "locked":
+        ttl = admission.lock_ttl
+        minutes_remaining = (ttl // 60) if ttl else 0
+        raise HTTPException(
+            status_code=409,
+            detail=f"Robot is currently in use by another user. Try again in {minutes_remaining} minutes."
+        )
+
+    # Too many unpaid sessions open for this user
+    if admission.outcome == "capped":
+        raise HTTPException(
+            status_code=429,
+            detail="Too many open payment sessions. Complete or let one expire before starting another."
+        )
+
+    # No valid paid session - return 402 for the reused or newly created
+    # session, so retries keep the same session id (and payment memo)
+    pending_session = admission.session
     return generate_x402_response(
         robot_id=str(robot_id),
         robot_name=robot.name,
-        amount=amount,
-        recipient_address=robot.wallet_address,
+        amount=pending_session.amount,
+        recipient_address=pending_session.recipient_address,
         service=payload.service,
-        session_id=new_session.id
+        session_id=pending_session.id,
+        expires_at=pending_session.expires_at
     )
@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.core.security import get_current_user
 from app.core.blockchain import get_payment_verifier
 from app.core.session import get_session_manager
+from app.core.cache import get_robot_cache
+from app.core.pagination import encode_cursor, after_cursor
+from app.core.signature_registry import get_signature_registry
+from app.core.images import variant_url
 from app.models.user import User
 from app.models.payment import PaymentSessionDB
 from app.models.robot import Robot
 from app.schemas.payment import PaymentVerification, PaymentVerificationResponse
+from app.services.payment_stats import get_user_stats
+from app.services.payment_settlement import (
+    RobotLockedError,
+    SettlementInProgress,
+    await_other_settlement,
+    release_unused_signature,
+    settle_claimed_session,
+)
 from sqlalchemy import select
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
@@ -32,8 +44,13 @@ async def verify_payment(
     if not session:
         raise HTTPException(status_code=404, detail="Payment session not found or expired")
 
-    # Check if already paid
+    # Check if already paid (the payment indexer usually settles sessions
+    # before the client gets here, making this a single Redis lookup). A
+    # retry after losing the settlement claim lands here too, so release
+    # the signature if the session was paid with another one
     if session.status == "paid":
+        if str(session.user_id) == str(current_user.id):
+            await release_unused_signature(session, verification.tx_signature)
         return {
             "verified": True,
             "session_id": session.id
@@ -43,7 +60,18 @@ async def verify_payment(
     if str(session.user_id) != str(current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized to verify this payment")
 
-    # Verify transaction on blockchain
+    # Reject signatures that already paid for another session before doing
+    # any RPC work
+    registry = get_signature_registry()
+    consumed_by = await registry.consumed_by(verification.tx_signature, db)
+    if consumed_by and consumed_by != session.id:
+        return {
+            "verified": False,
+            "session_id": session.id,
+            "error": "This transaction has already been used for another payment."
+        }
+
+    # Verify transaction on blockchain (parsed result is cached per signature)
     # Note: memo verification is optional for now (SPL token transfers don't include memos easily)
     is_valid = await payment_verifier.verify_transaction(
         signature=verification.tx_signature,
@@ -59,56 +87,39 @@ async def verify_payment(
             "error": "Transaction verification failed. Please check the transaction and try again."
         }
 
-    # Mark session as paid
-    await session_manager.mark_paid(session.id, verification.tx_signature)
-
-    # Get robot to determine lock duration
-    robot_query = select(Robot).where(Robot.id == session.robot_id)
-    robot_result = await db.execute(robot_query)
-    robot = robot_result.scalar_one_or_none()
-
-    # Determine lock duration from rental plan
-    duration_minutes = 10  # Default
-    if robot and robot.rental_plans and session.service_payload:
-        rental_plan_index = session.service_payload.get('rental_plan_index')
-        if rental_plan_index is not None and 0 <= rental_plan_index < len(robot.rental_plans):
-            selected_plan = robot.rental_plans[rental_plan_index]
-            duration_minutes = selected_plan.get('duration_minutes', 10)
+    # Claim the signature for this session; loses if a concurrent request
+    # claimed it for another session first
+    if not await registry.consume(verification.tx_signature, session.id):
+        return {
+            "verified": False,
+            "session_id": session.id,
+            "error": "This transaction has already been used for another payment."
+        }
 
-    # Lock the robot for exclusive use
-    lock_acquired = await session_manager.lock_robot(
-        robot_id=session.robot_id,
-        user_id=session.user_id,
-        duration_minutes=duration_minutes
-    )
+    # The payment indexer may be settling this session right now; whoever
+    # claims it first settles it, and the loser reports success only once
+    # the session really is paid
+    if not await session_manager.claim_settlement(session.id):
+        try:
+            await await_other_settlement(session.id, verification.tx_signature)
+        except SettlementInProgress:
+            raise HTTPException(
+                status_code=409,
+                detail="Payment is being settled, try again shortly"
+            )
+        return {
+            "verified": True,
+            "session_id": session.id
+        }
 
-    if not lock_acquired:
-        # This shouldn't happen since we check before creating session,
-        # but handle it gracefully
+    try:
+        await settle_claimed_session(session, verification.tx_signature)
+    except RobotLockedError:
         raise HTTPException(
             status_code=409,
             detail="Robot is currently locked by another user"
         )
 
-    # Save to database for historical records
-    db_session = PaymentSessionDB(
-        id=session.id,
-        user_id=session.user_id,
-        robot_id=session.robot_id,
-        amount=session.amount,
-        currency=session.currency,
-        recipient_address=session.recipient_address,
-        status="paid",
-        tx_signature=verification.tx_signature,
-        service_payload=session.service_payload,
-        created_at=session.created_at,
-        expires_at=session.expires_at,
-        paid_at=session.paid_at
-    )
-
-    db.add(db_session)
-    await db.commit()
-
     return {
         "verified": True,
         "session_id": session.id
@@ -144,130 +155,106 @@ async def get_session_status(
 
 @router.get("/sessions/my")
 async def get_my_sessions(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     status: Optional[str] = None,
-    limit: int = 50
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None
 ):
-    """Get all payment sessions for the current user"""
-    from sqlalchemy import select, desc
-    from app.models.robot import Robot
-
-    # Query sessions from database
-    query = select(PaymentSessionDB).where(
-        PaymentSessionDB.user_id == str(current_user.id)
+    """
+    Get payment sessions for the current user, newest first.
+    Pass the returned `next_cursor` as `cursor` to fetch the next page.
+    """
+    # One query: sessions joined with the robot name/image they belong to
+    query = (
+        select(
+            PaymentSessionDB.id,
+            PaymentSessionDB.robot_id,
+            PaymentSessionDB.amount,
+            PaymentSessionDB.currency,
+            PaymentSessionDB.status,
+            PaymentSessionDB.tx_signature,
+            PaymentSessionDB.service_payload,
+            PaymentSessionDB.created_at,
+            PaymentSessionDB.expires_at,
+            PaymentSessionDB.paid_at,
+            Robot.name.label("robot_name"),
+            Robot.image_url.label("robot_image_url"),
+        )
+        .outerjoin(Robot, Robot.id == PaymentSessionDB.robot_id)
+        .where(PaymentSessionDB.user_id == str(current_user.id))
     )
 
     # Filter by status if provided
     if status:
         query = query.where(PaymentSessionDB.status == status)
 
-    # Order by created date (most recent first) and limit
-    query = query.order_by(desc(PaymentSessionDB.created_at)).limit(limit)
+    if cursor:
+        try:
+            query = query.where(after_cursor(PaymentSessionDB.created_at, PaymentSessionDB.id, cursor))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    result = await db.execute(query)
-    sessions = result.scalars().all()
-
-    # Enrich sessions with robot information
-    enriched_sessions = []
-    for session in sessions:
-        # Get robot details
-        robot_query = select(Robot).where(Robot.id == session.robot_id)
-        robot_result = await db.execute(robot_query)
-        robot = robot_result.scalar_one_or_none()
+    # Fetch one extra row to know whether another page exists
+    query = query.order_by(
+        PaymentSessionDB.created_at.desc(),
+        PaymentSessionDB.id.desc()
+    ).limit(limit + 1)
 
-        session_data = {
-            "session_id": session.id,
-            "robot_id": session.robot_id,
-            "robot_name": robot.name if robot else "Unknown Robot",
-            "robot_image_url": robot.image_url if robot else None,
-            "amount": float(session.amount),
-            "currency": session.currency,
-            "status": session.status,
-            "tx_signature": session.tx_signature,
-            "created_at": session.created_at.isoformat(),
-            "expires_at": session.expires_at.isoformat(),
-            "paid_at": session.paid_at.isoformat() if session.paid_at else None,
-            "service": session.service_payload.get("service", "control") if session.service_payload else "control"
+    result = await db.execute(query)
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    sessions = [
+        {
+            "session_id": row.id,
+            "robot_id": row.robot_id,
+            "robot_name": row.robot_name or "Unknown Robot",
+            "robot_image_url": variant_url(row.robot_image_url, "thumb"),
+            "amount": float(row.amount),
+            "currency": row.currency,
+            "status": row.status,
+            "tx_signature": row.tx_signature,
+            "created_at": row.created_at.isoformat(),
+            "expires_at": row.expires_at.isoformat(),
+            "paid_at": row.paid_at.isoformat() if row.paid_at else None,
+            "service": row.service_payload.get("service", "control") if row.service_payload else "control"
         }
-        enriched_sessions.append(session_data)
+        for row in rows
+    ]
 
     return {
-        "sessions": enriched_sessions,
-        "total": len(enriched_sessions)
+        "sessions": sessions,
+        "total": len(sessions),
+        "next_cursor": encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
     }
 
 
 @router.get("/stats/my")
 async def get_my_payment_stats(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get payment statistics for the current user"""
-    from sqlalchemy import select, func
-
-    # Total sessions
-    total_sessions_query = select(func.count()).select_from(PaymentSessionDB).where(
-        PaymentSessionDB.user_id == str(current_user.id)
-    )
-    total_sessions_result = await db.execute(total_sessions_query)
-    total_sessions = total_sessions_result.scalar() or 0
-
-    # Paid sessions
-    paid_sessions_query = select(func.count()).select_from(PaymentSessionDB).where(
-        PaymentSessionDB.user_id == str(current_user.id),
-        PaymentSessionDB.status == "paid"
-    )
-    paid_sessions_result = await db.execute(paid_sessions_query)
-    paid_sessions = paid_sessions_result.scalar() or 0
-
-    # Total spent
-    total_spent_query = select(func.sum(PaymentSessionDB.amount)).where(
-        PaymentSessionDB.user_id == str(current_user.id),
-        PaymentSessionDB.status == "paid"
-    )
-    total_spent_result = await db.execute(total_spent_query)
-    total_spent = float(total_spent_result.scalar() or 0)
-
-    # Last payment date
-    last_payment_query = select(PaymentSessionDB.paid_at).where(
-        PaymentSessionDB.user_id == str(current_user.id),
-        PaymentSessionDB.status == "paid"
-    ).order_by(PaymentSessionDB.paid_at.desc()).limit(1)
-    last_payment_result = await db.execute(last_payment_query)
-    last_payment = last_payment_result.scalar()
-
-    # Most used robot
-    most_used_robot_query = select(
-        PaymentSessionDB.robot_id,
-        func.count(PaymentSessionDB.robot_id).label('count')
-    ).where(
-        PaymentSessionDB.user_id == str(current_user.id),
-        PaymentSessionDB.status == "paid"
-    ).group_by(PaymentSessionDB.robot_id).order_by(func.count(PaymentSessionDB.robot_id).desc()).limit(1)
-
-    most_used_result = await db.execute(most_used_robot_query)
-    most_used_data = most_used_result.first()
+    """Get payment statistics for the current user (served from the per-user aggregate)"""
+    stats = await get_user_stats(db, str(current_user.id))
 
     most_used_robot = None
-    if most_used_data:
-        from app.models.robot import Robot
-        robot_query = select(Robot).where(Robot.id == most_used_data[0])
-        robot_result = await db.execute(robot_query)
-        robot = robot_result.scalar_one_or_none()
+    if stats.most_used_robot_id:
+        robot = await get_robot_cache().get(stats.most_used_robot_id, db)
         if robot:
             most_used_robot = {
                 "robot_id": robot.id,
                 "robot_name": robot.name,
-                "session_count": most_used_data[1]
+                "session_count": stats.most_used_robot_count
             }
 
     return {
-        "total_sessions": total_sessions,
-        "paid_sessions": paid_sessions,
-        "pending_sessions": total_sessions - paid_sessions,
-        "total_spent": total_spent,
+        "total_sessions": stats.total_sessions,
+        "paid_sessions": stats.paid_sessions,
+        "pending_sessions": stats.total_sessions - stats.paid_sessions,
+        "total_spent": float(stats.total_spent or 0),
         "currency": "rUSD",
-        "last_payment_at": last_payment.isoformat() if last_payment else None,
+        "last_payment_at": stats.last_payment_at.isoformat() if stats.last_payment_at else None,
         "most_used_robot": most_used_robot
     }
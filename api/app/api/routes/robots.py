@@ -1,21 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, delete
 from typing import Optional, List
 from uuid import UUID
 import os
-import shutil
-from pathlib import Path
-from datetime import datetime
-import httpx
-import anthropic
-import json
-import re
-from app.database import get_db
+from app.database import get_db, get_read_db, get_write_db
 from app.core.security import get_current_user, require_role
+from app.core.cache import TTLCache, get_robot_cache
+from app.core.pagination import encode_cursor, after_cursor
+from app.core.serialization import render
+from app.core.http_cache import get_robot_versions
+from app.services.metrics_engine import robot_metrics, merge_metrics
+from app.services.interface_generator import interface_generator
+from app.services.openapi_compiler import compile_interface
+from app.services.api_docs import api_docs_fetcher
+from app.services.image_store import ImageTooLarge, image_store
+from app.services.latency_histogram import WINDOWS as LATENCY_WINDOWS
 from app.models.user import User
-from app.models.robot import Robot
+from app.models.robot import Robot, RobotService
 from app.schemas.robot import (
     RobotCreate,
     RobotUpdate,
@@ -29,58 +32,112 @@ from app.config import settings
 router = APIRouter(prefix="/robots", tags=["Robots"])
 
 
+# Catalog totals per (status, category); exact when computed, then served
+# for a short TTL. Dropped in every worker whenever a robot is invalidated
+# in the robot cache (over its pub/sub channel), which every robot write does
+_catalog_counts = TTLCache(maxsize=1024, ttl=settings.ROBOT_COUNT_CACHE_TTL_SECONDS)
+get_robot_cache().on_invalidate(lambda robot_id: _catalog_counts.clear())
+
+
+async def _sync_robot_services(db: AsyncSession, robot_id: str, services: List[str]) -> None:
+    """Mirror Robot.services into the indexed robot_services table"""
+    await db.execute(delete(RobotService).where(RobotService.robot_id == robot_id))
+    db.add_all([RobotService(robot_id=robot_id, service=service) for service in set(services or [])])
+
+
 @router.get("", response_model=RobotListResponse)
 async def list_robots(
+    request: Request,
     category: Optional[str] = None,
     status: Optional[str] = Query("active", regex="^(active|inactive|maintenance)$"),
-    skip: int = 0,
-    limit: int = 100,
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """List available robots"""
+    """
+    List available robots, newest first.
+    Pass the returned `next_cursor` as `cursor` to fetch the next page.
+    Send the returned ETag as If-None-Match to get a 304 while nothing changed.
+    """
+    validators = await get_robot_versions().validators()
+    if validators is not None and validators.matches(request):
+        return validators.not_modified()
+
     query = select(Robot).where(Robot.status == status)
 
-    # Filter by category if provided
+    # Filter by category through the indexed service lookup
     if category:
-        query = query.where(Robot.services.contains([category]))
-
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+        query = query.join(
+            RobotService,
+            (RobotService.robot_id == Robot.id) & (RobotService.service == category)
+        )
 
-    # Get robots with pagination
-    query = query.offset(skip).limit(limit).order_by(Robot.created_at.desc())
+    # Total count, cached briefly since it does not need to be exact per request
+    count_key = (status, category)
+    total = _catalog_counts.get(count_key)
+    if total is None:
+        count_query = select(func.count()).select_from(query.subquery())
+        total = (await db.execute(count_query)).scalar() or 0
+        _catalog_counts.set(count_key, total)
+
+    # Keyset pagination on (created_at, id)
+    if cursor:
+        try:
+            query = query.where(after_cursor(Robot.created_at, Robot.id, cursor))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    query = query.order_by(Robot.created_at.desc(), Robot.id.desc()).limit(limit + 1)
     result = await db.execute(query)
     robots = result.scalars().all()
+    has_more = len(robots) > limit
+    robots = robots[:limit]
 
-    return {
+    return render(RobotListResponse, {
         "robots": robots,
-        "total": total
-    }
+        "total": total,
+        "next_cursor": encode_cursor(robots[-1].created_at, robots[-1].id) if has_more else None
+    }, headers=validators.headers() if validators else None, context={"image_variant": "card"})
 
 
 @router.get("/{robot_id}", response_model=RobotResponse)
 async def get_robot(
     robot_id: str,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get robot details"""
-    result = await db.execute(select(Robot).where(Robot.id == robot_id))
-    robot = result.scalar_one_or_none()
+    robot_cache = get_robot_cache()
+
+    # Unknown ids are rejected before a version key is created for them
+    if await robot_cache.get(robot_id, db) is None:
+        raise HTTPException(status_code=404, detail="Robot not found")
+
+    validators = await get_robot_versions().validators(robot_id)
+    if validators is not None and validators.matches(request):
+        return validators.not_modified()
+
+    # Read again after the validators, so the body is never older than its
+    # ETag (a write in between invalidates the cache before bumping)
+    robot = await robot_cache.get(robot_id, db)
 
     if not robot:
         raise HTTPException(status_code=404, detail="Robot not found")
 
-    return robot
+    return render(
+        RobotResponse,
+        robot,
+        headers=validators.headers() if validators else None,
+        context={"image_variant": "large"},
+    )
 
 
 @router.post("", response_model=RobotResponse, status_code=201)
 async def create_robot(
     robot_data: RobotCreate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     current_user: User = Depends(require_role("user"))
 ):
     """Create a new robot (robot_owner or admin only)"""
@@ -123,17 +180,22 @@ async def create_robot(
     )
 
     db.add(new_robot)
+    await db.flush()
+    await _sync_robot_services(db, new_robot.id, robot_data.services)
     await db.commit()
     await db.refresh(new_robot)
+    # Nothing cached yet; this tells every worker the catalog changed
+    await get_robot_cache().invalidate(new_robot.id)
+    await get_robot_versions().bump()
 
-    return new_robot
+    return render(RobotResponse, new_robot, status_code=201)
 
 
 @router.patch("/{robot_id}", response_model=RobotResponse)
 async def update_robot(
     robot_id: str,
     robot_data: RobotUpdate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     current_user: User = Depends(get_current_user)
 ):
     """Update robot (owner or admin only)"""
@@ -153,16 +215,21 @@ async def update_robot(
     for field, value in update_data.items():
         setattr(robot, field, value)
 
+    if "services" in update_data:
+        await _sync_robot_services(db, robot.id, robot.services)
+
     await db.commit()
     await db.refresh(robot)
+    await get_robot_cache().invalidate(robot_id)
+    await get_robot_versions().bump(robot_id)
 
-    return robot
+    return render(RobotResponse, robot)
 
 
 @router.delete("/{robot_id}", status_code=204)
 async def delete_robot(
     robot_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     current_user: User = Depends(require_role("admin"))
 ):
     """Delete robot (admin only)"""
@@ -172,8 +239,11 @@ async def delete_robot(
     if not robot:
         raise HTTPException(status_code=404, detail="Robot not found")
 
+    await db.execute(delete(RobotService).where(RobotService.robot_id == robot.id))
     await db.delete(robot)
     await db.commit()
+    await get_robot_cache().invalidate(robot_id)
+    await get_robot_versions().bump(robot_id)
 
     return None
 
@@ -189,34 +259,15 @@ async def upload_robot_image(
     if file.content_type not in allowed_types:
         raise HTTPException(status_code=400, detail="Invalid file type. Only images are allowed.")
 
-    # Validate file size (max 5MB)
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()  # Get position (file size)
-    file.file.seek(0)  # Reset to beginning
-
-    if file_size > 5 * 1024 * 1024:  # 5MB
-        raise HTTPException(status_code=400, detail="File too large. Maximum size is 5MB.")
-
-    # Create uploads directory if it doesn't exist
-    upload_dir = Path("uploads/robots")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_extension = Path(file.filename).suffix
-    unique_filename = f"{current_user.id}_{timestamp}{file_extension}"
-    file_path = upload_dir / unique_filename
-
-    # Save file
+    # Stream to disk, stored once per content hash; resized variants are
+    # produced in the background
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
+        image_url = await image_store.save_upload(file)
+    except ImageTooLarge:
+        raise HTTPException(status_code=400, detail="File too large. Maximum size is 5MB.")
+    except OSError as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
 
-    # Return URL (relative path that frontend can use)
-    image_url = f"/uploads/robots/{unique_filename}"
-
     return {"image_url": image_url}
 
 
@@ -226,16 +277,23 @@ async def explore_robot_api(
     current_user: User = Depends(get_current_user)
 ):
     """
-    Explore robot API using Claude AI and generate a control interface configuration.
-    This endpoint analyzes the robot's API and creates a custom control interface.
+    Explore robot API and generate a control interface configuration.
+    Robots publishing OpenAPI get an interface compiled from their request
+    schemas; for anything else Claude AI analyzes the API.
     """
     try:
         request.api_url = request.api_url.rstrip('/')
         # 1. Attempt to fetch API documentation
         api_docs = await fetch_api_documentation(request.api_url)
 
-        # 2. Call Claude API to generate the interface
-        interface_config = await generate_interface_with_ai(
+        # 2. Compile the interface straight from an OpenAPI spec when there is one
+        spec = api_docs.pop("spec", None)  # parsed spec, not sent to the model
+        interface_config = compile_interface(spec, request.has_video, request.has_gps) if spec else None
+        if interface_config is not None:
+            return {"interface_config": interface_config}
+
+        # 3. Otherwise call Claude API to generate the interface (cached per API docs)
+        interface_config = await interface_generator.generate(
             api_url=request.api_url,
             api_docs=api_docs,
             robot_name=request.robot_name,
@@ -254,166 +312,20 @@ async def fetch_api_documentation(api_url: str) -> dict:
     Attempt to fetch API documentation from common endpoints
     (OpenAPI, Swagger, API docs, etc.)
     """
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        endpoints_to_try = [
-            f"{api_url}/openapi.json",
-            f"{api_url}/swagger.json",
-            f"{api_url}/docs",
-            f"{api_url}/api-docs",
-            api_url
-        ]
-
-        for endpoint in endpoints_to_try:
-            try:
-                response = await client.get(endpoint)
-                if response.status_code == 200:
-                    return {
-                        "url": endpoint,
-                        "content": response.text[:5000],  # Limit size to prevent token overflow
-                        "content_type": response.headers.get("content-type")
-                    }
-            except:
-                continue
-
+    api_docs = await api_docs_fetcher.fetch(api_url)
+    if api_docs is None:
         # Si no se encontró documentación, lanzar error
         raise HTTPException(
             status_code=404,
             detail=f"No se pudo encontrar documentación de API en {api_url}. Endpoints probados: /openapi.json, /swagger.json, /docs, /api-docs"
         )
-
-
-async def generate_interface_with_ai(
-    api_url: str,
-    api_docs: dict,
-    robot_name: str,
-    has_video: bool,
-    has_gps: bool
-) -> dict:
-    """
-    Use Claude AI to generate the control interface configuration
-    based on the robot's API documentation
-    """
-    client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-
-    prompt = f"""You are an expert in robot control interfaces and API analysis.
-
-I need you to analyze this robot API and generate a comprehensive control interface configuration.
-
-Robot Name: {robot_name}
-API URL: {api_url}
-Has Video Stream: {has_video}
-Has GPS: {has_gps}
-
-API Documentation:
-{json.dumps(api_docs, indent=2)}
-
-IMPORTANT INSTRUCTIONS:
-1. Carefully examine ALL endpoints in the OpenAPI/Swagger documentation
-2. Look for endpoints in the "paths" section of the OpenAPI schema
-3. For EACH endpoint that accepts POST requests, create appropriate controls
-4. Generate MULTIPLE controls - aim for at least 8-12 controls if the API supports it
-5. Categorize endpoints by their function:
-   - Movement endpoints (/move, /rotate) → buttons for each direction
-   - Value endpoints (/speed, /arm/position) → sliders
-   - Camera/positioning (/camera/move) → joystick
-   - On/off endpoints (/lights, /motor) → toggles
-
-Control Type Guidelines:
-- "button": For discrete actions with fixed parameters
-  Example: POST /move with {{"direction": "forward"}} → Create separate buttons for forward, backward, left, right
-- "slider": For endpoints with numeric ranges (0-100, 0-360, etc.)
-  Example: POST /speed with {{"value": 50}} → Slider from 0 to 100
-- "joystick": For 2-axis controls (pan/tilt, x/y)
-  Example: POST /camera/move with {{"pan": 0, "tilt": 0}} → Joystick control
-- "toggle": For boolean states (enabled/disabled, on/off)
-  Example: POST /lights with {{"enabled": true}} → Toggle switch
-
-For movement endpoints like /move that accept different directions, create ONE button for EACH direction:
-- move_forward button with params {{"direction": "forward", "speed": 50}}
-- move_backward button with params {{"direction": "backward", "speed": 50}}
-- move_left button with params {{"direction": "left", "speed": 50}}
-- move_right button with params {{"direction": "right", "speed": 50}}
-
-Return ONLY valid JSON (no markdown, no explanation):
-{{
-  "controls": [
-    // Movement buttons
-    {{"id": "move_forward", "type": "button", "label": "Move Forward", "endpoint": "/move", "method": "POST", "params": {{"direction": "forward", "speed": 50}}, "icon": "ArrowUp"}},
-    {{"id": "move_backward", "type": "button", "label": "Move Backward", "endpoint": "/move", "method": "POST", "params": {{"direction": "backward", "speed": 50}}, "icon": "ArrowDown"}},
-    {{"id": "move_left", "type": "button", "label": "Move Left", "endpoint": "/move", "method": "POST", "params": {{"direction": "left", "speed": 50}}, "icon": "ArrowLeft"}},
-    {{"id": "move_right", "type": "button", "label": "Move Right", "endpoint": "/move", "method": "POST", "params": {{"direction": "right", "speed": 50}}, "icon": "ArrowRight"}},
-
-    // Rotation buttons
-    {{"id": "rotate_left", "type": "button", "label": "Rotate Left", "endpoint": "/rotate", "method": "POST", "params": {{"direction": "left", "degrees": 90}}, "icon": "RotateCcw"}},
-    {{"id": "rotate_right", "type": "button", "label": "Rotate Right", "endpoint": "/rotate", "method": "POST", "params": {{"direction": "right", "degrees": 90}}, "icon": "RotateCw"}},
-
-    // Sliders
-    {{"id": "speed_control", "type": "slider", "label": "Speed", "endpoint": "/speed", "method": "POST", "param_name": "value", "min": 0, "max": 100, "step": 5, "unit": "%"}},
-    {{"id": "arm_height", "type": "slider", "label": "Arm Height", "endpoint": "/arm/position", "method": "POST", "param_name": "height", "min": 0, "max": 100, "step": 5, "unit": "cm"}},
-
-    // Joystick
-    {{"id": "camera_control", "type": "joystick", "label": "Camera Control", "endpoint": "/camera/move", "method": "POST", "axes": ["pan", "tilt"], "range": {{"pan": [-180, 180], "tilt": [-90, 90]}}}},
-
-    // Toggles
-    {{"id": "lights", "type": "toggle", "label": "Lights", "endpoint": "/lights", "method": "POST", "param_name": "enabled"}},
-    {{"id": "motor", "type": "toggle", "label": "Motor", "endpoint": "/motor", "method": "POST", "param_name": "enabled"}},
-
-    // Emergency
-    {{"id": "emergency_stop", "type": "button", "label": "Emergency Stop", "endpoint": "/stop", "method": "POST", "params": {{}}, "icon": "AlertOctagon"}}
-  ],
-  "has_video": {has_video},
-  "has_gps": {has_gps},
-  "api_version": "1.0",
-  "discovered_endpoints": ["/status", "/move", "/rotate", "/speed", "/lights", "/motor", "/camera/move", "/arm/position", "/stop"]
-}}
-
-Generate ALL controls based on the API documentation. Be thorough!
-"""
-
-    try:
-        message = client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=4000, 
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        # Extract JSON from response
-        response_text = message.content[0].text
-
-        # Try to parse JSON (it might be wrapped in ```json``` code blocks)
-        json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-        if json_match:
-            response_text = json_match.group(1)
-
-        interface_config = json.loads(response_text)
-        return interface_config
-
-    except json.JSONDecodeError as e:
-        # Si falla el parsing de JSON, lanzar error
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al parsear la respuesta de Claude AI: {str(e)}. Respuesta recibida: {response_text[:200]}"
-        )
-    except anthropic.APIError as e:
-        # Error de la API de Anthropic
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al llamar a Claude AI: {str(e)}"
-        )
-    except Exception as e:
-        # Cualquier otro error
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error inesperado al generar interfaz: {str(e)}"
-        )
+    return api_docs
 
 
 @router.get("/{robot_id}/availability")
 async def check_robot_availability(
     robot_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Check if a robot is available for use (not locked by another user)
@@ -422,32 +334,27 @@ async def check_robot_availability(
     from app.core.session import get_session_manager
 
     # Check if robot exists
-    result = await db.execute(select(Robot).where(Robot.id == robot_id))
-    robot = result.scalar_one_or_none()
+    robot = await get_robot_cache().get(robot_id, db)
 
     if not robot:
         raise HTTPException(status_code=404, detail="Robot not found")
 
-    # Check if robot is locked
+    # Check if robot is locked (lock info and TTL in one round trip)
     session_manager = get_session_manager()
-    is_locked = await session_manager.is_robot_locked(robot_id)
+    lock_info, ttl = await session_manager.get_robot_lock_state(robot_id)
 
-    if not is_locked:
+    if lock_info is None:
         return {
             "robot_id": robot_id,
             "available": True,
             "status": "available"
         }
 
-    # Get lock info
-    lock_info = await session_manager.get_robot_lock_info(robot_id)
-    ttl = await session_manager.get_robot_ttl(robot_id)
-
     return {
         "robot_id": robot_id,
         "available": False,
         "status": "busy",
-        "locked_by_user_id": lock_info.get("user_id") if lock_info else None,
+        "locked_by_user_id": lock_info.get("user_id"),
         "time_remaining_seconds": ttl,
         "time_remaining_minutes": (ttl // 60) if ttl else 0
     }
@@ -456,23 +363,47 @@ async def check_robot_availability(
 @router.get("/{robot_id}/metrics")
 async def get_robot_metrics(
     robot_id: str,
+    windows: str = Query("5m,1h,24h", description=f"Comma-separated latency windows: {', '.join(LATENCY_WINDOWS)}"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get robot metrics"""
-    result = await db.execute(select(Robot).where(Robot.id == robot_id))
-    robot = result.scalar_one_or_none()
+    """
+    Get robot metrics (stored values merged with counters not yet folded in)
+    plus latency percentiles and error rate per time window. Read from the
+    primary: a lagging replica would miss counters already cleared from Redis.
+    """
+    requested_windows = [w.strip() for w in windows.split(",") if w.strip()]
+    invalid = [w for w in requested_windows if w not in LATENCY_WINDOWS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid latency window(s): {', '.join(invalid)}")
+
+    robot = await get_robot_cache().get(robot_id, db)
 
     if not robot:
         raise HTTPException(status_code=404, detail="Robot not found")
 
+    # The cached row may predate the last fold, so read the counters directly
+    result = await db.execute(
+        select(
+            Robot.execution_count,
+            Robot.avg_response_time,
+            Robot.success_rate,
+            Robot.total_revenue,
+            Robot.metrics_fold_id
+        ).where(Robot.id == robot_id)
+    )
+    stored = result.one_or_none()
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Robot not found")
+
+    *counters, fold_id = stored
+    metrics = merge_metrics(*counters, await robot_metrics.get_pending(robot_id, fold_id))
+
     return {
         "robot_id": robot.id,
         "name": robot.name,
-        "total_executions": robot.execution_count,
-        "total_revenue": float(robot.total_revenue),
-        "avg_response_time": robot.avg_response_time,
-        "success_rate": robot.success_rate,
+        **metrics,
+        "latency": await robot_metrics.get_latency(robot_id, requested_windows),
         "price": float(robot.price),
         "status": robot.status
     }
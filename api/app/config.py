@@ -1,10 +1,24 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
     # Database (defaults to SQLite)
     DATABASE_URL: str = "sqlite+aiosqlite:///./x402_platform.db"
+    # Optional read replica (Postgres) for read-only requests; a user's
+    # reads stay on the primary for a few seconds after they write
+    DATABASE_READ_REPLICA_URL: Optional[str] = None
+    DATABASE_READ_STICKY_SECONDS: int = 5
+    # SQLite profile (ignored for other databases)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE_BYTES: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_POOL_SIZE: int = 10
+    # How long a write may wait for the single writer connection
+    SQLITE_WRITER_TIMEOUT_SECONDS: float = 30.0
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
@@ -14,20 +28,91 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
 
+    # Authentication caches (decoded tokens and user records)
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    AUTH_TOKEN_CACHE_TTL_SECONDS: float = 300.0
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_REDIS_TTL_SECONDS: int = 300
+    USER_CACHE_MAX_ENTRIES: int = 10000
+
     # Solana
     SOLANA_RPC_URL: str = "https://api.devnet.solana.com"
     SOLANA_NETWORK: str = "devnet"
     STABLECOIN_MINT: str = "8r2xLuDRsf6sVrdgTKoBM2gmWoixfXb5fzLyDqdEHtMX"
+    SOLANA_STATUS_POLL_INTERVAL_SECONDS: float = 1.0
+    SOLANA_CONFIRMATION_TIMEOUT_SECONDS: float = 15.0
+
+    # Payment signature registry (0 = consumed signatures never expire)
+    TX_CONSUMED_TTL_SECONDS: int = 0
+    TX_PARSED_CACHE_TTL_SECONDS: int = 86400
+
+    # Payment indexer (watches recipient token accounts for incoming transfers)
+    PAYMENT_INDEXER_ENABLED: bool = True
+    PAYMENT_INDEXER_POLL_INTERVAL_SECONDS: float = 2.0
+    PAYMENT_INDEXER_SIGNATURE_LIMIT: int = 100
+
+    # Robot record cache (in-process LRU backed by Redis)
+    ROBOT_CACHE_TTL_SECONDS: float = 30.0
+    ROBOT_CACHE_REDIS_TTL_SECONDS: int = 300
+    ROBOT_CACHE_MAX_ENTRIES: int = 10000
+    ROBOT_COUNT_CACHE_TTL_SECONDS: float = 30.0
 
     # Session
     SESSION_EXPIRE_MINUTES: int = 15
+    # An open session is handed out again only with this much time left to pay
+    SESSION_REUSE_MIN_REMAINING_SECONDS: int = 120
+    MAX_OPEN_SESSIONS_PER_USER: int = 10
 
     # API
     API_V1_PREFIX: str = "/api"
     PROJECT_NAME: str = "x402 Payment Platform"
 
+    # Robot HTTP client pool (one keep-alive client per robot origin)
+    ROBOT_HTTP_TIMEOUT: float = 30.0
+    ROBOT_HTTP_MAX_CONNECTIONS: int = 20
+    ROBOT_HTTP_MAX_KEEPALIVE: int = 10
+    ROBOT_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    ROBOT_HTTP2: bool = False
+    ROBOT_HTTP_MAX_ORIGINS: int = 256
+
+    # Execution log write-behind
+    EXECUTION_LOG_BATCH_SIZE: int = 500
+    EXECUTION_LOG_FLUSH_INTERVAL_SECONDS: float = 2.0
+    EXECUTION_LOG_MAX_BUFFER: int = 50000
+    EXECUTION_LOG_MAX_ATTEMPTS: int = 10  # failed flushes before a log is dropped
+
+    # Robot metrics (Redis counters folded into the robots table)
+    ROBOT_METRICS_FOLD_INTERVAL_SECONDS: float = 10.0
+    ROBOT_METRICS_FOLD_BATCH: int = 1000
+    # Folded metrics refresh cached robots and catalog ETags at most this often
+    ROBOT_METRICS_VERSION_INTERVAL_SECONDS: float = 60.0
+    LATENCY_MINUTE_RETENTION_SECONDS: int = 2 * 3600
+    LATENCY_HOUR_RETENTION_SECONDS: int = 8 * 24 * 3600
+
     # AI Integration
     ANTHROPIC_API_KEY: str = ""
+    ANTHROPIC_BASE_URL: Optional[str] = None  # e.g. a local stub model server for tests
+    ANTHROPIC_MODEL: str = "claude-sonnet-4-5-20250929"
+    AI_INTERFACE_MAX_CONCURRENCY: int = 4
+    AI_INTERFACE_TIMEOUT_SECONDS: float = 120.0
+    AI_INTERFACE_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    AI_INTERFACE_CACHE_MAX_ENTRIES: int = 256
+
+    # Robot API documentation discovery (explore-api)
+    API_DOCS_TIMEOUT_SECONDS: float = 10.0
+    API_DOCS_MAX_BYTES: int = 5 * 1024 * 1024
+    API_DOCS_CACHE_MAX_ENTRIES: int = 1024
+    API_DOCS_CACHE_TTL_SECONDS: float = 24 * 3600.0
+
+    # Robot image uploads (content-addressed, resized in worker processes)
+    IMAGE_UPLOAD_MAX_BYTES: int = 5 * 1024 * 1024
+    IMAGE_VARIANT_WORKERS: int = 2
+    # How often a worker re-checks the disk for variants it has not seen yet
+    IMAGE_VARIANT_RECHECK_SECONDS: float = 5.0
+
+    # Prometheus metrics: set when running several workers so /metrics
+    # covers all of them (a directory emptied before the workers start)
+    PROMETHEUS_MULTIPROC_DIR: Optional[str] = None
 
     # CORS
     CORS_ORIGINS: str = "https://robotsx402.fun,https://www.robotsx402.fun,http://localhost:3000"
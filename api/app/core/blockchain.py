@@ -1,14 +1,203 @@
-from solana.rpc.async_api import AsyncClient
-from solana.rpc.commitment import Confirmed, Finalized
-from solders.signature import Signature
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Tuple
 from app.config import settings
+from app.core.instrumentation import SOLANA_RPC_DURATION, SOLANA_RPC_RETRIES
+from app.core.signature_registry import get_signature_registry
 import asyncio
+import logging
+import base58
+
+if TYPE_CHECKING:
+    from solana.rpc.async_api import AsyncClient
+
+logger = logging.getLogger(__name__)
+
+# The Solana SDK (solana, solders) is imported inside the functions that use
+# it, so processes load it on the first payment instead of at startup
+
+# getSignatureStatuses accepts at most this many signatures per call
+MAX_SIGNATURES_PER_STATUS_CALL = 256
+
+# SPL Memo program ids (v2 and v1); only their instructions carry memos
+MEMO_PROGRAM_IDS = {
+    "MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcHr",
+    "Memo1UhkJRfHyvLMcVucJwxXeuD728EqVDDwQDxFMNo",
+}
+
+
+def _status_to_dict(status) -> Dict[str, Any]:
+    from solders.transaction_status import TransactionConfirmationStatus
+
+    return {
+        "confirmed": status.confirmation_status is not None,
+        "confirmations": status.confirmations or 0,
+        "err": status.err,
+        "status": str(status.confirmation_status) if status.confirmation_status else "unknown",
+        "committed": status.confirmation_status in (
+            TransactionConfirmationStatus.Confirmed,
+            TransactionConfirmationStatus.Finalized,
+        ),
+    }
+
+
+class SignatureStatusTracker:
+    """
+    Shared signature status poller.
+
+    Callers register a signature and await a future; one background loop
+    checks every pending signature per tick with batched
+    getSignatureStatuses calls (up to 256 signatures each), so the RPC call
+    count grows with ticks, not with concurrent payers. The loop only runs
+    while something is waiting.
+    """
+
+    def __init__(self, client: "AsyncClient", tick_interval: float = 1.0):
+        self.client = client
+        self.tick_interval = tick_interval
+        # signature -> [(future, wait_for_commit)]
+        self._waiters: Dict[str, List[Tuple[asyncio.Future, bool]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _register(self, signature: str, wait_for_commit: bool) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(signature, []).append((future, wait_for_commit))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    async def get_status(self, signature: str, timeout: float = 10.0) -> Optional[Dict[str, Any]]:
+        """Status of `signature` as of the next tick (None if unknown)"""
+        future = self._register(signature, wait_for_commit=False)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def wait_for_commit(self, signature: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait until `signature` is confirmed/finalized or has failed.
+        Returns its status, or None if neither happened within `timeout`.
+        """
+        future = self._register(signature, wait_for_commit=True)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _run(self) -> None:
+        while True:
+            # Forget waiters that timed out or were cancelled
+            for signature in list(self._waiters):
+                pending = [(f, c) for f, c in self._waiters[signature] if not f.done()]
+                if pending:
+                    self._waiters[signature] = pending
+                else:
+                    del self._waiters[signature]
+
+            if not self._waiters:
+                return
+
+            try:
+                await self._tick(list(self._waiters))
+            except Exception as e:
+                logger.warning(f"Signature status check failed: {e}")
+
+            await asyncio.sleep(self.tick_interval)
+
+    async def _get_statuses(self, batch: List[str]):
+        from solders.signature import Signature
+
+        with SOLANA_RPC_DURATION.labels("getSignatureStatuses").time():
+            return await self.client.get_signature_statuses(
+                [Signature.from_string(signature) for signature in batch],
+                search_transaction_history=True
+            )
+
+    async def _tick(self, signatures: List[str]) -> None:
+        batches = [
+            signatures[i:i + MAX_SIGNATURES_PER_STATUS_CALL]
+            for i in range(0, len(signatures), MAX_SIGNATURES_PER_STATUS_CALL)
+        ]
+        responses = await asyncio.gather(*[self._get_statuses(batch) for batch in batches])
+
+        for batch, response in zip(batches, responses):
+            for signature, status in zip(batch, response.value):
+                info = _status_to_dict(status) if status else None
+                for future, wait_for_commit in self._waiters.get(signature, []):
+                    if future.done():
+                        continue
+                    if not wait_for_commit or (info and (info["committed"] or info["err"] is not None)):
+                        future.set_result(info)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for waiters in self._waiters.values():
+            for future, _ in waiters:
+                if not future.done():
+                    future.cancel()
+        self._waiters.clear()
+
+
+def parse_transfers(instructions) -> Dict[str, Any]:
+    """Extract SPL token transfers and memo data from jsonParsed instructions"""
+    transfers = []
+    memos = []
+
+    for instruction in instructions:
+        # Check for SPL token transfer instruction
+        if hasattr(instruction, 'parsed'):
+            parsed = instruction.parsed
+            if isinstance(parsed, dict):
+                info = parsed.get('info', {})
+                instruction_type = parsed.get('type', '')
+
+                # Check for SPL token transfer (type: "transfer" or "transferChecked")
+                if instruction_type in ['transfer', 'transferChecked']:
+                    # For transferChecked, amount is in 'tokenAmount'
+                    if instruction_type == 'transferChecked':
+                        token_amount = int(info.get('tokenAmount', {}).get('amount', 0))
+                    else:
+                        token_amount = int(info.get('amount', 0))
+
+                    transfers.append({
+                        "type": instruction_type,
+                        "amount": token_amount,
+                        "source": info.get('source'),
+                        "destination": info.get('destination'),
+                        "authority": info.get('authority') or info.get('multisigAuthority'),
+                        "mint": info.get('mint'),
+                    })
+            elif isinstance(parsed, str) and getattr(instruction, 'program', None) == 'spl-memo':
+                # spl-memo instructions parse to the memo text
+                memos.append(parsed)
+
+        # Unparsed memo instructions carry the memo as base58 data; other
+        # unparsed programs (compute budget, ...) are not memos
+        elif str(getattr(instruction, 'program_id', '')) in MEMO_PROGRAM_IDS:
+            try:
+                memos.append(base58.b58decode(instruction.data).decode('utf-8'))
+            except Exception:
+                pass
+
+    return {"err": None, "transfers": transfers, "memos": memos}
 
 
 class SolanaPaymentVerifier:
     def __init__(self, rpc_url: str):
+        from solana.rpc.async_api import AsyncClient
+
         self.client = AsyncClient(rpc_url)
+        # signature -> future of an in-flight fetch (single-flight)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.status_tracker = SignatureStatusTracker(
+            self.client,
+            tick_interval=settings.SOLANA_STATUS_POLL_INTERVAL_SECONDS
+        )
 
     async def verify_transaction(
         self,
@@ -21,116 +210,132 @@ class SolanaPaymentVerifier:
         Verify a Solana SPL token (rUSD) transaction matches expected payment parameters
         """
         try:
-            # Parse signature
-            sig = Signature.from_string(signature)
+            parsed = await self.get_parsed_transaction(signature)
+            if parsed is None:
+                return False
+
+            if parsed["err"] is not None:
+                logger.info(f"Transaction {signature} failed with error: {parsed['err']}")
+                return False
+
+            return self.match_transfer(parsed, expected_amount, memo)
+
+        except Exception:
+            logger.exception(f"Error verifying transaction {signature}")
+            return False
+
+    @staticmethod
+    def match_transfer(parsed: Dict[str, Any], expected_amount: float, memo: Optional[str] = None) -> bool:
+        """Check parsed transaction data against the expected amount and memo"""
+        # Expected amount in token units (6 decimals for rUSD)
+        RUSD_DECIMALS = 6
+        expected_token_amount = int(round(expected_amount * (10 ** RUSD_DECIMALS)))
+
+        # Tolerance: allow 0.01 rUSD difference (10000 token units)
+        tolerance = 10000
+        transfer_found = False
+        for transfer in parsed["transfers"]:
+            token_amount = transfer["amount"]
+            logger.debug(f"Found SPL transfer: type={transfer['type']}, amount={token_amount}, expected={expected_token_amount}")
+            if abs(token_amount - expected_token_amount) <= tolerance:
+                transfer_found = True
+            else:
+                logger.debug(f"Amount mismatch: {token_amount} vs {expected_token_amount}")
+
+        memo_found = memo is None or any(memo in data for data in parsed["memos"])  # If no memo required, skip check
+
+        logger.debug(f"Verification result: transfer_found={transfer_found}, memo_found={memo_found}")
+        return transfer_found and memo_found
+
+    async def get_parsed_transaction(self, signature: str) -> Optional[Dict[str, Any]]:
+        """
+        Transfers and memos of a confirmed transaction, or None if it is not
+        confirmed/found. Results are cached in the signature registry, and
+        concurrent calls for the same signature share one RPC fetch.
+        """
+        registry = get_signature_registry()
+        parsed = await registry.get_parsed(signature)
+        if parsed is not None:
+            return parsed
+
+        inflight = self._inflight.get(signature)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[signature] = future
+        try:
+            parsed = await self._fetch_parsed_transaction(signature)
+            if parsed is not None:
+                await registry.set_parsed(signature, parsed)
+            future.set_result(parsed)
+            return parsed
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited future does not log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[signature]
 
-            # Get transaction with retries
-            tx_response = None
-            for _ in range(5):  # Retry up to 5 times
+    async def _fetch_parsed_transaction(self, signature: str) -> Optional[Dict[str, Any]]:
+        from solana.rpc.commitment import Confirmed
+        from solders.signature import Signature
+
+        sig = Signature.from_string(signature)
+
+        # Wait for confirmation through the shared, batched status poller
+        status = await self.status_tracker.wait_for_commit(
+            signature,
+            timeout=settings.SOLANA_CONFIRMATION_TIMEOUT_SECONDS
+        )
+        if status is None:
+            logger.info(f"Transaction not confirmed in time: {signature}")
+            return None
+
+        if status["err"] is not None:
+            return {"err": str(status["err"]), "transfers": [], "memos": []}
+
+        # Fetch the confirmed transaction (a node may briefly lag behind
+        # the status cache, so allow one short retry)
+        tx_response = None
+        for attempt in range(2):
+            if attempt:
+                SOLANA_RPC_RETRIES.labels("getTransaction").inc()
+            with SOLANA_RPC_DURATION.labels("getTransaction").time():
                 tx_response = await self.client.get_transaction(
                     sig,
                     encoding="jsonParsed",
                     commitment=Confirmed,
                     max_supported_transaction_version=0
                 )
-                if tx_response.value is not None:
-                    break
-                await asyncio.sleep(1)
+            if tx_response.value is not None:
+                break
+            await asyncio.sleep(1)
 
-            if tx_response.value is None:
-                print(f"Transaction not found: {signature}")
-                return False
-
-            tx = tx_response.value
-            meta = tx.transaction.meta
-
-            # Check if transaction was successful
-            if meta.err is not None:
-                print(f"Transaction failed with error: {meta.err}")
-                return False
+        if tx_response.value is None:
+            logger.info(f"Transaction not found: {signature}")
+            return None
 
-            # Get transaction details
-            instructions = tx.transaction.transaction.message.instructions
-
-            # Expected amount in token units (6 decimals for rUSD)
-            RUSD_DECIMALS = 6
-            expected_token_amount = int(expected_amount * (10 ** RUSD_DECIMALS))
-
-            # Verify transfer instruction
-            transfer_found = False
-            memo_found = memo is None  # If no memo required, skip check
-
-            for idx, instruction in enumerate(instructions):
-                # Check for SPL token transfer instruction
-                if hasattr(instruction, 'parsed'):
-                    parsed = instruction.parsed
-                    if isinstance(parsed, dict):
-                        info = parsed.get('info', {})
-                        instruction_type = parsed.get('type', '')
-
-                        # Check for SPL token transfer (type: "transfer" or "transferChecked")
-                        if instruction_type in ['transfer', 'transferChecked']:
-                            # Get token amount
-                            token_amount = info.get('amount')
-                            if isinstance(token_amount, str):
-                                token_amount = int(token_amount)
-
-                            # For transferChecked, amount is in 'tokenAmount'
-                            if instruction_type == 'transferChecked':
-                                token_amount_info = info.get('tokenAmount', {})
-                                token_amount = int(token_amount_info.get('amount', 0))
-
-                            print(f"Found SPL transfer: type={instruction_type}, amount={token_amount}, expected={expected_token_amount}")
-                            print(f"Transfer info: {info}")
-
-                            # Tolerance: allow 0.01 rUSD difference (10000 token units)
-                            tolerance = 10000
-                            if abs(token_amount - expected_token_amount) <= tolerance:
-                                transfer_found = True
-                                print(f"✓ Transfer amount verified: {token_amount} ~= {expected_token_amount}")
-                            else:
-                                print(f"✗ Amount mismatch: {token_amount} vs {expected_token_amount}")
-
-                # Check for memo instruction
-                if memo and hasattr(instruction, 'data'):
-                    try:
-                        instruction_data = str(instruction.data)
-                        if memo in instruction_data:
-                            memo_found = True
-                            print(f"Memo found: {memo}")
-                    except:
-                        pass
-
-            print(f"Verification result: transfer_found={transfer_found}, memo_found={memo_found}")
-            return transfer_found and memo_found
+        tx = tx_response.value
+        meta = tx.transaction.meta
+        if meta.err is not None:
+            return {"err": str(meta.err), "transfers": [], "memos": []}
 
-        except Exception as e:
-            print(f"Error verifying transaction: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+        return parse_transfers(tx.transaction.transaction.message.instructions)
 
     async def get_transaction_status(
         self,
         signature: str
     ) -> Optional[Dict[str, Any]]:
-        """Get the status of a transaction"""
+        """Get the status of a transaction (batched with other lookups on the next tick)"""
+        from solders.signature import Signature
+
         try:
-            sig = Signature.from_string(signature)
-            response = await self.client.get_signature_statuses([sig])
-
-            if response.value and len(response.value) > 0:
-                status = response.value[0]
-                if status:
-                    return {
-                        "confirmed": status.confirmation_status is not None,
-                        "confirmations": status.confirmations or 0,
-                        "err": status.err,
-                        "status": str(status.confirmation_status) if status.confirmation_status else "unknown"
-                    }
-            return None
+            Signature.from_string(signature)  # validate before queueing
+            return await self.status_tracker.get_status(signature)
         except Exception as e:
-            print(f"Error getting transaction status: {e}")
+            logger.warning(f"Error getting transaction status: {e}")
             return None
 
     async def wait_for_confirmation(
@@ -139,21 +344,18 @@ class SolanaPaymentVerifier:
         timeout: int = 60
     ) -> bool:
         """Wait for a transaction to be confirmed"""
-        try:
-            sig = Signature.from_string(signature)
-
-            for _ in range(timeout):
-                status = await self.get_transaction_status(signature)
-                if status and status.get("confirmed"):
-                    return status.get("err") is None
-                await asyncio.sleep(1)
+        from solders.signature import Signature
 
-            return False
+        try:
+            Signature.from_string(signature)  # validate before queueing
+            status = await self.status_tracker.wait_for_commit(signature, timeout=timeout)
+            return status is not None and status.get("err") is None
         except Exception:
             return False
 
     async def close(self):
         """Close the RPC client"""
+        await self.status_tracker.close()
         await self.client.close()
 
 
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Generic, List, Optional, Type, TypeVar
+import redis.asyncio as redis
+from sqlalchemy import DateTime, Numeric, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal, on_replica
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+
+    def get(self, key: Any) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Any) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Shared Redis client for cache layers
+_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis_client() -> redis.Redis:
+    """Get the Redis client shared by the cache layers"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(
+            settings.REDIS_URL,
+            encoding="utf-8",
+            decode_responses=True
+        )
+    return _redis_client
+
+
+def row_to_dict(obj: Any) -> Dict[str, Any]:
+    """Snapshot the column values of an ORM row"""
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode_row(data: Dict[str, Any]) -> str:
+    return json.dumps(data, default=_encode_value)
+
+
+def decode_row(model: Type, raw: str) -> Dict[str, Any]:
+    """Parse a row snapshot, restoring Numeric and DateTime column types"""
+    data = json.loads(raw)
+    for column in model.__table__.columns:
+        value = data.get(column.key)
+        if value is None:
+            continue
+        if isinstance(column.type, Numeric):
+            data[column.key] = Decimal(value)
+        elif isinstance(column.type, DateTime):
+            data[column.key] = datetime.fromisoformat(value)
+    return data
+
+
+class ModelCache(Generic[T]):
+    """
+    Read-through cache for ORM rows keyed by primary key.
+
+    Lookups go in-process LRU -> Redis -> database. Cached rows are returned as
+    fresh transient instances, so callers may read them freely but must load
+    the row from the database before modifying it. Invalidations are published
+    over Redis pub/sub so every worker drops its local copy, and anything
+    derived from the rows can follow along through on_invalidate().
+    """
+
+    def __init__(
+        self,
+        model: Type[T],
+        namespace: str,
+        local_ttl: float,
+        redis_ttl: int,
+        maxsize: int,
+    ):
+        self.model = model
+        self.namespace = namespace
+        self.redis_ttl = redis_ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        self.channel = f"cache:{namespace}:invalidate"
+        self._listener: Optional[asyncio.Task] = None
+        self._callbacks: List[Callable[[Optional[str]], None]] = []
+
+    def on_invalidate(self, callback: Callable[[Optional[str]], None]) -> None:
+        """
+        Call `callback(key)` whenever a key is invalidated, in this worker or
+        another one (key is None when every local copy is dropped)
+        """
+        self._callbacks.append(callback)
+
+    def _drop_local(self, key: Optional[str]) -> None:
+        if key is None:
+            self.local.clear()
+        else:
+            self.local.pop(key)
+        for callback in self._callbacks:
+            callback(key)
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    async def get(self, key: str, db: AsyncSession) -> Optional[T]:
+        """Return the row for `key`, or None if it does not exist"""
+        key = str(key)
+        data = self.local.get(key)
+
+        if data is None:
+            data = await self._get_from_redis(key)
+
+            if data is None:
+                data = await self._load(key, db)
+                if data is None:
+                    return None
+                await self._set_in_redis(key, data)
+
+            self.local.set(key, data)
+
+        return self.model(**data)
+
+    async def _load(self, key: str, db: AsyncSession) -> Optional[Dict[str, Any]]:
+        # Cached rows outlive any replica lag, so a row is never cached from
+        # a replica that may not have caught up with an invalidating write
+        if on_replica(db):
+            async with AsyncSessionLocal() as primary:
+                return await self._load(key, primary)
+
+        result = await db.execute(select(self.model).where(self.model.id == key))
+        row = result.scalar_one_or_none()
+        return row_to_dict(row) if row is not None else None
+
+    async def _get_from_redis(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await get_redis_client().get(self._key(key))
+        except redis.RedisError as e:
+            logger.warning(f"{self.namespace} cache read failed: {e}")
+            return None
+        return decode_row(self.model, raw) if raw else None
+
+    async def _set_in_redis(self, key: str, data: Dict[str, Any]) -> None:
+        try:
+            await get_redis_client().setex(self._key(key), self.redis_ttl, encode_row(data))
+        except redis.RedisError as e:
+            logger.warning(f"{self.namespace} cache write failed: {e}")
+
+    async def invalidate(self, key: str) -> None:
+        """Drop `key` here, in Redis, and in every other worker"""
+        key = str(key)
+        self._drop_local(key)
+        try:
+            client = get_redis_client()
+            await client.delete(self._key(key))
+            await client.publish(self.channel, key)
+        except redis.RedisError as e:
+            logger.warning(f"{self.namespace} cache invalidation failed: {e}")
+
+    async def _listen(self) -> None:
+        """Apply invalidations published by other workers"""
+        while True:
+            pubsub = get_redis_client().pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Anything published while we were disconnected is lost
+                self._drop_local(None)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._drop_local(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"{self.namespace} cache listener error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def start(self) -> None:
+        """Start listening for invalidations (called on startup)"""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        """Stop the invalidation listener (called on shutdown)"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+# Global robot cache instance
+robot_cache: Optional[ModelCache] = None
+
+
+def get_robot_cache() -> ModelCache:
+    """Get the global robot record cache"""
+    global robot_cache
+    if robot_cache is None:
+        from app.models.robot import Robot
+
+        robot_cache = ModelCache(
+            Robot,
+            namespace="robot",
+            local_ttl=settings.ROBOT_CACHE_TTL_SECONDS,
+            redis_ttl=settings.ROBOT_CACHE_REDIS_TTL_SECONDS,
+            maxsize=settings.ROBOT_CACHE_MAX_ENTRIES,
+        )
+    return robot_cache
+
+
+# Global user cache instance
+user_cache: Optional[ModelCache] = None
+
+
+def get_user_cache() -> ModelCache:
+    """Get the global user record cache"""
+    global user_cache
+    if user_cache is None:
+        from app.models.user import User
+
+        user_cache = ModelCache(
+            User,
+            namespace="user",
+            local_ttl=settings.USER_CACHE_TTL_SECONDS,
+            redis_ttl=settings.USER_CACHE_REDIS_TTL_SECONDS,
+            maxsize=settings.USER_CACHE_MAX_ENTRIES,
+        )
+    return user_cache
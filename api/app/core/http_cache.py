@@ -0,0 +1,133 @@
+import logging
+import time
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional
+import redis.asyncio as redis
+from fastapi import Request, Response
+from app.core.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+ROBOT_VERSION_PREFIX = "robot_version:"
+CATALOG_VERSION_KEY = "robot_version:catalog"
+# Bumped when image variants become available, which changes image URLs
+IMAGES_VERSION_KEY = "robot_version:images"
+
+# Catalog responses are per user session; clients must revalidate each time
+CATALOG_CACHE_CONTROL = "private, no-cache"
+
+# Version hashes {v, t}: bump the first ARGV[3] keys, create any missing key,
+# return every key's version and modification time. A new key starts at the
+# current time in milliseconds, so a key lost from Redis never reuses an
+# ETag handed out before. Each bump moves t forward by at least a second, so
+# two changes within one second still get distinct Last-Modified values.
+VERSION_SCRIPT = """
+local now, now_ms, bump = ARGV[1], ARGV[2], tonumber(ARGV[3])
+local result = {}
+for i, key in ipairs(KEYS) do
+    local created = redis.call('HSETNX', KEYS[i], 'v', now_ms) == 1
+    if created then
+        redis.call('HSET', KEYS[i], 't', now)
+    elseif i <= bump then
+        redis.call('HINCRBY', KEYS[i], 'v', 1)
+        local modified = tonumber(redis.call('HGET', KEYS[i], 't') or 0)
+        redis.call('HSET', KEYS[i], 't', math.max(tonumber(now), modified + 1))
+    end
+    local values = redis.call('HMGET', KEYS[i], 'v', 't')
+    table.insert(result, values[1])
+    table.insert(result, values[2])
+end
+return result
+"""
+
+
+@dataclass
+class Validators:
+    etag: str
+    last_modified: int  # epoch seconds
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": CATALOG_CACHE_CONTROL,
+        }
+
+    def matches(self, request: Request) -> bool:
+        """Whether the client's cached copy is current (If-None-Match, else If-Modified-Since)"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+
+class RobotVersions:
+    """
+    Version counters behind the robot catalog's HTTP validators.
+
+    Every robot has a counter, and the catalog as a whole has one. Writes
+    that change what GET /robots or GET /robots/{id} return bump them, and
+    the reads turn them into ETag / Last-Modified so a conditional request
+    can be answered with a 304 before the database is touched. If Redis is
+    unavailable, responses simply carry no validators.
+    """
+
+    def __init__(self):
+        self._script = None
+
+    async def _run(self, keys: List[str], bump: int) -> Optional[List[int]]:
+        client = get_redis_client()
+        if self._script is None:
+            self._script = client.register_script(VERSION_SCRIPT)
+        now = time.time()
+        try:
+            values = await self._script(keys=keys, args=[int(now), int(now * 1000), bump])
+        except redis.RedisError as e:
+            logger.warning(f"Robot version update failed: {e}")
+            return None
+        return [int(value) for value in values]
+
+    async def bump(self, *robot_ids: str) -> None:
+        """Record a change to these robots (and so to the catalog)"""
+        keys = [ROBOT_VERSION_PREFIX + str(robot_id) for robot_id in robot_ids]
+        await self._run(keys + [CATALOG_VERSION_KEY], bump=len(keys) + 1)
+
+    async def bump_images(self) -> None:
+        """Record that image variants changed what catalog image URLs point at"""
+        await self._run([IMAGES_VERSION_KEY], bump=1)
+
+    async def validators(self, robot_id: Optional[str] = None) -> Optional[Validators]:
+        """Validators for one robot, or for the catalog listing when robot_id is None"""
+        key = ROBOT_VERSION_PREFIX + str(robot_id) if robot_id else CATALOG_VERSION_KEY
+        values = await self._run([key, IMAGES_VERSION_KEY], bump=0)
+        if values is None:
+            return None
+        version, modified, images_version, images_modified = values
+        return Validators(
+            etag=f'"{robot_id or "catalog"}.{version}.{images_version}"',
+            last_modified=max(modified, images_modified),
+        )
+
+
+# Global robot version instance
+robot_versions: Optional[RobotVersions] = None
+
+
+def get_robot_versions() -> RobotVersions:
+    """Get the global robot version counters"""
+    global robot_versions
+    if robot_versions is None:
+        robot_versions = RobotVersions()
+    return robot_versions
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set
+from app.config import settings
+from app.core.http_cache import get_robot_versions
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = Path("uploads/robots")
+UPLOAD_URL = "/uploads/robots"
+
+# Variant name -> longest side in pixels (images are never upscaled)
+VARIANTS = {
+    "thumb": 160,
+    "card": 480,
+    "large": 1280,
+}
+# Variant file formats, in the order they are written; the catalog links the
+# WebP files, the JPEGs are there for clients without WebP support
+VARIANT_EXTENSIONS = (".webp", ".jpg")
+
+# Content-addressed originals: /uploads/robots/<sha256>.<ext>, optionally
+# behind the API origin the frontend prefixes
+STORED_URL = re.compile(r"^(?P<prefix>.*/uploads/robots/)(?P<digest>[0-9a-f]{64})\.(?:jpg|png|gif|webp)$")
+
+
+def variant_path(digest: str, variant: str, extension: str = ".webp") -> Path:
+    return UPLOAD_DIR / f"{digest}_{variant}{extension}"
+
+
+def last_variant_path(digest: str) -> Path:
+    """The variant written last; once it exists, all of them do"""
+    return variant_path(digest, list(VARIANTS)[-1], VARIANT_EXTENSIONS[-1])
+
+
+class VariantIndex:
+    """
+    Which stored images have their resized variants on disk.
+
+    Serializers ask from the event loop, so lookups never touch the disk:
+    the index is loaded once at startup and filled in as variant jobs
+    finish. An unknown image is checked in a thread in the background (at
+    most every `recheck_seconds`), which picks up variants made by other
+    workers; until then the caller keeps the original URL.
+    """
+
+    def __init__(self, recheck_seconds: float):
+        self.recheck_seconds = recheck_seconds
+        # Variants never change once written, so readiness is cached for good
+        self._ready: Set[str] = set()
+        self._checked: Dict[str, float] = {}
+        self._checking: Dict[str, asyncio.Task] = {}
+
+    async def load(self) -> None:
+        """Index the variants already on disk (called on startup)"""
+        try:
+            names = set(await asyncio.to_thread(os.listdir, UPLOAD_DIR))
+        except FileNotFoundError:
+            return
+        for name in names:
+            match = STORED_URL.match(f"{UPLOAD_URL}/{name}")
+            if match and last_variant_path(match["digest"]).name in names:
+                self._ready.add(match["digest"])
+        logger.info(f"Indexed image variants of {len(self._ready)} stored images")
+
+    def add(self, digest: str) -> None:
+        self._ready.add(digest)
+        self._checked.pop(digest, None)
+
+    def ready(self, digest: str) -> bool:
+        if digest in self._ready:
+            return True
+        self._check_later(digest)
+        return False
+
+    def _check_later(self, digest: str) -> None:
+        if digest in self._checking:
+            return
+        checked = self._checked.get(digest)
+        if checked is not None and time.monotonic() - checked < self.recheck_seconds:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # serialized outside the app; nothing to schedule on
+        self._checking[digest] = loop.create_task(self._check(digest))
+
+    async def check(self, digest: str) -> bool:
+        """Whether the variants exist, looking on disk if they are not indexed yet"""
+        if digest in self._ready:
+            return True
+        if await asyncio.to_thread(last_variant_path(digest).exists):
+            self.add(digest)
+            return True
+        return False
+
+    async def _check(self, digest: str) -> None:
+        try:
+            if await self.check(digest):
+                # Made by another worker: catalog image URLs change here now
+                await get_robot_versions().bump_images()
+            else:
+                self._checked[digest] = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Could not check image variants of {digest}: {e}")
+        finally:
+            self._checking.pop(digest, None)
+
+    def variant_url(self, image_url: Optional[str], variant: str) -> Optional[str]:
+        """
+        URL of a resized WebP variant of a stored image. Images stored
+        elsewhere, or whose variants are not ready yet, keep their URL.
+        """
+        match = STORED_URL.match(image_url) if image_url else None
+        if match is None or not self.ready(match["digest"]):
+            return image_url
+        return f"{match['prefix']}{match['digest']}_{variant}.webp"
+
+
+# Global variant index
+variant_index = VariantIndex(recheck_seconds=settings.IMAGE_VARIANT_RECHECK_SECONDS)
+
+
+def variant_url(image_url: Optional[str], variant: str) -> Optional[str]:
+    return variant_index.variant_url(image_url, variant)
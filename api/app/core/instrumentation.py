@@ -0,0 +1,123 @@
+import os
+import time
+from functools import wraps
+from typing import Callable
+from app.config import settings
+
+# With several uvicorn workers, each worker writes its samples to files in
+# this directory and /metrics merges them, so a scrape covers every worker
+# whichever one answers it. prometheus_client picks the storage when it is
+# imported, so the variable is exported first. The directory must be
+# emptied before the workers start (see the Dockerfile).
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = settings.PROMETHEUS_MULTIPROC_DIR
+    os.makedirs(settings.PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Buckets for calls that normally take well under a millisecond
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Robot control APIs may take up to ROBOT_HTTP_TIMEOUT
+ROBOT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ["method", "route", "status"],
+)
+REDIS_OPERATION_DURATION = Histogram(
+    "payment_session_redis_duration_seconds",
+    "Redis round trips of payment session operations",
+    ["operation"],
+    buckets=FAST_BUCKETS,
+)
+SOLANA_RPC_DURATION = Histogram(
+    "solana_rpc_duration_seconds",
+    "Solana RPC call latency",
+    ["method"],
+)
+SOLANA_RPC_RETRIES = Counter(
+    "solana_rpc_retries_total",
+    "Solana RPC calls repeated because the node had no result yet",
+    ["method"],
+)
+ROBOT_CALL_DURATION = Histogram(
+    "robot_call_duration_seconds",
+    "Robot control API call latency",
+    ["outcome"],
+    buckets=ROBOT_BUCKETS,
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a database connection from the pool",
+    ["pool"],
+    buckets=FAST_BUCKETS,
+)
+
+
+def timed(histogram: Histogram, *labels: str) -> Callable:
+    """Decorator recording the duration of an async function in `histogram`"""
+    child = histogram.labels(*labels)
+
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def render_metrics() -> bytes:
+    """Exposition of every metric, merged across workers in multiprocess mode"""
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+class MetricsMiddleware:
+    """
+    Records every HTTP request in HTTP_REQUEST_DURATION. Requests are
+    labelled with the matched route's path template (e.g.
+    /api/robots/{robot_id}), so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "other"
+            HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - start)
+
@@ -0,0 +1,33 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Opaque keyset cursor pointing just after (created_at, id)"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def after_cursor(created_at_column, id_column, cursor: str):
+    """
+    WHERE clause for the next page of a (created_at DESC, id DESC) ordering.
+    Written as OR/AND rather than a row-value comparison so it works on
+    every backend we run on.
+    """
+    created_at, row_id = decode_cursor(cursor)
+    return or_(
+        created_at_column < created_at,
+        and_(created_at_column == created_at, id_column < row_id),
+    )
@@ -0,0 +1,105 @@
+import logging
+from typing import Optional
+import redis.asyncio as redis
+from app.config import settings
+from app.core.cache import get_redis_client
+from app.core.security import decode_token
+from app.database import read_from_primary
+
+logger = logging.getLogger(__name__)
+
+STICKY_PREFIX = "db_primary:"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReadRouting:
+    """
+    Read-your-writes for replica reads.
+
+    After a user writes, their read-only requests go to the primary for
+    `sticky_seconds`, long enough for the replica to catch up. The marker
+    lives in Redis so it holds across workers; if Redis is unavailable,
+    reads go to the primary.
+    """
+
+    def __init__(self, sticky_seconds: int):
+        self.sticky_seconds = sticky_seconds
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.DATABASE_READ_REPLICA_URL)
+
+    async def wrote(self, user_id: str) -> None:
+        """Record a write by this user (no-op without a replica)"""
+        if not self.enabled:
+            return
+        try:
+            await get_redis_client().set(STICKY_PREFIX + str(user_id), 1, ex=self.sticky_seconds)
+        except redis.RedisError as e:
+            logger.warning(f"Read routing update failed: {e}")
+
+    async def recently_wrote(self, user_id: str) -> bool:
+        try:
+            return bool(await get_redis_client().exists(STICKY_PREFIX + str(user_id)))
+        except redis.RedisError as e:
+            logger.warning(f"Read routing lookup failed: {e}")
+            return True
+
+
+class ReadRoutingMiddleware:
+    """
+    Sends an authenticated user's reads to the primary while they are sticky
+    (see ReadRouting), and makes them sticky after a successful request
+    with an unsafe method. Only installed when a replica is configured.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        user_id = self._user_id(scope)
+        if user_id is None:
+            return await self.app(scope, receive, send)
+
+        routing = get_read_routing()
+        token = read_from_primary.set(await routing.recently_wrote(user_id))
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            read_from_primary.reset(token)
+            if scope["method"] not in SAFE_METHODS and status < 400:
+                await routing.wrote(user_id)
+
+    @staticmethod
+    def _user_id(scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, credentials = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer" or not credentials:
+                    return None
+                payload = decode_token(credentials)
+                return payload.get("sub") if payload else None
+        return None
+
+
+# Global read routing instance
+read_routing: Optional[ReadRouting] = None
+
+
+def get_read_routing() -> ReadRouting:
+    """Get the global read routing"""
+    global read_routing
+    if read_routing is None:
+        read_routing = ReadRouting(settings.DATABASE_READ_STICKY_SECONDS)
+    return read_routing
@@ -1,18 +1,21 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from solders.pubkey import Pubkey
-from solders.signature import Signature
-import base58
 from app.config import settings
 from app.database import get_db
+from app.core.cache import TTLCache, get_user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/wallet-login")
 
+# Decoded payloads of recently seen tokens; entries never outlive the token's exp
+_token_cache = TTLCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL_SECONDS
+)
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
@@ -23,18 +26,33 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode.update({"exp": expire})
+    from jose import jwt
+
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
 def decode_token(token: str) -> Optional[dict]:
-    """Decode a JWT token"""
+    """Decode a JWT token (cached until the token expires)"""
+    payload = _token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
 
+    exp = payload.get("exp")
+    if exp is not None:
+        remaining = float(exp) - time.time()
+        if remaining > 0:
+            _token_cache.set(token, payload, ttl=min(remaining, settings.AUTH_TOKEN_CACHE_TTL_SECONDS))
+
+    return payload
+
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -55,11 +73,7 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
 
-    # Import here to avoid circular imports
-    from app.models.user import User
-
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await get_user_cache().get(user_id, db)
 
     if user is None:
         raise credentials_exception
@@ -67,8 +81,17 @@ async def get_current_user(
     return user
 
 
+async def invalidate_user(user_id: str) -> None:
+    """Drop a cached user record; call after changing a user's role or balance"""
+    await get_user_cache().invalidate(user_id)
+
+
 def verify_wallet_signature(wallet_address: str, message: str, signature: str) -> bool:
     """Verify a Solana wallet signature"""
+    import base58
+    from solders.pubkey import Pubkey
+    from solders.signature import Signature
+
     try:
         # Convert wallet address to Pubkey
         pubkey = Pubkey.from_string(wallet_address)
@@ -0,0 +1,31 @@
+from typing import Any, Dict, Optional, Type
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+
+# Default response class for the app: dict responses are dumped with orjson
+# instead of the stdlib json module
+DefaultResponse = ORJSONResponse
+
+
+def render(
+    schema: Type[BaseModel],
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+    context: Optional[Dict[str, Any]] = None,
+) -> Response:
+    """
+    Validate `content` (a dict or ORM object) against `schema` and write it
+    straight to JSON bytes with the schema's compiled pydantic-core
+    serializer. This skips FastAPI's response_model round trip (validate,
+    dump to Python objects, encode again), so hot routes return a Response
+    from here while keeping response_model for the OpenAPI docs.
+    `context` is handed to the schema's field serializers.
+    """
+    model = schema.model_validate(content, from_attributes=True)
+    return Response(
+        content=schema.__pydantic_serializer__.to_json(model, context=context),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
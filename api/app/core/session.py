@@ -1,11 +1,104 @@
 import json
 import redis.asyncio as redis
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel
 from app.config import settings
+from app.core.instrumentation import REDIS_OPERATION_DURATION, timed
 import uuid
 
+# Open sessions per recipient wallet, scored by expiry (read by the payment indexer)
+PENDING_INDEX_PREFIX = "pending_sessions:"
+PENDING_RECIPIENTS_KEY = "pending_recipients"
+# Open sessions per user, scored by expiry (bounds sessions per user)
+USER_OPEN_PREFIX = "user_open_sessions:"
+# user/robot/rental plan -> id of the pending session to hand out again
+REUSE_INDEX_PREFIX = "pending_session:"
+
+# Drop expired entries from a recipient's pending index and return the rest;
+# forget the recipient once nothing is pending for it
+PENDING_SESSIONS_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local ids = redis.call('ZRANGE', KEYS[1], 0, -1)
+if #ids == 0 then
+    redis.call('SREM', KEYS[2], ARGV[2])
+end
+return ids
+"""
+
+# Execute-path admission in one round trip. A paid, unexpired presented
+# session is returned as is; otherwise the robot lock is checked and, unless
+# another user holds it, the user's open session for the same robot and
+# rental plan is reused (same amount and recipient, enough time left to pay)
+# or a new pending session is stored and indexed, up to ARGV[9] open
+# sessions per user. Sessions still in the old JSON-string format are
+# reported as 'legacy'. The reused session key is read from the reuse
+# index, which assumes a single (non-cluster) Redis.
+ADMIT_SCRIPT = """
+local kind = redis.call('TYPE', KEYS[1])['ok']
+if kind == 'string' then
+    return {'legacy'}
+end
+if kind == 'hash' then
+    local state = redis.call('HMGET', KEYS[1], 'status', 'expires_at')
+    if state[1] == 'paid' and tonumber(state[2]) > tonumber(ARGV[2]) then
+        return {'paid', redis.call('HGETALL', KEYS[1])}
+    end
+end
+local lock = redis.call('GET', KEYS[2])
+if lock then
+    local ok, info = pcall(cjson.decode, lock)
+    if ok and tostring(info['user_id']) ~= ARGV[1] then
+        return {'locked', lock, redis.call('TTL', KEYS[2])}
+    end
+end
+local reuse_id = redis.call('GET', KEYS[6])
+if reuse_id then
+    local reuse_key = 'session:' .. reuse_id
+    local state = redis.call('HMGET', reuse_key, 'status', 'expires_at', 'amount', 'recipient_address')
+    if state[1] == 'pending' and state[3] == ARGV[7] and state[4] == ARGV[6]
+            and tonumber(state[2]) - tonumber(ARGV[2]) >= tonumber(ARGV[8]) then
+        return {'reused', reuse_id, redis.call('HGETALL', reuse_key)}
+    end
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[7], '-inf', ARGV[2])
+if redis.call('ZCARD', KEYS[7]) >= tonumber(ARGV[9]) then
+    return {'capped'}
+end
+redis.call('HSET', KEYS[3], unpack(ARGV, 10))
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+redis.call('ZADD', KEYS[4], ARGV[4], ARGV[5])
+redis.call('EXPIRE', KEYS[4], ARGV[3])
+redis.call('SADD', KEYS[5], ARGV[6])
+redis.call('SET', KEYS[6], ARGV[5], 'EX', ARGV[3])
+redis.call('ZADD', KEYS[7], ARGV[4], ARGV[5])
+redis.call('EXPIRE', KEYS[7], ARGV[3])
+return {'created'}
+"""
+
+# Field-level paid transition; the key keeps its TTL and is never recreated
+MARK_PAID_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {}
+end
+redis.call('HSET', KEYS[1], 'status', 'paid', 'tx_signature', ARGV[1], 'paid_at', ARGV[2])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# Delete a robot lock only if it is held by the given user
+UNLOCK_SCRIPT = """
+local lock = redis.call('GET', KEYS[1])
+if not lock then
+    return 1
+end
+local ok, info = pcall(cjson.decode, lock)
+if ok and tostring(info['user_id']) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return 0
+"""
+
 
 class PaymentSession(BaseModel):
     id: str
@@ -22,92 +115,311 @@ class PaymentSession(BaseModel):
     paid_at: Optional[datetime] = None
 
 
+class ExecutionAdmission(BaseModel):
+    """Outcome of admit_execution"""
+    outcome: str  # paid | locked | reused | created | capped
+    session: Optional[PaymentSession] = None  # the paid, reused or newly created session
+    lock_info: Optional[dict] = None  # set when locked by another user
+    lock_ttl: Optional[int] = None
+
+
+def _to_epoch(value: datetime) -> float:
+    """Naive UTC datetime -> epoch seconds"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _from_epoch(value: str) -> datetime:
+    return datetime.fromtimestamp(float(value), tz=timezone.utc).replace(tzinfo=None)
+
+
+def encode_session(session: PaymentSession) -> Dict[str, str]:
+    """
+    Flat Redis hash fields for a session. The id lives in the key, times are
+    epoch seconds and unset optional fields are omitted. Redis keeps such a
+    hash in its compact listpack encoding as long as every value fits in
+    hash-max-listpack-value (64 bytes by default; large service payloads
+    exceed it).
+    """
+    fields = {
+        "user_id": session.user_id,
+        "robot_id": session.robot_id,
+        "amount": repr(session.amount),
+        "currency": session.currency,
+        "recipient_address": session.recipient_address,
+        "status": session.status,
+        "service_payload": json.dumps(session.service_payload, separators=(",", ":")),
+        "created_at": repr(_to_epoch(session.created_at)),
+        "expires_at": repr(_to_epoch(session.expires_at)),
+    }
+    if session.tx_signature:
+        fields["tx_signature"] = session.tx_signature
+    if session.paid_at:
+        fields["paid_at"] = repr(_to_epoch(session.paid_at))
+    return fields
+
+
+def decode_session(session_id: str, fields: Dict[str, str]) -> PaymentSession:
+    """Inverse of encode_session; a session past expires_at reads as expired"""
+    session = PaymentSession(
+        id=session_id,
+        user_id=fields["user_id"],
+        robot_id=fields["robot_id"],
+        amount=float(fields["amount"]),
+        currency=fields.get("currency", "rUSD"),
+        recipient_address=fields["recipient_address"],
+        status=fields.get("status", "pending"),
+        tx_signature=fields.get("tx_signature"),
+        service_payload=json.loads(fields.get("service_payload") or "{}"),
+        created_at=_from_epoch(fields["created_at"]),
+        expires_at=_from_epoch(fields["expires_at"]),
+        paid_at=_from_epoch(fields["paid_at"]) if fields.get("paid_at") else None,
+    )
+    if datetime.utcnow() > session.expires_at:
+        session.status = "expired"
+    return session
+
+
+def reuse_key(user_id: str, robot_id: str, service_payload: dict) -> str:
+    plan = service_payload.get("rental_plan_index") if service_payload else None
+    return f"{REUSE_INDEX_PREFIX}{user_id}:{robot_id}:{'base' if plan is None else plan}"
+
+
+def _pairs(flat: List[str]) -> Dict[str, str]:
+    return dict(zip(flat[::2], flat[1::2]))
+
+
 class PaymentSessionManager:
+    """
+    Payment sessions live in Redis hashes (session:<id>), so callers can read
+    single fields such as status. Expiry is derived from expires_at on read;
+    nothing is written back, and the key's TTL is never extended. Each
+    operation's Redis time is recorded in REDIS_OPERATION_DURATION.
+    """
+
     def __init__(self, redis_url: str):
         self.redis_client = redis.from_url(
             redis_url,
             encoding="utf-8",
             decode_responses=True
         )
+        self._pending_sessions = None
+        self._admit = None
+        self._unlock = None
+        self._mark_paid = None
 
-    async def create_session(
-        self,
+    @staticmethod
+    def _new_session(
         user_id: str,
         robot_id: str,
         amount: float,
         recipient_address: str,
         service_payload: dict,
     ) -> PaymentSession:
-        """Create a new payment session"""
-        session_id = str(uuid.uuid4())
         now = datetime.utcnow()
-        expires_at = now + timedelta(minutes=settings.SESSION_EXPIRE_MINUTES)
-
-        session = PaymentSession(
-            id=session_id,
+        return PaymentSession(
+            id=str(uuid.uuid4()),
             user_id=user_id,
             robot_id=robot_id,
             amount=amount,
             recipient_address=recipient_address,
             service_payload=service_payload,
             created_at=now,
-            expires_at=expires_at,
+            expires_at=now + timedelta(minutes=settings.SESSION_EXPIRE_MINUTES),
         )
 
-        # Store in Redis with TTL
-        await self.redis_client.setex(
-            f"session:{session_id}",
-            settings.SESSION_EXPIRE_MINUTES * 60,
-            session.model_dump_json(),
-        )
-
-        return session
+    @timed(REDIS_OPERATION_DURATION, "admit_execution")
+    async def admit_execution(
+        self,
+        session_id: Optional[str],
+        user_id: str,
+        robot_id: str,
+        amount: float,
+        recipient_address: str,
+        service_payload: dict,
+    ) -> ExecutionAdmission:
+        """
+        Decide an execute request in one atomic Redis call: return the
+        presented session if it is paid, report the lock holder if another
+        user has the robot, hand out the user's open session for this robot
+        and rental plan again, or else create a new pending session (unless
+        the user already has MAX_OPEN_SESSIONS_PER_USER open).
+        The caller still checks that a paid session belongs to the user
+        and robot.
+        """
+        if self._admit is None:
+            self._admit = self.redis_client.register_script(ADMIT_SCRIPT)
 
+        session = self._new_session(user_id, robot_id, amount, recipient_address, service_payload)
+        keys = [
+            f"session:{session_id or ''}",
+            f"robot_lock:{robot_id}",
+            f"session:{session.id}",
+            f"{PENDING_INDEX_PREFIX}{recipient_address}",
+            PENDING_RECIPIENTS_KEY,
+            reuse_key(user_id, robot_id, service_payload),
+            f"{USER_OPEN_PREFIX}{user_id}",
+        ]
+        fields = encode_session(session)
+        args = [
+            user_id,
+            _to_epoch(datetime.utcnow()),
+            settings.SESSION_EXPIRE_MINUTES * 60,
+            _to_epoch(session.expires_at),
+            session.id,
+            recipient_address,
+            fields["amount"],
+            settings.SESSION_REUSE_MIN_REMAINING_SECONDS,
+            settings.MAX_OPEN_SESSIONS_PER_USER,
+        ]
+        for field, value in fields.items():
+            args.extend((field, value))
+
+        result = await self._admit(keys=keys, args=args)
+        if result[0] == "legacy":
+            await self._migrate_legacy(session_id)
+            result = await self._admit(keys=keys, args=args)
+
+        outcome = result[0]
+        if outcome == "paid":
+            return ExecutionAdmission(outcome=outcome, session=decode_session(session_id, _pairs(result[1])))
+        if outcome == "locked":
+            return ExecutionAdmission(
+                outcome=outcome,
+                lock_info=json.loads(result[1]),
+                lock_ttl=result[2] if result[2] > 0 else None
+            )
+        if outcome == "reused":
+            return ExecutionAdmission(outcome=outcome, session=decode_session(result[1], _pairs(result[2])))
+        if outcome == "capped":
+            return ExecutionAdmission(outcome=outcome)
+        return ExecutionAdmission(outcome=outcome, session=session)
+
+    @timed(REDIS_OPERATION_DURATION, "get_session")
     async def get_session(self, session_id: str) -> Optional[PaymentSession]:
         """Retrieve a payment session"""
-        data = await self.redis_client.get(f"session:{session_id}")
-        if not data:
+        try:
+            fields = await self.redis_client.hgetall(f"session:{session_id}")
+        except redis.ResponseError:
+            fields = await self._migrate_legacy(session_id)
+        if not fields:
             return None
+        return decode_session(session_id, fields)
 
-        session = PaymentSession.model_validate_json(data)
-
-        # Check if expired
-        if datetime.utcnow() > session.expires_at:
-            session.status = "expired"
-            await self.update_session(session)
-
-        return session
-
-    async def update_session(self, session: PaymentSession) -> None:
-        """Update an existing session"""
-        await self.redis_client.setex(
-            f"session:{session.id}",
-            settings.SESSION_EXPIRE_MINUTES * 60,
-            session.model_dump_json(),
-        )
+    @timed(REDIS_OPERATION_DURATION, "get_session_status")
+    async def get_session_status(self, session_id: str) -> Optional[str]:
+        """Status of a session, with expiry derived from expires_at"""
+        values = await self.redis_client.hmget(f"session:{session_id}", ["status", "expires_at"])
+        if values[1] is None:
+            return None
+        if datetime.utcnow() > _from_epoch(values[1]):
+            return "expired"
+        return values[0]
 
+    @timed(REDIS_OPERATION_DURATION, "mark_paid")
     async def mark_paid(
         self,
         session_id: str,
-        tx_signature: str
+        tx_signature: str,
+        paid_at: Optional[datetime] = None
     ) -> Optional[PaymentSession]:
-        """Mark a session as paid"""
-        session = await self.get_session(session_id)
-        if not session:
-            return None
+        """Mark a session as paid (at `paid_at`, default now)"""
+        if self._mark_paid is None:
+            self._mark_paid = self.redis_client.register_script(MARK_PAID_SCRIPT)
 
-        session.status = "paid"
-        session.tx_signature = tx_signature
-        session.paid_at = datetime.utcnow()
+        key = f"session:{session_id}"
+        args = [tx_signature, repr(_to_epoch(paid_at or datetime.utcnow()))]
+        try:
+            fields = await self._mark_paid(keys=[key], args=args)
+        except redis.ResponseError:
+            await self._migrate_legacy(session_id)
+            fields = await self._mark_paid(keys=[key], args=args)
+        if not fields:
+            return None
 
-        await self.update_session(session)
+        session = decode_session(session_id, _pairs(fields))
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zrem(f"{PENDING_INDEX_PREFIX}{session.recipient_address}", session_id)
+        pipe.zrem(f"{USER_OPEN_PREFIX}{session.user_id}", session_id)
+        await pipe.execute()
         return session
 
+    async def _migrate_legacy(self, session_id: Optional[str]) -> Dict[str, str]:
+        """Rewrite a session stored as a JSON string (older format) as a hash, keeping its TTL"""
+        key = f"session:{session_id}"
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.get(key)
+        pipe.pttl(key)
+        try:
+            data, pttl = await pipe.execute()
+        except redis.ResponseError:
+            # Already migrated by a concurrent caller
+            return await self.redis_client.hgetall(key)
+        if not data:
+            return {}
+
+        fields = encode_session(PaymentSession.model_validate_json(data))
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.hset(key, mapping=fields)
+        if pttl > 0:
+            pipe.pexpire(key, pttl)
+        await pipe.execute()
+        return fields
+
+    @timed(REDIS_OPERATION_DURATION, "claim_settlement")
+    async def claim_settlement(self, session_id: str) -> bool:
+        """
+        Claim the right to settle a session. Only the first caller (the
+        verify endpoint or the payment indexer) gets True.
+        """
+        result = await self.redis_client.set(
+            f"session_settle:{session_id}",
+            "1",
+            nx=True,
+            ex=settings.SESSION_EXPIRE_MINUTES * 60
+        )
+        return result is not None
+
+    @timed(REDIS_OPERATION_DURATION, "release_settlement")
+    async def release_settlement(self, session_id: str) -> None:
+        """Give up a settlement claim after settling failed, so it can be retried"""
+        await self.redis_client.delete(f"session_settle:{session_id}")
+
+    @timed(REDIS_OPERATION_DURATION, "get_pending_recipients")
+    async def get_pending_recipients(self) -> List[str]:
+        """Recipient wallets with at least one open session"""
+        return list(await self.redis_client.smembers(PENDING_RECIPIENTS_KEY))
+
+    @timed(REDIS_OPERATION_DURATION, "get_pending_sessions")
+    async def get_pending_sessions(self, recipient_address: str) -> List[PaymentSession]:
+        """Unexpired, unpaid sessions waiting for a transfer to `recipient_address`"""
+        if self._pending_sessions is None:
+            self._pending_sessions = self.redis_client.register_script(PENDING_SESSIONS_SCRIPT)
+
+        session_ids = await self._pending_sessions(
+            keys=[f"{PENDING_INDEX_PREFIX}{recipient_address}", PENDING_RECIPIENTS_KEY],
+            args=[_to_epoch(datetime.utcnow()), recipient_address]
+        )
+        if not session_ids:
+            return []
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for sid in session_ids:
+            pipe.hgetall(f"session:{sid}")
+
+        sessions = []
+        for sid, fields in zip(session_ids, await pipe.execute(raise_on_error=False)):
+            if fields and isinstance(fields, dict):
+                session = decode_session(sid, fields)
+                if session.status == "pending":
+                    sessions.append(session)
+        return sessions
+
     async def is_session_paid(self, session_id: str) -> bool:
         """Check if a session has been paid"""
-        session = await self.get_session(session_id)
-        return session is not None and session.status == "paid"
+        return await self.get_session_status(session_id) == "paid"
 
+    @timed(REDIS_OPERATION_DURATION, "delete_session")
     async def delete_session(self, session_id: str) -> None:
         """Delete a session"""
         await self.redis_client.delete(f"session:{session_id}")
@@ -117,6 +429,7 @@ class PaymentSessionManager:
         # Redis TTL handles this automatically
         pass
 
+    @timed(REDIS_OPERATION_DURATION, "lock_robot")
     async def lock_robot(self, robot_id: str, user_id: str, duration_minutes: int) -> bool:
         """
         Lock a robot for exclusive use by a user
@@ -141,12 +454,14 @@ class PaymentSessionManager:
 
         return result is not None
 
+    @timed(REDIS_OPERATION_DURATION, "is_robot_locked")
     async def is_robot_locked(self, robot_id: str) -> bool:
         """Check if a robot is currently locked"""
         lock_key = f"robot_lock:{robot_id}"
         lock_data = await self.redis_client.get(lock_key)
         return lock_data is not None
 
+    @timed(REDIS_OPERATION_DURATION, "get_robot_lock_info")
     async def get_robot_lock_info(self, robot_id: str) -> Optional[dict]:
         """Get information about who has the robot locked"""
         lock_key = f"robot_lock:{robot_id}"
@@ -160,24 +475,39 @@ class PaymentSessionManager:
         except:
             return None
 
+    @timed(REDIS_OPERATION_DURATION, "unlock_robot")
     async def unlock_robot(self, robot_id: str, user_id: str) -> bool:
         """
         Unlock a robot (only if locked by the same user)
         Returns True if unlocked successfully
         """
-        lock_info = await self.get_robot_lock_info(robot_id)
+        if self._unlock is None:
+            self._unlock = self.redis_client.register_script(UNLOCK_SCRIPT)
+
+        # Compare-and-delete in one step, so a lock re-acquired by someone
+        # else in between is never removed
+        result = await self._unlock(keys=[f"robot_lock:{robot_id}"], args=[str(user_id)])
+        return result == 1
 
-        if not lock_info:
-            return True  # Already unlocked
+    @timed(REDIS_OPERATION_DURATION, "get_robot_lock_state")
+    async def get_robot_lock_state(self, robot_id: str) -> Tuple[Optional[dict], Optional[int]]:
+        """Lock info and remaining seconds for a robot in one round trip ((None, None) if unlocked)"""
+        lock_key = f"robot_lock:{robot_id}"
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.get(lock_key)
+        pipe.ttl(lock_key)
+        lock_data, ttl = await pipe.execute()
 
-        # Only unlock if same user
-        if lock_info.get("user_id") == user_id:
-            lock_key = f"robot_lock:{robot_id}"
-            await self.redis_client.delete(lock_key)
-            return True
+        if not lock_data:
+            return None, None
 
-        return False
+        try:
+            lock_info = json.loads(lock_data)
+        except ValueError:
+            lock_info = {}
+        return lock_info, ttl if ttl > 0 else None
 
+    @timed(REDIS_OPERATION_DURATION, "get_robot_ttl")
     async def get_robot_ttl(self, robot_id: str) -> Optional[int]:
         """Get remaining time (in seconds) for robot lock"""
         lock_key = f"robot_lock:{robot_id}"
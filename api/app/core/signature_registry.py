@@ -0,0 +1,117 @@
+import json
+import logging
+from typing import Any, Dict, Optional
+import redis.asyncio as redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.core.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Release a consumed signature only if it still belongs to the given session
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SignatureRegistry:
+    """
+    Redis-backed registry of payment transaction signatures.
+
+    - tx:consumed:<sig> -> id of the session the signature paid for. Set once
+      with SET NX, so a signature can never pay for two sessions.
+    - tx:parsed:<sig>   -> parsed transfer/memo data of a confirmed
+      transaction, so re-verifying it needs no RPC call.
+    """
+
+    def __init__(self, consumed_ttl: int, parsed_ttl: int):
+        self.consumed_ttl = consumed_ttl
+        self.parsed_ttl = parsed_ttl
+        self._release = None
+
+    @staticmethod
+    def _consumed_key(signature: str) -> str:
+        return f"tx:consumed:{signature}"
+
+    @staticmethod
+    def _parsed_key(signature: str) -> str:
+        return f"tx:parsed:{signature}"
+
+    async def consumed_by(self, signature: str, db: AsyncSession) -> Optional[str]:
+        """Session id the signature already paid for, if any"""
+        try:
+            session_id = await get_redis_client().get(self._consumed_key(signature))
+            if session_id:
+                return session_id
+        except redis.RedisError as e:
+            logger.warning(f"Signature registry read failed: {e}")
+
+        # Redis is the fast path; the payment history is the source of truth
+        from app.models.payment import PaymentSessionDB
+
+        result = await db.execute(
+            select(PaymentSessionDB.id).where(PaymentSessionDB.tx_signature == signature).limit(1)
+        )
+        session_id = result.scalar_one_or_none()
+        if session_id:
+            await self.consume(signature, session_id)
+        return session_id
+
+    async def consume(self, signature: str, session_id: str) -> bool:
+        """
+        Claim `signature` for `session_id`. Returns False if it already paid
+        for a different session.
+        """
+        client = get_redis_client()
+        key = self._consumed_key(signature)
+        try:
+            if await client.set(key, session_id, nx=True, ex=self.consumed_ttl or None):
+                return True
+            return await client.get(key) == session_id
+        except redis.RedisError as e:
+            # Without Redis we fall back to the database check in consumed_by
+            logger.warning(f"Signature registry write failed: {e}")
+            return True
+
+    async def release(self, signature: str, session_id: str) -> None:
+        """Undo consume() when the session could not be settled"""
+        try:
+            client = get_redis_client()
+            if self._release is None:
+                self._release = client.register_script(RELEASE_SCRIPT)
+            await self._release(keys=[self._consumed_key(signature)], args=[session_id])
+        except redis.RedisError as e:
+            logger.warning(f"Signature registry release failed: {e}")
+
+    async def get_parsed(self, signature: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await get_redis_client().get(self._parsed_key(signature))
+        except redis.RedisError as e:
+            logger.warning(f"Parsed transaction cache read failed: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    async def set_parsed(self, signature: str, parsed: Dict[str, Any]) -> None:
+        try:
+            await get_redis_client().setex(self._parsed_key(signature), self.parsed_ttl, json.dumps(parsed))
+        except redis.RedisError as e:
+            logger.warning(f"Parsed transaction cache write failed: {e}")
+
+
+# Global registry instance
+signature_registry: Optional[SignatureRegistry] = None
+
+
+def get_signature_registry() -> SignatureRegistry:
+    """Get the global signature registry"""
+    global signature_registry
+    if signature_registry is None:
+        signature_registry = SignatureRegistry(
+            consumed_ttl=settings.TX_CONSUMED_TTL_SECONDS,
+            parsed_ttl=settings.TX_PARSED_CACHE_TTL_SECONDS,
+        )
+    return signature_registry
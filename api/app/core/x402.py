@@ -38,52 +38,47 @@ def generate_x402_response(
     recipient_address: str,
     service: str,
     session_id: Optional[str] = None,
+    expires_at: Optional[datetime] = None,
 ) -> Response:
     """
     Generate a standard HTTP 402 Payment Required response
-    following the x402 protocol specification.
+    following the x402 protocol specification. Pass the session's
+    `expires_at` so a reused session advertises its real deadline.
     """
     if not session_id:
         session_id = str(uuid.uuid4())
 
-    expires_at = datetime.utcnow() + timedelta(minutes=settings.SESSION_EXPIRE_MINUTES)
+    if expires_at is None:
+        expires_at = datetime.utcnow() + timedelta(minutes=settings.SESSION_EXPIRE_MINUTES)
 
-    payment_data = X402PaymentData(
+    network = f"solana-{settings.SOLANA_NETWORK}"
+
+    # Values come from our own session, so the body is built without
+    # validation and dumped by the model's compiled serializer
+    response_body = X402ResponseBody.model_construct(
         session_id=session_id,
         amount=amount,
         currency="rUSD",
-        network=f"solana-{settings.SOLANA_NETWORK}",
+        network=network,
         recipient=recipient_address,
+        expires_at=expires_at,
         service=service,
         robot_id=robot_id,
-        expires_at=expires_at,
-        memo=session_id,  # Use session_id as memo for verification
-    )
-
-    response_body = X402ResponseBody(
-        session_id=payment_data.session_id,
-        amount=payment_data.amount,
-        currency=payment_data.currency,
-        network=payment_data.network,
-        recipient=payment_data.recipient,
-        expires_at=payment_data.expires_at,
-        service=payment_data.service,
-        robot_id=payment_data.robot_id,
     )
 
     headers = {
         "X-Payment-Required": "true",
-        "X-Payment-Amount": str(payment_data.amount),
-        "X-Payment-Currency": payment_data.currency,
-        "X-Payment-Network": payment_data.network,
-        "X-Payment-Address": payment_data.recipient,
-        "X-Session-ID": payment_data.session_id,
-        "X-Payment-Memo": payment_data.memo,
-        "X-Expires-At": payment_data.expires_at.isoformat(),
+        "X-Payment-Amount": str(amount),
+        "X-Payment-Currency": "rUSD",
+        "X-Payment-Network": network,
+        "X-Payment-Address": recipient_address,
+        "X-Session-ID": session_id,
+        "X-Payment-Memo": session_id,  # Use session_id as memo for verification
+        "X-Expires-At": expires_at.isoformat(),
     }
 
     return Response(
-        content=response_body.model_dump_json(),
+        content=X402ResponseBody.__pydantic_serializer__.to_json(response_body),
         status_code=402,
         headers=headers,
         media_type="application/json",
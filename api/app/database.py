@@ -1,39 +1,211 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+from app.core.instrumentation import DB_POOL_CHECKOUT_WAIT
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, List, Optional
 import asyncio
 import logging
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
-# Ensure database directory exists
-db_path = settings.DATABASE_URL.replace('sqlite+aiosqlite:///', '')
-db_dir = os.path.dirname(db_path)
-if db_dir and not os.path.exists(db_dir):
-    os.makedirs(db_dir, exist_ok=True)
-    logger.info(f"Created database directory: {db_dir}")
-
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    future=True,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
-
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+_writer_engine: Optional[AsyncEngine] = None
+_writer_sessionmaker: Optional[async_sessionmaker] = None
+_replica_engine: Optional[AsyncEngine] = None
+_replica_sessionmaker: Optional[async_sessionmaker] = None
+
+# Set per request by the read routing middleware (app.core.read_routing)
+# when the user wrote recently and must read from the primary
+read_from_primary: ContextVar[bool] = ContextVar("read_from_primary", default=False)
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def sqlite_pragmas() -> List[str]:
+    """Per-connection settings of the SQLite profile"""
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_BYTES}",
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",  # negative = KiB
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits for a connection"""
+    label = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.label).observe(time.perf_counter() - start)
+
+
+def timed_pool(label: str) -> type:
+    return type(f"TimedQueuePool_{label}", (TimedQueuePool,), {"label": label})
+
+
+def build_engine(url: str, writer: bool = False, label: str = "primary") -> AsyncEngine:
+    """
+    Engine for `url`. SQLite connections get the pragmas above; a writer
+    engine holds a single connection whose transactions start with BEGIN
+    IMMEDIATE, so it takes the write lock up front instead of failing to
+    upgrade a read lock halfway through.
+    """
+    if not is_sqlite(url):
+        return create_async_engine(url, echo=False, future=True, poolclass=timed_pool(label))
+
+    # Ensure database directory exists
+    db_path = url.replace('sqlite+aiosqlite:///', '')
+    db_dir = os.path.dirname(db_path)
+    if db_dir and not os.path.exists(db_dir):
+        os.makedirs(db_dir, exist_ok=True)
+        logger.info(f"Created database directory: {db_dir}")
+
+    # Pooled rather than the driver default (a new connection per session),
+    # so connections keep their page cache and mmap between sessions
+    if writer:
+        # Writers wait their turn for the one connection, in order
+        pool = {"pool_size": 1, "max_overflow": 0, "pool_timeout": settings.SQLITE_WRITER_TIMEOUT_SECONDS}
+    else:
+        pool = {"pool_size": settings.SQLITE_POOL_SIZE}
+
+    engine = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=timed_pool(label),
+        connect_args={"check_same_thread": False},
+        **pool
+    )
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def configure_connection(dbapi_connection, connection_record):
+        if writer:
+            # SQLAlchemy emits BEGIN (see below) instead of the driver
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    if writer:
+        @event.listens_for(engine.sync_engine, "begin")
+        def begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """The database engine, created on first use rather than at import"""
+    global _engine
+    if _engine is None:
+        _engine = build_engine(settings.DATABASE_URL)
+    return _engine
+
+
+def get_writer_engine() -> AsyncEngine:
+    """
+    Engine for write_transaction: a dedicated single-connection engine on
+    SQLite, the regular engine on other databases
+    """
+    global _writer_engine
+    if _writer_engine is None:
+        if is_sqlite(settings.DATABASE_URL):
+            _writer_engine = build_engine(settings.DATABASE_URL, writer=True, label="writer")
+        else:
+            _writer_engine = get_engine()
+    return _writer_engine
+
+
+def get_replica_engine() -> AsyncEngine:
+    """Engine for the read replica (DATABASE_READ_REPLICA_URL must be set)"""
+    global _replica_engine
+    if _replica_engine is None:
+        _replica_engine = build_engine(settings.DATABASE_READ_REPLICA_URL, label="replica")
+    return _replica_engine
+
+
+def make_sessionmaker(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+
+def get_sessionmaker() -> async_sessionmaker:
+    global _sessionmaker
+    if _sessionmaker is None:
+        _sessionmaker = make_sessionmaker(get_engine())
+    return _sessionmaker
+
+
+def get_writer_sessionmaker() -> async_sessionmaker:
+    global _writer_sessionmaker
+    if _writer_sessionmaker is None:
+        _writer_sessionmaker = make_sessionmaker(get_writer_engine())
+    return _writer_sessionmaker
+
+
+def get_replica_sessionmaker() -> async_sessionmaker:
+    global _replica_sessionmaker
+    if _replica_sessionmaker is None:
+        _replica_sessionmaker = make_sessionmaker(get_replica_engine())
+    return _replica_sessionmaker
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Open a new session (stands in for the session factory, which is built lazily)"""
+    return get_sessionmaker()()
+
 
 Base = declarative_base()
 
 
+class ReadOnlySessionError(RuntimeError):
+    """A request session tried to write; use get_write_db or write_transaction()"""
+
+
+@event.listens_for(Session, "before_flush")
+def _reject_read_only_flush(session, flush_context, instances):
+    if session.info.get("read_only") and (session.new or session.dirty or session.deleted):
+        raise ReadOnlySessionError("get_db/get_read_db sessions are read-only; write through get_write_db")
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _reject_read_only_statement(orm_execute_state):
+    if orm_execute_state.session.info.get("read_only") and (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        raise ReadOnlySessionError("get_db/get_read_db sessions are read-only; write through get_write_db")
+
+
 async def get_db():
+    """
+    Session on the primary for requests that must read their own writes.
+    Read-only: a flush or ORM write raises ReadOnlySessionError, so request
+    writes can only go through get_write_db and never contend with the
+    writer connection for the SQLite lock.
+    """
     async with AsyncSessionLocal() as session:
+        session.info["read_only"] = True
         try:
             yield session
             await session.commit()
@@ -44,6 +216,61 @@ async def get_db():
             await session.close()
 
 
+async def get_read_db():
+    """
+    Session for read-only requests; never committed. Served by the read
+    replica when one is configured, unless the user wrote in the last few
+    seconds (see app.core.read_routing)
+    """
+    replica = bool(settings.DATABASE_READ_REPLICA_URL) and not read_from_primary.get()
+    sessionmaker = get_replica_sessionmaker() if replica else get_sessionmaker()
+    async with sessionmaker() as session:
+        session.info["replica"] = replica
+        session.info["read_only"] = True
+        yield session
+
+
+def on_replica(session: AsyncSession) -> bool:
+    """Whether `session` reads from the replica (and so may lag behind writes)"""
+    return session.info.get("replica", False)
+
+
+@asynccontextmanager
+async def write_transaction() -> AsyncIterator[AsyncSession]:
+    """
+    Session for every write (background, payment and request handlers via
+    get_write_db); commits on exit, rolls back on error. On SQLite all of
+    them share the writer connection, so they queue up in order instead of
+    contending for the database lock.
+    """
+    async with get_writer_sessionmaker()() as session:
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+
+
+async def get_write_db():
+    """Session for requests that write: a write_transaction held for the request"""
+    async with write_transaction() as session:
+        yield session
+
+
+async def close_db():
+    """Dispose of the engines (called on shutdown)"""
+    global _engine, _sessionmaker, _writer_engine, _writer_sessionmaker, _replica_engine, _replica_sessionmaker
+    if _replica_engine is not None:
+        await _replica_engine.dispose()
+    if _writer_engine is not None and _writer_engine is not _engine:
+        await _writer_engine.dispose()
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = _sessionmaker = _writer_engine = _writer_sessionmaker = None
+    _replica_engine = _replica_sessionmaker = None
+
+
 async def init_db():
     """Initialize database with retry logic"""
     max_retries = 5
@@ -57,7 +284,7 @@ async def init_db():
     for attempt in range(max_retries):
         try:
             logger.info(f"Attempting to connect to database (attempt {attempt + 1}/{max_retries})...")
-            async with engine.begin() as conn:
+            async with get_engine().begin() as conn:
                 await conn.run_sync(Base.metadata.create_all)
             logger.info("✅ Database connected and tables created successfully")
             return
@@ -1,11 +1,22 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from pathlib import Path
 from app.config import settings
-from app.database import init_db
+from app.core.serialization import DefaultResponse
+from app.database import close_db, init_db
 from app.api.routes import auth, robots, payments, execute
+from app.core.cache import get_robot_cache, get_user_cache
+from app.core.read_routing import ReadRoutingMiddleware
+from app.core.instrumentation import CONTENT_TYPE_LATEST, MetricsMiddleware, render_metrics
+from app.core.images import variant_index
+from app.services.robot_executor import robot_executor
+from app.services.write_behind import execution_writer
+from app.services.metrics_engine import robot_metrics
+from app.services.payment_indexer import payment_indexer
+from app.services.interface_generator import interface_generator
+from app.services.api_docs import api_docs_fetcher
+from app.services.image_store import UploadFiles, image_store
 
 
 @asynccontextmanager
@@ -13,18 +24,40 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     print("✅ Database initialized")
+    await variant_index.load()
+    await robot_executor.start()
+    await execution_writer.start()
+    await robot_metrics.start()
+    await get_robot_cache().start()
+    await get_user_cache().start()
+    await payment_indexer.start()
     yield
     # Shutdown
     print("👋 Shutting down...")
+    await payment_indexer.close()
+    await get_user_cache().close()
+    await get_robot_cache().close()
+    await robot_executor.close()
+    await interface_generator.close()
+    await api_docs_fetcher.close()
+    await image_store.close()
+    await execution_writer.close()
+    await robot_metrics.close()
+    await close_db()
 
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version="1.0.0",
     description="Pay-per-use platform for robot services using x402 protocol",
+    default_response_class=DefaultResponse,
     lifespan=lifespan
 )
 
+# Read-your-writes routing between the primary and the read replica
+if settings.DATABASE_READ_REPLICA_URL:
+    app.add_middleware(ReadRoutingMiddleware)
+
 # CORS middleware
 cors_origins = settings.CORS_ORIGINS.split(",") if hasattr(settings, 'CORS_ORIGINS') and settings.CORS_ORIGINS else ["*"]
 app.add_middleware(
@@ -38,6 +71,10 @@ app.add_middleware(
                     "X-Expires-At", "X-Payment-Required"]
 )
 
+# Request latency histograms; added last so it is outermost and times the
+# other middlewares too
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix=settings.API_V1_PREFIX)
 app.include_router(robots.router, prefix=settings.API_V1_PREFIX)
@@ -47,7 +84,7 @@ app.include_router(execute.router, prefix=settings.API_V1_PREFIX)
 # Mount static files for uploads
 uploads_dir = Path("uploads")
 uploads_dir.mkdir(exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", UploadFiles(directory="uploads"), name="uploads")
 
 
 @app.get("/")
@@ -64,6 +101,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (sync, so file reads in multiprocess mode stay off the event loop)"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
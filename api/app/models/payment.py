@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Numeric, DateTime, ForeignKey, Float, Text, JSON
+from sqlalchemy import Column, String, Numeric, DateTime, ForeignKey, Float, Text, JSON, Index, Integer
 from datetime import datetime
 import uuid
 from app.database import Base
@@ -10,6 +10,10 @@ class PaymentSessionDB(Base):
     Used for historical records and analytics
     """
     __tablename__ = "payment_sessions"
+    __table_args__ = (
+        # Serves "my sessions, newest first" and its keyset pagination
+        Index("ix_payment_sessions_user_created", "user_id", "created_at"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
@@ -18,7 +22,7 @@ class PaymentSessionDB(Base):
     currency = Column(String(10), default="USDC")
     recipient_address = Column(String(255), nullable=False)
     status = Column(String(50), default="pending", index=True)  # pending | paid | expired
-    tx_signature = Column(String(255), nullable=True)
+    tx_signature = Column(String(255), nullable=True, index=True)
     service_payload = Column(JSON, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     expires_at = Column(DateTime, nullable=False)
@@ -45,3 +49,38 @@ class ExecutionLog(Base):
 
     def __repr__(self):
         return f"<ExecutionLog {self.robot_id} ({self.status})>"
+
+
+class UserPaymentStats(Base):
+    """
+    Per-user payment aggregate, maintained incrementally by verify_payment
+    so the stats endpoint never scans payment_sessions
+    """
+    __tablename__ = "user_payment_stats"
+
+    user_id = Column(String(36), ForeignKey("users.id"), primary_key=True)
+    total_sessions = Column(Integer, nullable=False, default=0)
+    paid_sessions = Column(Integer, nullable=False, default=0)
+    total_spent = Column(Numeric(20, 6), nullable=False, default=0)
+    last_payment_at = Column(DateTime, nullable=True)
+    most_used_robot_id = Column(String(36), nullable=True)
+    most_used_robot_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<UserPaymentStats {self.user_id} ({self.paid_sessions} paid)>"
+
+
+class UserRobotUsage(Base):
+    """
+    Paid session count per (user, robot), used to keep the most-used robot
+    in UserPaymentStats current
+    """
+    __tablename__ = "user_robot_usage"
+
+    user_id = Column(String(36), ForeignKey("users.id"), primary_key=True)
+    robot_id = Column(String(36), ForeignKey("robots.id"), primary_key=True)
+    session_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserRobotUsage {self.user_id} {self.robot_id} ({self.session_count})>"
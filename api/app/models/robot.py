@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Numeric, Integer, Float, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, String, Numeric, Integer, Float, DateTime, Text, ForeignKey, JSON, Index
 from datetime import datetime
 import uuid
 from app.database import Base
@@ -6,6 +6,10 @@ from app.database import Base
 
 class Robot(Base):
     __tablename__ = "robots"
+    __table_args__ = (
+        # Serves catalog listing by status, newest first, with keyset pagination
+        Index("ix_robots_status_created", "status", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     owner_id = Column(String(36), ForeignKey("users.id"), nullable=False)
@@ -23,6 +27,7 @@ class Robot(Base):
     total_revenue = Column(Numeric(20, 6), default=0)
     avg_response_time = Column(Float, default=0.0)
     success_rate = Column(Float, default=1.0)
+    metrics_fold_id = Column(String(36), nullable=True)  # last metrics fold applied to the counters above
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # AI-powered control interface fields
@@ -36,3 +41,21 @@ class Robot(Base):
 
     def __repr__(self):
         return f"<Robot {self.name} (${self.price})>"
+
+
+class RobotService(Base):
+    """
+    Normalized copy of Robot.services (one row per robot and service) so
+    catalog filtering by service/category can use an index instead of
+    scanning the JSON column
+    """
+    __tablename__ = "robot_services"
+    __table_args__ = (
+        Index("ix_robot_services_service_robot", "service", "robot_id"),
+    )
+
+    robot_id = Column(String(36), ForeignKey("robots.id", ondelete="CASCADE"), primary_key=True)
+    service = Column(String(100), primary_key=True)
+
+    def __repr__(self):
+        return f"<RobotService {self.robot_id} {self.service}>"
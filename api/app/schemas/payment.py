@@ -23,7 +23,7 @@ class ExecutePayload(BaseModel):
 
 class ExecuteResponse(BaseModel):
     success: bool
-    data: Optional[Dict[str, Any]] = None
+    data: Any = None  # the robot control API's JSON response, passed through as is
     error: Optional[str] = None
     execution_time: Optional[float] = None
 
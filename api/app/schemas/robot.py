@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, FieldSerializationInfo, field_serializer
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from uuid import UUID
+from app.core.images import variant_url
 
 
 class GPSCoordinates(BaseModel):
@@ -84,10 +85,17 @@ class RobotResponse(RobotBase):
     class Config:
         from_attributes = True
 
+    @field_serializer("image_url")
+    def serialize_image_url(self, image_url: Optional[str], info: FieldSerializationInfo) -> Optional[str]:
+        """Point at a resized variant when the caller asks for one (context={"image_variant": ...})"""
+        variant = (info.context or {}).get("image_variant")
+        return variant_url(image_url, variant) if variant else image_url
+
 
 class RobotListResponse(BaseModel):
     robots: List[RobotResponse]
     total: int
+    next_cursor: Optional[str] = None
 
 
 class APIExploreRequest(BaseModel):
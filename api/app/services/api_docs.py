@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, Dict, Optional
+import orjson
+from app.config import settings
+from app.core.cache import TTLCache
+from app.services.openapi_compiler import extract_spec, is_openapi
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# Where robots usually publish their documentation, best first (the API
+# root itself is tried last)
+DOC_PATHS = ["/openapi.json", "/swagger.json", "/docs", "/api-docs"]
+
+# Non-spec documentation (HTML pages, plain text) sent to the model is cut
+# to this many characters to prevent token overflow
+TEXT_DOCS_MAX_CHARS = 5000
+
+
+class DocumentTooLarge(Exception):
+    pass
+
+
+def build_docs(url: str, body: bytes, content_type: Optional[str]) -> Dict[str, Any]:
+    """
+    Documentation record for a fetched document. OpenAPI / Swagger specs are
+    reduced to what matters for controls (see extract_spec) and kept whole;
+    anything else is truncated text
+    """
+    try:
+        document = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        document = None
+
+    if is_openapi(document):
+        spec = extract_spec(document)
+        return {
+            "url": url,
+            "content": orjson.dumps(spec).decode(),
+            "content_type": content_type,
+            "spec": spec,
+        }
+
+    return {
+        "url": url,
+        "content": body.decode("utf-8", errors="replace")[:TEXT_DOCS_MAX_CHARS],
+        "content_type": content_type,
+    }
+
+
+class APIDocsFetcher:
+    """
+    Finds and downloads a robot's API documentation.
+
+    All candidate locations are probed concurrently, so a slow or
+    unresponsive robot costs one timeout instead of one per location. The
+    best result wins: a spec by location priority, otherwise the first 200
+    response by priority. Documents are cached with their ETag /
+    Last-Modified validators and revalidated with conditional requests, so
+    an unchanged spec comes back as a 304. Bodies are streamed and
+    abandoned once they exceed `max_bytes`.
+    """
+
+    def __init__(self, timeout: float, max_bytes: int, cache_size: int, cache_ttl: float):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self._client: Optional["httpx.AsyncClient"] = None
+        # url -> (etag, last_modified, docs)
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def fetch(self, api_url: str) -> Optional[Dict[str, Any]]:
+        """Documentation for the API at `api_url` (None if none was found)"""
+        candidates = [f"{api_url}{path}" for path in DOC_PATHS] + [api_url]
+        probes = [asyncio.create_task(self._probe(url)) for url in candidates]
+        try:
+            fallback = None
+            for probe in probes:
+                docs = await probe
+                if docs is None:
+                    continue
+                if "spec" in docs:
+                    return docs
+                if fallback is None:
+                    fallback = docs
+            return fallback
+        finally:
+            for probe in probes:
+                probe.cancel()
+
+    async def _probe(self, url: str) -> Optional[Dict[str, Any]]:
+        cached = self._cache.get(url)
+        headers = {}
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        try:
+            async with self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and cached is not None:
+                    return dict(cached[2])
+                if response.status_code != 200:
+                    return None
+                body = await self._read(response)
+                etag = response.headers.get("etag")
+                last_modified = response.headers.get("last-modified")
+                content_type = response.headers.get("content-type")
+        except DocumentTooLarge:
+            logger.warning(f"API documentation at {url} exceeds {self.max_bytes} bytes, skipping")
+            return None
+        except Exception:
+            return None
+
+        docs = build_docs(url, body, content_type)
+        if etag or last_modified:
+            self._cache.set(url, (etag, last_modified, docs))
+        # Callers may modify the record, the cached one stays intact
+        return dict(docs)
+
+    async def _read(self, response: "httpx.Response") -> bytes:
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            raise DocumentTooLarge()
+
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) > self.max_bytes:
+                raise DocumentTooLarge()
+        return bytes(body)
+
+    async def close(self) -> None:
+        """Close the HTTP client (called on shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global API documentation fetcher instance
+api_docs_fetcher = APIDocsFetcher(
+    timeout=settings.API_DOCS_TIMEOUT_SECONDS,
+    max_bytes=settings.API_DOCS_MAX_BYTES,
+    cache_size=settings.API_DOCS_CACHE_MAX_ENTRIES,
+    cache_ttl=settings.API_DOCS_CACHE_TTL_SECONDS,
+)
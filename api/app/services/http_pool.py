@@ -0,0 +1,121 @@
+import asyncio
+import importlib.util
+import logging
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict
+from urllib.parse import urlsplit
+from app.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class RobotHTTPClientPool:
+    """
+    Long-lived httpx clients keyed by robot origin (scheme://host:port).
+    Each origin keeps its own keep-alive connections, so consecutive commands
+    to the same robot skip TCP/TLS setup.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: bool = False,
+        max_origins: int = 256,
+    ):
+        self.timeout = timeout
+        # httpx is imported with the first client, not at startup
+        self.limits = dict(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_origins = max_origins
+        self.http2 = http2 and self._http2_available()
+        self._clients: "OrderedDict[str, httpx.AsyncClient]" = OrderedDict()
+        self._retiring: Dict["httpx.AsyncClient", asyncio.Task] = {}
+        self._closed = False
+
+    @staticmethod
+    def _http2_available() -> bool:
+        """HTTP/2 needs the optional `h2` package"""
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("ROBOT_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+            return False
+        return True
+
+    @staticmethod
+    def origin_of(url: str) -> str:
+        """Normalize a URL to its origin, the key clients are pooled by"""
+        parts = urlsplit(url)
+        scheme = (parts.scheme or "http").lower()
+        host = (parts.hostname or "").lower()
+        port = parts.port or (443 if scheme == "https" else 80)
+        return f"{scheme}://{host}:{port}"
+
+    def get_client(self, url: str) -> "httpx.AsyncClient":
+        """Return the pooled client for the origin of `url`, creating it on first use"""
+        if self._closed:
+            raise RuntimeError("Robot HTTP client pool is closed")
+
+        origin = self.origin_of(url)
+        client = self._clients.get(origin)
+        if client is not None and not client.is_closed:
+            self._clients.move_to_end(origin)
+            return client
+
+        import httpx
+
+        client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(**self.limits),
+            http2=self.http2,
+        )
+        self._clients[origin] = client
+        self._evict()
+        return client
+
+    def _evict(self) -> None:
+        """Drop least recently used origins beyond max_origins"""
+        while len(self._clients) > self.max_origins:
+            origin, client = self._clients.popitem(last=False)
+            logger.debug(f"Evicting robot HTTP client for {origin}")
+            # Requests may still be in flight on the evicted client, so close it
+            # only after they have had a full timeout to finish.
+            self._retiring[client] = asyncio.get_running_loop().create_task(self._close_later(client))
+
+    async def _close_later(self, client: "httpx.AsyncClient") -> None:
+        await asyncio.sleep(self.timeout)
+        self._retiring.pop(client, None)
+        await client.aclose()
+
+    async def close(self) -> None:
+        """Close every pooled client (called on application shutdown)"""
+        self._closed = True
+        for task in self._retiring.values():
+            task.cancel()
+        clients = list(self._clients.values()) + list(self._retiring)
+        self._clients.clear()
+        self._retiring.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing robot HTTP client: {e}")
+
+
+def build_robot_http_pool() -> RobotHTTPClientPool:
+    """Create a pool configured from settings"""
+    return RobotHTTPClientPool(
+        timeout=settings.ROBOT_HTTP_TIMEOUT,
+        max_connections=settings.ROBOT_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.ROBOT_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.ROBOT_HTTP_KEEPALIVE_EXPIRY,
+        http2=settings.ROBOT_HTTP2,
+        max_origins=settings.ROBOT_HTTP_MAX_ORIGINS,
+    )
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional
+from fastapi import Response, UploadFile
+from fastapi.staticfiles import StaticFiles
+from app.config import settings
+from app.core.http_cache import get_robot_versions
+from app.core.images import (
+    UPLOAD_DIR,
+    UPLOAD_URL,
+    VARIANT_EXTENSIONS,
+    VARIANTS,
+    variant_index,
+    variant_path,
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Stored extension per accepted content type
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+# Variant extension -> (Pillow format, save options)
+VARIANT_FORMATS = {
+    ".webp": ("WEBP", {"quality": 80, "method": 4}),
+    ".jpg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+# Stored file names (originals and variants) derived from the content hash
+CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{64}(?:_[a-z]+)?\.(?:jpg|png|gif|webp)$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+UPLOAD_CACHE_CONTROL = "public, max-age=3600"
+
+CHUNK_SIZE = 256 * 1024
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+def make_variants(source: str, digest: str) -> None:
+    """
+    Write every resized variant of an original in each format. Runs in a
+    worker process; each file is written under a temporary name and renamed
+    into place, the last one (see app.core.images) only once all are done.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        for variant, size in VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+            for extension in VARIANT_EXTENSIONS:
+                image_format, options = VARIANT_FORMATS[extension]
+                converted = resized
+                if image_format == "JPEG" and resized.mode != "RGB":
+                    converted = resized.convert("RGB")
+                elif image_format == "WEBP" and resized.mode not in ("RGB", "RGBA"):
+                    converted = resized.convert("RGBA")
+                target = variant_path(digest, variant, extension)
+                temporary = target.with_name(f".{uuid.uuid4().hex}{extension}")
+                converted.save(temporary, image_format, **options)
+                os.replace(temporary, target)
+
+
+class ImageStore:
+    """
+    Content-addressed storage for robot images.
+
+    Uploads are streamed to disk in chunks while being hashed and stored
+    once per SHA-256, so a duplicate upload reuses the existing file.
+    Resized WebP and JPEG variants are produced in a process pool after the
+    upload returns; until they exist the catalog keeps serving the original.
+    File system calls run in threads so they never block the event loop.
+    """
+
+    def __init__(self, max_bytes: int, workers: int):
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._pool: Optional["ProcessPoolExecutor"] = None
+        self._jobs: Dict[str, asyncio.Task] = {}
+
+    async def save_upload(self, file: UploadFile) -> str:
+        """Store an uploaded image and return its URL (raises ImageTooLarge)"""
+        await asyncio.to_thread(UPLOAD_DIR.mkdir, parents=True, exist_ok=True)
+        extension = EXTENSIONS[file.content_type]
+        temporary = UPLOAD_DIR / f".upload-{uuid.uuid4().hex}"
+
+        hasher = hashlib.sha256()
+        size = 0
+        out = await asyncio.to_thread(open, temporary, "wb")
+        try:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise ImageTooLarge()
+                hasher.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+        except BaseException:
+            await asyncio.to_thread(out.close)
+            await asyncio.to_thread(temporary.unlink, missing_ok=True)
+            raise
+        await asyncio.to_thread(out.close)
+
+        digest = hasher.hexdigest()
+        stored = UPLOAD_DIR / f"{digest}{extension}"
+        if await asyncio.to_thread(stored.exists):
+            await asyncio.to_thread(temporary.unlink, missing_ok=True)  # duplicate upload
+        else:
+            await asyncio.to_thread(os.replace, temporary, stored)
+
+        if digest not in self._jobs and not await variant_index.check(digest):
+            self._schedule_variants(stored, digest)
+        return f"{UPLOAD_URL}/{stored.name}"
+
+    def _schedule_variants(self, source: Path, digest: str) -> None:
+        if self._pool is None:
+            # Loaded with the first upload rather than at startup
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Spawned rather than forked: this process runs threads (the
+            # event loop's executor, DB drivers), which a fork would copy
+            # mid-flight, locks included
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        job = asyncio.get_running_loop().run_in_executor(self._pool, make_variants, str(source), digest)
+        self._jobs[digest] = asyncio.ensure_future(self._watch(job, digest))
+
+    async def _watch(self, job: asyncio.Future, digest: str) -> None:
+        try:
+            await job
+            variant_index.add(digest)
+            # Catalog image URLs switch to the variants now
+            await get_robot_versions().bump_images()
+        except Exception as e:
+            logger.warning(f"Could not create image variants for {digest}: {e}")
+        finally:
+            self._jobs.pop(digest, None)
+
+    async def close(self) -> None:
+        """Finish pending variant jobs and stop the worker processes (called on shutdown)"""
+        if self._jobs:
+            await asyncio.gather(*self._jobs.values(), return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+class UploadFiles(StaticFiles):
+    """
+    The /uploads mount. Content-addressed files (named after their hash)
+    never change, so browsers may keep them for good; other files get a
+    short max-age. ETag / Last-Modified revalidation comes from StaticFiles.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        name = str(full_path).rsplit("/", 1)[-1]
+        response.headers["Cache-Control"] = (
+            IMMUTABLE_CACHE_CONTROL if CONTENT_ADDRESSED.match(name) else UPLOAD_CACHE_CONTROL
+        )
+        return response
+
+
+# Global image store instance
+image_store = ImageStore(
+    max_bytes=settings.IMAGE_UPLOAD_MAX_BYTES,
+    workers=settings.IMAGE_VARIANT_WORKERS,
+)
@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from typing import TYPE_CHECKING, Any, Dict, Optional
+import redis.asyncio as redis
+from app.config import settings
+from app.core.cache import TTLCache, get_redis_client
+
+if TYPE_CHECKING:
+    import anthropic
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "interface_config:"
+
+
+class InterfaceGenerationError(Exception):
+    """The model call failed or did not return a usable interface config"""
+
+
+def cache_key(api_docs: Dict[str, Any], has_video: bool, has_gps: bool) -> str:
+    """Hash of the fetched API documentation plus the flags that shape the interface"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(api_docs.get("content"), sort_keys=True, default=str).encode())
+    digest.update(f"|video={int(has_video)}|gps={int(has_gps)}".encode())
+    return digest.hexdigest()
+
+
+def build_prompt(api_url: str, api_docs: dict, robot_name: str, has_video: bool, has_gps: bool) -> str:
+    prompt = f"""You are an expert in robot control interfaces and API analysis.
+
+I need you to analyze this robot API and generate a comprehensive control interface configuration.
+
+Robot Name: {robot_name}
+API URL: {api_url}
+Has Video Stream: {has_video}
+Has GPS: {has_gps}
+
+API Documentation:
+{json.dumps(api_docs, indent=2)}
+
+IMPORTANT INSTRUCTIONS:
+1. Carefully examine ALL endpoints in the OpenAPI/Swagger documentation
+2. Look for endpoints in the "paths" section of the OpenAPI schema
+3. For EACH endpoint that accepts POST requests, create appropriate controls
+4. Generate MULTIPLE controls - aim for at least 8-12 controls if the API supports it
+5. Categorize endpoints by their function:
+   - Movement endpoints (/move, /rotate) → buttons for each direction
+   - Value endpoints (/speed, /arm/position) → sliders
+   - Camera/positioning (/camera/move) → joystick
+   - On/off endpoints (/lights, /motor) → toggles
+
+Control Type Guidelines:
+- "button": For discrete actions with fixed parameters
+  Example: POST /move with {{"direction": "forward"}} → Create separate buttons for forward, backward, left, right
+- "slider": For endpoints with numeric ranges (0-100, 0-360, etc.)
+  Example: POST /speed with {{"value": 50}} → Slider from 0 to 100
+- "joystick": For 2-axis controls (pan/tilt, x/y)
+  Example: POST /camera/move with {{"pan": 0, "tilt": 0}} → Joystick control
+- "toggle": For boolean states (enabled/disabled, on/off)
+  Example: POST /lights with {{"enabled": true}} → Toggle switch
+
+For movement endpoints like /move that accept different directions, create ONE button for EACH direction:
+- move_forward button with params {{"direction": "forward", "speed": 50}}
+- move_backward button with params {{"direction": "backward", "speed": 50}}
+- move_left button with params {{"direction": "left", "speed": 50}}
+- move_right button with params {{"direction": "right", "speed": 50}}
+
+Return ONLY valid JSON (no markdown, no explanation):
+{{
+  "controls": [
+    // Movement buttons
+    {{"id": "move_forward", "type": "button", "label": "Move Forward", "endpoint": "/move", "method": "POST", "params": {{"direction": "forward", "speed": 50}}, "icon": "ArrowUp"}},
+    {{"id": "move_backward", "type": "button", "label": "Move Backward", "endpoint": "/move", "method": "POST", "params": {{"direction": "backward", "speed": 50}}, "icon": "ArrowDown"}},
+    {{"id": "move_left", "type": "button", "label": "Move Left", "endpoint": "/move", "method": "POST", "params": {{"direction": "left", "speed": 50}}, "icon": "ArrowLeft"}},
+    {{"id": "move_right", "type": "button", "label": "Move Right", "endpoint": "/move", "method": "POST", "params": {{"direction": "right", "speed": 50}}, "icon": "ArrowRight"}},
+
+    // Rotation buttons
+    {{"id": "rotate_left", "type": "button", "label": "Rotate Left", "endpoint": "/rotate", "method": "POST", "params": {{"direction": "left", "degrees": 90}}, "icon": "RotateCcw"}},
+    {{"id": "rotate_right", "type": "button", "label": "Rotate Right", "endpoint": "/rotate", "method": "POST", "params": {{"direction": "right", "degrees": 90}}, "icon": "RotateCw"}},
+
+    // Sliders
+    {{"id": "speed_control", "type": "slider", "label": "Speed", "endpoint": "/speed", "method": "POST", "param_name": "value", "min": 0, "max": 100, "step": 5, "unit": "%"}},
+    {{"id": "arm_height", "type": "slider", "label": "Arm Height", "endpoint": "/arm/position", "method": "POST", "param_name": "height", "min": 0, "max": 100, "step": 5, "unit": "cm"}},
+
+    // Joystick
+    {{"id": "camera_control", "type": "joystick", "label": "Camera Control", "endpoint": "/camera/move", "method": "POST", "axes": ["pan", "tilt"], "range": {{"pan": [-180, 180], "tilt": [-90, 90]}}}},
+
+    // Toggles
+    {{"id": "lights", "type": "toggle", "label": "Lights", "endpoint": "/lights", "method": "POST", "param_name": "enabled"}},
+    {{"id": "motor", "type": "toggle", "label": "Motor", "endpoint": "/motor", "method": "POST", "param_name": "enabled"}},
+
+    // Emergency
+    {{"id": "emergency_stop", "type": "button", "label": "Emergency Stop", "endpoint": "/stop", "method": "POST", "params": {{}}, "icon": "AlertOctagon"}}
+  ],
+  "has_video": {has_video},
+  "has_gps": {has_gps},
+  "api_version": "1.0",
+  "discovered_endpoints": ["/status", "/move", "/rotate", "/speed", "/lights", "/motor", "/camera/move", "/arm/position", "/stop"]
+}}
+
+Generate ALL controls based on the API documentation. Be thorough!
+"""
+    return prompt
+
+
+def parse_interface_config(response_text: str) -> Dict[str, Any]:
+    """Extract the interface config JSON (it might be wrapped in ```json``` code blocks)"""
+    json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+    if json_match:
+        response_text = json_match.group(1)
+    return json.loads(response_text)
+
+
+class InterfaceGenerator:
+    """
+    Generates robot control interfaces with Claude without blocking the
+    event loop.
+
+    Uses the async Anthropic client, limits concurrent model calls with a
+    semaphore, and caches each generated config under a hash of the API
+    documentation and the has_video/has_gps flags (in-process and in
+    Redis), so re-exploring an unchanged API returns instantly. Concurrent
+    requests for the same key share one model call.
+    """
+
+    def __init__(self, max_concurrency: int, cache_ttl: int, cache_size: int):
+        self.cache_ttl = cache_ttl
+        self._client: Optional["anthropic.AsyncAnthropic"] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._local = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def client(self) -> "anthropic.AsyncAnthropic":
+        if self._client is None:
+            # The SDK is heavy to import; load it only once explore-api needs it
+            import anthropic
+
+            self._client = anthropic.AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                base_url=settings.ANTHROPIC_BASE_URL,
+                timeout=settings.AI_INTERFACE_TIMEOUT_SECONDS,
+            )
+        return self._client
+
+    async def generate(
+        self,
+        api_url: str,
+        api_docs: dict,
+        robot_name: str,
+        has_video: bool,
+        has_gps: bool
+    ) -> Dict[str, Any]:
+        """Interface config for the documented API, from cache when possible"""
+        key = cache_key(api_docs, has_video, has_gps)
+
+        cached = await self._get_cached(key)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            interface_config = await self._generate(api_url, api_docs, robot_name, has_video, has_gps)
+            await self._set_cached(key, interface_config)
+            future.set_result(interface_config)
+            return interface_config
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited future does not log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _generate(
+        self,
+        api_url: str,
+        api_docs: dict,
+        robot_name: str,
+        has_video: bool,
+        has_gps: bool
+    ) -> Dict[str, Any]:
+        import anthropic
+
+        prompt = build_prompt(api_url, api_docs, robot_name, has_video, has_gps)
+        response_text = ""
+
+        try:
+            async with self._semaphore:
+                message = await self.client.messages.create(
+                    model=settings.ANTHROPIC_MODEL,
+                    max_tokens=4000,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
+
+            response_text = message.content[0].text
+            return parse_interface_config(response_text)
+
+        except json.JSONDecodeError as e:
+            # Si falla el parsing de JSON, lanzar error
+            raise InterfaceGenerationError(
+                f"Error al parsear la respuesta de Claude AI: {str(e)}. Respuesta recibida: {response_text[:200]}"
+            )
+        except anthropic.APIError as e:
+            # Error de la API de Anthropic
+            raise InterfaceGenerationError(f"Error al llamar a Claude AI: {str(e)}")
+
+    async def _get_cached(self, key: str) -> Optional[Dict[str, Any]]:
+        cached = self._local.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            raw = await get_redis_client().get(CACHE_PREFIX + key)
+        except redis.RedisError as e:
+            logger.warning(f"Interface config cache read failed: {e}")
+            return None
+        if raw is None:
+            return None
+
+        cached = json.loads(raw)
+        self._local.set(key, cached)
+        return cached
+
+    async def _set_cached(self, key: str, interface_config: Dict[str, Any]) -> None:
+        self._local.set(key, interface_config)
+        try:
+            await get_redis_client().setex(CACHE_PREFIX + key, self.cache_ttl, json.dumps(interface_config))
+        except redis.RedisError as e:
+            logger.warning(f"Interface config cache write failed: {e}")
+
+    async def close(self) -> None:
+        """Close the model client (called on shutdown)"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+# Global interface generator instance
+interface_generator = InterfaceGenerator(
+    max_concurrency=settings.AI_INTERFACE_MAX_CONCURRENCY,
+    cache_ttl=settings.AI_INTERFACE_CACHE_TTL_SECONDS,
+    cache_size=settings.AI_INTERFACE_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,142 @@
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.config import settings
+
+# Log-linear buckets: each bucket is 5% wider than the previous one, so any
+# reported percentile is within ~2.5% of the true value. Latencies below
+# MIN_LATENCY fall in bucket 0 and above MAX_LATENCY in the last bucket.
+MIN_LATENCY = 0.0001  # 100 µs
+MAX_LATENCY = 120.0   # seconds
+GROWTH = 1.05
+_LOG_GROWTH = math.log(GROWTH)
+BUCKET_COUNT = int(math.ceil(math.log(MAX_LATENCY / MIN_LATENCY) / _LOG_GROWTH)) + 1
+
+# Window name -> (resolution, number of buckets)
+WINDOWS: Dict[str, Tuple[str, int]] = {
+    "1m": ("m", 1),
+    "5m": ("m", 5),
+    "15m": ("m", 15),
+    "1h": ("m", 60),
+    "6h": ("h", 6),
+    "24h": ("h", 24),
+    "7d": ("h", 168),
+}
+RESOLUTION_SECONDS = {"m": 60, "h": 3600}
+
+
+def bucket_index(seconds: float) -> int:
+    if seconds <= MIN_LATENCY:
+        return 0
+    return min(int(math.log(seconds / MIN_LATENCY) / _LOG_GROWTH) + 1, BUCKET_COUNT - 1)
+
+
+def bucket_value(index: int) -> float:
+    """Representative latency of a bucket (geometric midpoint of its bounds)"""
+    if index == 0:
+        return MIN_LATENCY
+    lower = MIN_LATENCY * GROWTH ** (index - 1)
+    return lower * math.sqrt(GROWTH)
+
+
+class LatencyHistogram:
+    """Fixed-memory latency histogram (HDR-style log-linear buckets)"""
+
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKET_COUNT
+        self.total = 0
+        self.errors = 0
+
+    def record(self, seconds: float, success: bool = True) -> None:
+        self.counts[bucket_index(seconds)] += 1
+        self.total += 1
+        if not success:
+            self.errors += 1
+
+    def merge_hash(self, data: Dict[str, str]) -> None:
+        """Add a persisted bucket (field "b<index>" -> count) to this histogram"""
+        for field, value in data.items():
+            if field == "errors":
+                self.errors += int(value)
+            elif field.startswith("b"):
+                count = int(value)
+                self.counts[int(field[1:])] += count
+                self.total += count
+
+    def percentile(self, p: float) -> Optional[float]:
+        if self.total == 0:
+            return None
+        rank = max(1, math.ceil(self.total * p / 100.0))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return bucket_value(index)
+        return bucket_value(BUCKET_COUNT - 1)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Percentiles in milliseconds plus error rate"""
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "count": self.total,
+            "errors": self.errors,
+            "error_rate": (self.errors / self.total) if self.total else 0.0,
+            "p50_ms": ms(self.percentile(50)),
+            "p90_ms": ms(self.percentile(90)),
+            "p99_ms": ms(self.percentile(99)),
+        }
+
+
+def bucket_key(robot_id: str, resolution: str, bucket_start: int) -> str:
+    return f"robot_latency:{robot_id}:{resolution}:{bucket_start}"
+
+
+def stage_latency(pipe, robot_id: str, seconds: float, success: bool, now: Optional[float] = None) -> None:
+    """Queue the Redis commands that record one latency sample into its time buckets"""
+    now = now if now is not None else time.time()
+    field = f"b{bucket_index(seconds)}"
+    retention = {
+        "m": settings.LATENCY_MINUTE_RETENTION_SECONDS,
+        "h": settings.LATENCY_HOUR_RETENTION_SECONDS,
+    }
+    for resolution, width in RESOLUTION_SECONDS.items():
+        key = bucket_key(robot_id, resolution, int(now // width) * width)
+        pipe.hincrby(key, field, 1)
+        if not success:
+            pipe.hincrby(key, "errors", 1)
+        pipe.expire(key, retention[resolution])
+
+
+def window_keys(robot_id: str, window: str, now: Optional[float] = None) -> List[str]:
+    """Keys of the time buckets covering `window`, newest first"""
+    resolution, buckets = WINDOWS[window]
+    width = RESOLUTION_SECONDS[resolution]
+    now = now if now is not None else time.time()
+    current = int(now // width) * width
+    return [bucket_key(robot_id, resolution, current - i * width) for i in range(buckets)]
+
+
+async def load_windows(client, robot_id: str, windows: Iterable[str]) -> Dict[str, Dict[str, Optional[float]]]:
+    """Summaries for each requested window, fetched in one pipelined round trip"""
+    windows = list(windows)
+    now = time.time()
+    pipe = client.pipeline(transaction=False)
+    spans = []
+    for window in windows:
+        keys = window_keys(robot_id, window, now)
+        for key in keys:
+            pipe.hgetall(key)
+        spans.append(len(keys))
+    results = await pipe.execute()
+
+    summaries = {}
+    offset = 0
+    for window, span in zip(windows, spans):
+        histogram = LatencyHistogram()
+        for data in results[offset:offset + span]:
+            histogram.merge_hash(data)
+        offset += span
+        summaries[window] = histogram.summary()
+    return summaries
@@ -0,0 +1,368 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+import redis.asyncio as redis
+from sqlalchemy import bindparam, or_
+from app.config import settings
+from app.core.cache import get_redis_client, get_robot_cache
+from app.core.http_cache import get_robot_versions
+from app.database import write_transaction
+from app.models.robot import Robot
+from app.services.latency_histogram import load_windows, stage_latency
+
+logger = logging.getLogger(__name__)
+
+# The hash tag keeps every key the fold script touches in one cluster slot
+PENDING_PREFIX = "{robot_metrics}:pending:"
+FOLDING_PREFIX = "{robot_metrics}:folding:"
+DIRTY_KEY = "{robot_metrics}:dirty"
+FOLDING_KEY = "{robot_metrics}:folding"
+FOLD_ID_KEY = "{robot_metrics}:fold_id"
+FOLD_LOCK_KEY = "robot_metrics:fold_lock"
+# Robots folded since their versions were last bumped
+STALE_KEY = "robot_metrics:stale"
+VERSION_DUE_KEY = "robot_metrics:versions_bumped"
+
+# Start fold ARGV[1]: move the pending counters of the robots in ARGV[2..]
+# into their folding hashes. KEYS are the dirty set, the folding set, the
+# fold id, then the pending hash and the folding hash of each robot.
+TAKE_PENDING_SCRIPT = """
+local n = #ARGV - 1
+redis.call('SET', KEYS[3], ARGV[1])
+for i = 1, n do
+    local id = ARGV[i + 1]
+    local pending, folding = KEYS[3 + i], KEYS[3 + n + i]
+    local fields = redis.call('HGETALL', pending)
+    for j = 1, #fields, 2 do
+        if fields[j] == 'time_sum' or fields[j] == 'revenue' then
+            redis.call('HINCRBYFLOAT', folding, fields[j], fields[j + 1])
+        else
+            redis.call('HINCRBY', folding, fields[j], fields[j + 1])
+        end
+    end
+    redis.call('DEL', pending)
+    redis.call('SREM', KEYS[1], id)
+    redis.call('SADD', KEYS[2], id)
+end
+return redis.call('SMEMBERS', KEYS[2])
+"""
+
+# Release the fold lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class MetricDelta:
+    """Accumulated metric changes for one robot"""
+    executions: int = 0
+    successes: int = 0
+    time_sum: float = 0.0
+    revenue: Decimal = Decimal(0)
+
+    def merge(self, other: "MetricDelta") -> None:
+        self.executions += other.executions
+        self.successes += other.successes
+        self.time_sum += other.time_sum
+        self.revenue += other.revenue
+
+    @classmethod
+    def from_hash(cls, data: Dict[str, str]) -> "MetricDelta":
+        return cls(
+            executions=int(data.get("executions", 0)),
+            successes=int(data.get("successes", 0)),
+            time_sum=float(data.get("time_sum", 0)),
+            revenue=Decimal(data.get("revenue", "0")),
+        )
+
+
+def merge_metrics(
+    execution_count: int,
+    avg_response_time: float,
+    success_rate: float,
+    total_revenue: Decimal,
+    delta: MetricDelta,
+) -> Dict[str, Any]:
+    """Combine stored robot metrics with counters not yet folded into the row"""
+    execution_count = execution_count or 0
+    total = execution_count + delta.executions
+    if total == 0:
+        return {
+            "total_executions": 0,
+            "total_revenue": float(total_revenue or 0),
+            "avg_response_time": avg_response_time or 0.0,
+            "success_rate": success_rate if success_rate is not None else 1.0,
+        }
+
+    return {
+        "total_executions": total,
+        "total_revenue": float((total_revenue or 0) + delta.revenue),
+        "avg_response_time": ((avg_response_time or 0.0) * execution_count + delta.time_sum) / total,
+        "success_rate": ((success_rate or 0.0) * execution_count + delta.successes) / total,
+    }
+
+
+class RobotMetricsEngine:
+    """
+    Contention-free robot metrics.
+
+    Each execution increments per-robot counters in a Redis hash
+    (HINCRBY/HINCRBYFLOAT), which is atomic across workers and never touches
+    the robots row. A background task periodically folds the accumulated
+    counters into the robots table with one batched UPDATE; a Redis lock makes
+    sure only one worker folds at a time. If Redis is unreachable, counters are
+    kept in-process and folded by this worker directly.
+
+    Each fold has an id, recorded on the robot rows by the same UPDATE, so a
+    fold whose Redis cleanup failed is not applied twice when retried. Folded
+    robots have their cached rows and HTTP validators refreshed at most every
+    `version_interval` seconds, so catalog ETags are not churned by every fold.
+    """
+
+    def __init__(self, fold_interval: float, fold_batch: int, version_interval: float):
+        self.fold_interval = fold_interval
+        self.fold_batch = fold_batch
+        self.version_interval = version_interval
+        self._local: Dict[str, MetricDelta] = defaultdict(MetricDelta)
+        self._task: Optional[asyncio.Task] = None
+        self._take_pending = None
+        self._release_lock = None
+
+    async def record(
+        self,
+        robot_id: str,
+        success: bool,
+        response_time: float,
+        revenue: Decimal = Decimal(0),
+    ) -> None:
+        """Count one execution and its latency sample (one Redis round trip)"""
+        try:
+            pipe = get_redis_client().pipeline(transaction=False)
+            key = PENDING_PREFIX + robot_id
+            pipe.hincrby(key, "executions", 1)
+            if success:
+                pipe.hincrby(key, "successes", 1)
+            pipe.hincrbyfloat(key, "time_sum", response_time)
+            if revenue:
+                pipe.hincrbyfloat(key, "revenue", str(revenue))
+            pipe.sadd(DIRTY_KEY, robot_id)
+            stage_latency(pipe, robot_id, response_time, success)
+            await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Robot metrics Redis write failed, buffering locally: {e}")
+            self._local[robot_id].merge(MetricDelta(
+                executions=1,
+                successes=1 if success else 0,
+                time_sum=response_time,
+                revenue=revenue,
+            ))
+
+    async def get_pending(self, robot_id: str, applied_fold_id: Optional[str] = None) -> MetricDelta:
+        """
+        Counters for `robot_id` that are not yet in the robots table, given
+        the last fold applied to its row (read from the primary)
+        """
+        delta = MetricDelta()
+        try:
+            pipe = get_redis_client().pipeline(transaction=True)
+            pipe.hgetall(PENDING_PREFIX + robot_id)
+            pipe.hgetall(FOLDING_PREFIX + robot_id)
+            pipe.get(FOLD_ID_KEY)
+            pending, folding, fold_id = await pipe.execute()
+            delta.merge(MetricDelta.from_hash(pending))
+            # A committed fold's counters stay in Redis until it is cleared
+            if fold_id is None or fold_id != applied_fold_id:
+                delta.merge(MetricDelta.from_hash(folding))
+        except redis.RedisError as e:
+            logger.warning(f"Robot metrics Redis read failed: {e}")
+
+        local = self._local.get(robot_id)
+        if local is not None:
+            delta.merge(local)
+        return delta
+
+    async def get_latency(self, robot_id: str, windows: List[str]) -> Dict[str, Any]:
+        """p50/p90/p99 and error rate per window from the persisted histograms"""
+        try:
+            return await load_windows(get_redis_client(), robot_id, windows)
+        except redis.RedisError as e:
+            logger.warning(f"Robot latency histogram read failed: {e}")
+            return {}
+
+    async def fold(self) -> None:
+        """Fold accumulated counters into the robots table"""
+        await self._fold_local()
+
+        client = get_redis_client()
+        token = str(uuid.uuid4())
+        try:
+            if not await client.set(FOLD_LOCK_KEY, token, nx=True, ex=max(int(self.fold_interval * 3), 30)):
+                return  # another worker is folding
+
+            if self._take_pending is None:
+                self._take_pending = client.register_script(TAKE_PENDING_SCRIPT)
+                self._release_lock = client.register_script(RELEASE_LOCK_SCRIPT)
+
+            try:
+                # Leftovers of a fold that did not finish are retried under
+                # the same fold id before new counters are taken
+                robot_ids = list(await client.smembers(FOLDING_KEY))
+                fold_id = await client.get(FOLD_ID_KEY)
+                if not robot_ids or fold_id is None:
+                    fold_id = str(uuid.uuid4())
+                    ids = robot_ids + list(await client.srandmember(DIRTY_KEY, self.fold_batch))
+                    robot_ids = await self._take_pending(
+                        keys=[DIRTY_KEY, FOLDING_KEY, FOLD_ID_KEY]
+                        + [PENDING_PREFIX + robot_id for robot_id in ids]
+                        + [FOLDING_PREFIX + robot_id for robot_id in ids],
+                        args=[fold_id, *ids]
+                    ) if ids else []
+                if robot_ids:
+                    pipe = client.pipeline(transaction=False)
+                    for robot_id in robot_ids:
+                        pipe.hgetall(FOLDING_PREFIX + robot_id)
+                    hashes = await pipe.execute()
+                    deltas = {
+                        robot_id: MetricDelta.from_hash(data)
+                        for robot_id, data in zip(robot_ids, hashes)
+                    }
+
+                    await self._apply(deltas, fold_id)
+
+                    pipe = client.pipeline(transaction=True)
+                    for robot_id in robot_ids:
+                        pipe.delete(FOLDING_PREFIX + robot_id)
+                    pipe.delete(FOLDING_KEY, FOLD_ID_KEY)
+                    pipe.sadd(STALE_KEY, *robot_ids)
+                    await pipe.execute()
+
+                await self._refresh_versions(client)
+            finally:
+                await self._release_lock(keys=[FOLD_LOCK_KEY], args=[token])
+        except redis.RedisError as e:
+            logger.warning(f"Robot metrics fold skipped, Redis unavailable: {e}")
+        except Exception as e:
+            logger.error(f"Robot metrics fold failed, will retry: {e}")
+
+    async def _fold_local(self) -> None:
+        if not self._local:
+            return
+        deltas, self._local = self._local, defaultdict(MetricDelta)
+        try:
+            await self._apply(deltas, str(uuid.uuid4()))
+        except Exception as e:
+            logger.error(f"Robot metrics local fold failed, will retry: {e}")
+            for robot_id, delta in deltas.items():
+                self._local[robot_id].merge(delta)
+        else:
+            # Rare (Redis was down when these were recorded): publish now
+            await self._publish(list(deltas))
+
+    async def _refresh_versions(self, client: redis.Redis) -> None:
+        """
+        Drop cached rows and bump HTTP validators of robots folded since the
+        last refresh, unless one happened less than `version_interval` ago
+        """
+        if not await client.exists(STALE_KEY):
+            return
+        if not await client.set(VERSION_DUE_KEY, 1, nx=True, px=int(self.version_interval * 1000)):
+            return
+
+        pipe = client.pipeline(transaction=True)
+        pipe.smembers(STALE_KEY)
+        pipe.delete(STALE_KEY)
+        robot_ids, _ = await pipe.execute()
+        await self._publish(list(robot_ids))
+
+    @staticmethod
+    async def _publish(robot_ids: List[str]) -> None:
+        # Cached rows still carry the old counters; drop them before the new
+        # versions are handed out, or a client could store a stale body under
+        # the new ETag
+        robot_cache = get_robot_cache()
+        await asyncio.gather(*(robot_cache.invalidate(robot_id) for robot_id in robot_ids))
+        await get_robot_versions().bump(*robot_ids)
+
+    async def _apply(self, deltas: Dict[str, MetricDelta], fold_id: str) -> None:
+        """
+        Add metric deltas to the robots table in one batched UPDATE that also
+        records `fold_id`; rows that already carry it are left alone
+        """
+        rows: List[Dict[str, Any]] = [
+            {
+                "b_robot_id": robot_id,
+                "b_fold_id": fold_id,
+                "b_executions": delta.executions,
+                "b_successes": delta.successes,
+                "b_time_sum": delta.time_sum,
+                "b_revenue": delta.revenue,
+            }
+            for robot_id, delta in deltas.items()
+            if delta.executions
+        ]
+        if not rows:
+            return
+
+        robots = Robot.__table__
+        # Column expressions keep the update correct whatever else wrote the row
+        metrics_update = (
+            robots.update()
+            .where(
+                robots.c.id == bindparam("b_robot_id"),
+                or_(robots.c.metrics_fold_id.is_(None), robots.c.metrics_fold_id != bindparam("b_fold_id")),
+            )
+            .values(
+                metrics_fold_id=bindparam("b_fold_id"),
+                execution_count=robots.c.execution_count + bindparam("b_executions"),
+                avg_response_time=(
+                    (robots.c.avg_response_time * robots.c.execution_count + bindparam("b_time_sum"))
+                    / (robots.c.execution_count + bindparam("b_executions"))
+                ),
+                success_rate=(
+                    (robots.c.success_rate * robots.c.execution_count + bindparam("b_successes"))
+                    / (robots.c.execution_count + bindparam("b_executions"))
+                ),
+                total_revenue=robots.c.total_revenue + bindparam("b_revenue"),
+            )
+        )
+
+        async with write_transaction() as db:
+            await db.execute(metrics_update, rows)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.fold_interval)
+            # Shielded so shutdown cannot cancel a fold halfway through
+            await asyncio.shield(self.fold())
+
+    async def start(self) -> None:
+        """Start the periodic fold (called on startup)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop folding and fold once more (called on shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.fold()
+
+
+# Global metrics engine instance
+robot_metrics = RobotMetricsEngine(
+    fold_interval=settings.ROBOT_METRICS_FOLD_INTERVAL_SECONDS,
+    fold_batch=settings.ROBOT_METRICS_FOLD_BATCH,
+    version_interval=settings.ROBOT_METRICS_VERSION_INTERVAL_SECONDS,
+)
@@ -0,0 +1,431 @@
+import re
+from typing import Any, Dict, List, Optional, Set
+
+# Operations that change robot state get controls; GETs are only listed
+CONTROL_METHODS = ("post", "put", "patch")
+
+# Button icons (lucide names used by the web controls) for common enum values
+ICONS = {
+    "forward": "ArrowUp",
+    "up": "ArrowUp",
+    "backward": "ArrowDown",
+    "back": "ArrowDown",
+    "down": "ArrowDown",
+    "left": "ArrowLeft",
+    "right": "ArrowRight",
+}
+STOP_ICON = "AlertOctagon"
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+# Operation fields that describe how to call it (responses are dropped)
+OPERATION_FIELDS = ("summary", "description", "operationId", "parameters", "requestBody")
+
+
+def is_openapi(document: Any) -> bool:
+    """Whether a fetched document is an OpenAPI 3 / Swagger 2 spec"""
+    return (
+        isinstance(document, dict)
+        and ("openapi" in document or "swagger" in document)
+        and isinstance(document.get("paths"), dict)
+    )
+
+
+def pointer(ref: str) -> List[str]:
+    """Path segments of a local JSON pointer ref like #/components/schemas/Move"""
+    return [part.replace("~1", "/").replace("~0", "~") for part in ref[2:].split("/")]
+
+
+def refs(node: Any):
+    """Every $ref under a schema node"""
+    if isinstance(node, dict):
+        if isinstance(node.get("$ref"), str):
+            yield node["$ref"]
+        for value in node.values():
+            yield from refs(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from refs(value)
+
+
+def extract_spec(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The part of an OpenAPI / Swagger document needed to build controls:
+    info, each operation's summary, parameters and request body, and only
+    the components (or definitions) those reference, directly or through
+    other components
+    """
+    spec = {key: document[key] for key in ("openapi", "swagger", "info") if key in document}
+    spec["paths"] = {}
+    for path, item in document["paths"].items():
+        if not isinstance(item, dict):
+            continue
+        spec["paths"][path] = {
+            method: (
+                {field: operation[field] for field in OPERATION_FIELDS if field in operation}
+                if method in HTTP_METHODS else operation
+            )
+            for method, operation in item.items()
+            if method == "parameters" or (method in HTTP_METHODS and isinstance(operation, dict))
+        }
+
+    pending = list(refs(spec["paths"]))
+    seen: Set[str] = set()
+    while pending:
+        ref = pending.pop()
+        if ref in seen or not ref.startswith("#/"):
+            continue
+        seen.add(ref)
+
+        source: Any = document
+        target = spec
+        parts = pointer(ref)
+        for part in parts[:-1]:
+            source = source.get(part) if isinstance(source, dict) else None
+            target = target.setdefault(part, {})
+        node = source.get(parts[-1]) if isinstance(source, dict) else None
+        if node is not None:
+            target[parts[-1]] = node
+            pending.extend(refs(node))
+
+    return spec
+
+
+def resolve(spec: Dict[str, Any], schema: Any, depth: int = 0) -> Dict[str, Any]:
+    """
+    Follow $refs and flatten allOf / nullable anyOf so a schema can be read
+    as a plain object or scalar schema
+    """
+    if not isinstance(schema, dict) or depth > 20:
+        return {}
+
+    if "$ref" in schema:
+        target: Any = spec
+        for part in pointer(schema["$ref"]):
+            target = target.get(part, {}) if isinstance(target, dict) else {}
+        return resolve(spec, target, depth + 1)
+
+    if "allOf" in schema:
+        merged = {k: v for k, v in schema.items() if k != "allOf"}
+        for part in schema["allOf"]:
+            part = resolve(spec, part, depth + 1)
+            merged.setdefault("properties", {}).update(part.get("properties", {}))
+            merged["required"] = list(merged.get("required", [])) + list(part.get("required", []))
+            for key, value in part.items():
+                merged.setdefault(key, value)
+        return merged
+
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [o for o in schema[key] if not (isinstance(o, dict) and o.get("type") == "null")]
+            if len(options) == 1:
+                merged = {k: v for k, v in schema.items() if k != key}
+                return {**resolve(spec, options[0], depth + 1), **merged}
+            return schema
+
+    return schema
+
+
+def field_kind(schema: Dict[str, Any]) -> Optional[str]:
+    """
+    'enum', 'bool', 'number' (bounded numeric), 'numeric' (unbounded) or
+    'text' (free string) for fields that map to a control
+    """
+    if schema.get("enum") or "const" in schema:
+        return "enum"
+    if schema.get("type") == "boolean":
+        return "bool"
+    if schema.get("type") in ("integer", "number"):
+        return "number" if bounds(schema) is not None else "numeric"
+    if schema.get("type") == "string":
+        return "text"
+    return None
+
+
+def bounds(schema: Dict[str, Any]) -> Optional[List[float]]:
+    low = schema.get("minimum", schema.get("exclusiveMinimum"))
+    high = schema.get("maximum", schema.get("exclusiveMaximum"))
+    # OpenAPI 3.0 / Swagger 2 spell exclusive bounds as booleans
+    if isinstance(low, bool) or isinstance(high, bool) or low is None or high is None:
+        return None
+    if schema.get("type") == "integer":
+        return [int(low), int(high)]
+    return [low, high]
+
+
+def default_value(schema: Dict[str, Any]) -> Any:
+    """Value to send for a field the user does not set (None if there is none)"""
+    if schema.get("default") is not None:
+        return schema["default"]
+    if schema.get("examples"):
+        return schema["examples"][0]
+    if schema.get("example") is not None:
+        return schema["example"]
+    if "const" in schema:
+        return schema["const"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    return None
+
+
+# Form input per field kind (see input_field)
+INPUT_TYPES = {"text": "text", "numeric": "number", "number": "number", "enum": "select", "bool": "checkbox"}
+
+
+def input_field(name: str, schema: Dict[str, Any], kind: Optional[str], required: bool) -> Optional[Dict[str, Any]]:
+    """One field of an input control (None if no form input can supply it)"""
+    if kind not in INPUT_TYPES:
+        return None
+    field = {"name": name, "label": title(name), "input": INPUT_TYPES[kind], "required": required}
+    if kind == "enum":
+        field["options"] = schema.get("enum") or [schema["const"]]
+    if kind in ("number", "numeric"):
+        if kind == "number":
+            field["min"], field["max"] = bounds(schema)
+        if schema.get("type") == "integer":
+            field["step"] = 1
+    if default_value(schema) is not None:
+        field["default"] = default_value(schema)
+    if schema.get("x-unit"):
+        field["unit"] = schema["x-unit"]
+    return field
+
+
+def slug(path: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", path.lower()).strip("_") or "root"
+
+
+def title(text: str) -> str:
+    return re.sub(r"[_\-]+", " ", str(text)).strip().title()
+
+
+def request_schema(spec: Dict[str, Any], operation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    JSON body schema of an operation ({} when it takes no body), or None when
+    the operation needs input a control cannot supply (path or required query
+    parameters, non-JSON bodies)
+    """
+    body = None
+    for parameter in operation.get("parameters", []):
+        parameter = resolve(spec, parameter)
+        if parameter.get("in") == "body":  # Swagger 2
+            body = parameter.get("schema", {})
+        elif parameter.get("in") == "path" or parameter.get("required"):
+            return None
+
+    request_body = resolve(spec, operation.get("requestBody"))
+    if request_body:
+        content = request_body.get("content", {})
+        if "application/json" not in content:
+            return None
+        body = content["application/json"].get("schema", {})
+
+    return resolve(spec, body) if body is not None else {}
+
+
+def operation_parameters(
+    spec: Dict[str, Any],
+    item: Dict[str, Any],
+    operation: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Parameters of an operation, including those declared once for its path;
+    an operation-level parameter overrides a path-level one with the same
+    name and location
+    """
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for parameter in list(item.get("parameters", [])) + list(operation.get("parameters", [])):
+        parameter = resolve(spec, parameter)
+        merged[(parameter.get("name"), parameter.get("in"))] = parameter
+    return list(merged.values())
+
+
+def compile_operation(
+    spec: Dict[str, Any],
+    path: str,
+    method: str,
+    operation: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """Controls for one operation (empty when it cannot be mapped)"""
+    body = request_schema(spec, operation)
+    if body is None:
+        return []
+
+    base_id = slug(path)
+    label = operation.get("summary") or title(path.rsplit("/", 1)[-1] or "root")
+    control = {"endpoint": path, "method": method.upper()}
+
+    properties = {name: resolve(spec, schema) for name, schema in body.get("properties", {}).items()}
+    required: Set[str] = set(body.get("required", []))
+    kinds = {name: field_kind(schema) for name, schema in properties.items()}
+    defaults = {name: default_value(schema) for name, schema in properties.items()}
+
+    def fixed_params(exclude: Set[str]) -> Optional[Dict[str, Any]]:
+        """Required fields and fields with defaults, or None if a required one has no value"""
+        params = {}
+        for name in properties:
+            if name in exclude:
+                continue
+            if defaults[name] is not None:
+                params[name] = defaults[name]
+            elif name in required:
+                return None
+        return params
+
+    # Enums: one button per value, other fields at their defaults (left to
+    # the input form below when another required field has no value)
+    enums = [name for name, kind in kinds.items() if kind == "enum"]
+    params = fixed_params({enums[0]}) if enums else None
+    if params is not None:
+        field = enums[0]
+        values = properties[field].get("enum") or [properties[field]["const"]]
+        return [
+            {
+                **control,
+                "id": f"{base_id}_{slug(str(value))}",
+                "type": "button",
+                "label": f"{label} {title(value)}",
+                "params": {field: value, **params},
+                "icon": ICONS.get(str(value).lower()),
+            }
+            for value in values
+        ]
+
+    # Sliders, toggles and joysticks only send their own fields, so each
+    # one is offered only if it covers every required field
+    controls = []
+    numbers = [name for name, kind in kinds.items() if kind == "number"]
+    toggles = [name for name, kind in kinds.items() if kind == "bool"]
+
+    if len(numbers) == 2 and required <= set(numbers):
+        controls.append({
+            **control,
+            "id": base_id,
+            "type": "joystick",
+            "label": label,
+            "axes": numbers,
+            "range": {name: bounds(properties[name]) for name in numbers},
+        })
+        numbers = []
+
+    single = len(properties) == 1
+    for name in numbers:
+        if not required <= {name}:
+            continue
+        low, high = bounds(properties[name])
+        if properties[name].get("multipleOf"):
+            step = properties[name]["multipleOf"]
+        elif properties[name].get("type") == "integer":
+            step = max(1, (high - low) // 20)
+        else:
+            step = (high - low) / 100
+        slider = {
+            **control,
+            "id": base_id if single else f"{base_id}_{slug(name)}",
+            "type": "slider",
+            "label": label if single else title(name),
+            "param_name": name,
+            "min": low,
+            "max": high,
+            "step": step,
+        }
+        if properties[name].get("x-unit"):
+            slider["unit"] = properties[name]["x-unit"]
+        controls.append(slider)
+
+    for name in toggles:
+        if not required <= {name}:
+            continue
+        controls.append({
+            **control,
+            "id": base_id if single else f"{base_id}_{slug(name)}",
+            "type": "toggle",
+            "label": label if single else title(name),
+            "param_name": name,
+        })
+
+    if controls:
+        return controls
+
+    # Free text and unbounded numbers, or required fields nothing above can
+    # fill: one input form (enums as selects), other fields at their defaults
+    entries = [
+        name for name in properties
+        if kinds[name] in ("text", "numeric", "enum") or (name in required and defaults[name] is None)
+    ]
+    if entries:
+        fields = [input_field(name, properties[name], kinds[name], name in required) for name in entries]
+        if None in fields:
+            return []
+        params = {name: defaults[name] for name in properties if name not in entries and defaults[name] is not None}
+        return [{
+            **control,
+            "id": base_id,
+            "type": "input",
+            "label": label,
+            "fields": fields,
+            "params": params,
+        }]
+
+    # Nothing adjustable: a plain action button
+    params = fixed_params(set())
+    if params is None:
+        return []
+    return [{
+        **control,
+        "id": base_id,
+        "type": "button",
+        "label": label,
+        "params": params,
+        "icon": STOP_ICON if "stop" in base_id else None,
+    }]
+
+
+def compile_interface(
+    spec: Dict[str, Any],
+    has_video: bool,
+    has_gps: bool
+) -> Optional[Dict[str, Any]]:
+    """
+    Build an interface_config straight from an OpenAPI / Swagger spec.
+
+    Each POST/PUT/PATCH operation (with any parameters declared on its
+    path) is mapped from its JSON request schema:
+    enums become one button per value, bounded numbers become sliders,
+    booleans become toggles and a pair of bounded numbers becomes a
+    joystick. Free strings and unbounded numbers (or required fields none
+    of those can fill) become an input form. Operations without a body
+    become buttons. Operations that need input no control can supply are
+    left out. Returns None when the
+    spec yields no controls, so the caller can fall back to Claude.
+    """
+    if not is_openapi(spec):
+        return None
+
+    controls: List[Dict[str, Any]] = []
+    seen: Set[str] = set()
+    for path, item in spec["paths"].items():
+        if not isinstance(item, dict):
+            continue
+        for method in CONTROL_METHODS:
+            if not isinstance(item.get(method), dict):
+                continue
+            operation = {**item[method], "parameters": operation_parameters(spec, item, item[method])}
+            for control in compile_operation(spec, path, method, operation):
+                if control["id"] in seen:
+                    control["id"] = f"{control['id']}_{method}"
+                seen.add(control["id"])
+                if control.get("icon") is None:
+                    control.pop("icon", None)
+                controls.append(control)
+
+    if not controls:
+        return None
+
+    return {
+        "controls": controls,
+        "has_video": has_video,
+        "has_gps": has_gps,
+        "api_version": str(spec.get("info", {}).get("version", "1.0")),
+        "discovered_endpoints": list(spec["paths"]),
+    }
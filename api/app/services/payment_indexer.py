@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import redis.asyncio as redis
+from app.config import settings
+from app.core.blockchain import SolanaPaymentVerifier, get_payment_verifier
+from app.core.cache import get_redis_client, get_user_cache
+from app.core.instrumentation import SOLANA_RPC_DURATION
+from app.core.session import PaymentSession, get_session_manager
+from app.core.signature_registry import get_signature_registry
+from app.database import AsyncSessionLocal
+from app.services.payment_settlement import (
+    RobotLockedError,
+    SettlementInProgress,
+    await_other_settlement,
+    settle_claimed_session,
+)
+
+logger = logging.getLogger(__name__)
+
+CURSOR_PREFIX = "payment_indexer:cursor:"
+POLL_LOCK_KEY = "payment_indexer:lock"
+
+# Transfers landing slightly before a session was created (clock skew between
+# us and the cluster) still count for it
+CLOCK_SKEW = timedelta(seconds=60)
+
+# Release the poll lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Extend the poll lock only if we still own it
+RENEW_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def match_session(
+    parsed: Dict[str, Any],
+    token_account: str,
+    block_time: Optional[datetime],
+    sessions: List[PaymentSession],
+    wallets: Dict[str, str],
+) -> Optional[PaymentSession]:
+    """
+    Pick the open session an incoming transaction pays for. Only transfers
+    into `token_account` count. A memo carrying the session id wins; a
+    transfer without memo must come from the session user's wallet
+    (`wallets` maps user ids to wallet addresses) and match the amount of
+    exactly one such session. Anything else is left for the client to
+    verify explicitly.
+    """
+    incoming = {
+        "err": parsed["err"],
+        "transfers": [t for t in parsed["transfers"] if t["destination"] == token_account],
+        "memos": parsed["memos"],
+    }
+    if incoming["err"] is not None or not incoming["transfers"]:
+        return None
+
+    if block_time is not None:
+        sessions = [s for s in sessions if block_time >= s.created_at - CLOCK_SKEW]
+
+    for session in sessions:
+        if any(session.id in memo for memo in incoming["memos"]):
+            if SolanaPaymentVerifier.match_transfer(incoming, session.amount):
+                return session
+            return None  # memo names a session but the amount is wrong
+
+    if incoming["memos"]:
+        return None  # memo for some other (closed) session, or unrelated
+
+    def paid_by(user_id: str) -> Dict[str, Any]:
+        wallet = wallets.get(user_id)
+        return {**incoming, "transfers": [t for t in incoming["transfers"] if wallet and t["authority"] == wallet]}
+
+    candidates = [
+        session for session in sessions
+        if SolanaPaymentVerifier.match_transfer(paid_by(session.user_id), session.amount)
+    ]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+class PaymentIndexer:
+    """
+    Settles payment sessions as soon as their transfer lands on-chain.
+
+    For every recipient wallet with open sessions, the indexer polls
+    getSignaturesForAddress on the wallet's rUSD token account, using the
+    newest signature seen as the `until` cursor so each poll only returns new
+    transactions. Incoming transfers are matched against the open sessions
+    by memo, or by payer and amount, and matching sessions are settled exactly like
+    /payments/verify would, so that endpoint usually finds them already paid.
+
+    A Redis lock makes sure only one worker polls at a time; it is renewed
+    while a poll runs, and a poll that loses it stops before settling
+    anything else. The cursor lives in Redis so another worker can take over. At most `signature_limit`
+    signatures are read per account and poll. Anything the indexer misses
+    is still settled by the client's explicit verify call.
+    """
+
+    def __init__(self, poll_interval: float, signature_limit: int):
+        self.poll_interval = poll_interval
+        self.signature_limit = signature_limit
+        self._token_accounts: Dict[str, Optional[str]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._release_lock = None
+        self._renew_lock = None
+
+    @property
+    def lock_ttl(self) -> int:
+        return max(int(self.poll_interval * 5), 30)
+
+    def token_account(self, wallet_address: str) -> Optional[str]:
+        """Associated rUSD token account of a wallet (None if the address is invalid)"""
+        if wallet_address not in self._token_accounts:
+            from solders.pubkey import Pubkey
+            from spl.token.instructions import get_associated_token_address
+
+            try:
+                self._token_accounts[wallet_address] = str(get_associated_token_address(
+                    Pubkey.from_string(wallet_address),
+                    Pubkey.from_string(settings.STABLECOIN_MINT)
+                ))
+            except ValueError:
+                logger.warning(f"Payment indexer skipping invalid wallet address: {wallet_address}")
+                self._token_accounts[wallet_address] = None
+        return self._token_accounts[wallet_address]
+
+    async def poll(self) -> None:
+        """Scan every recipient with open sessions once"""
+        client = get_redis_client()
+        token = str(uuid.uuid4())
+        try:
+            if not await client.set(POLL_LOCK_KEY, token, nx=True, ex=self.lock_ttl):
+                return  # another worker is polling
+
+            if self._release_lock is None:
+                self._release_lock = client.register_script(RELEASE_LOCK_SCRIPT)
+                self._renew_lock = client.register_script(RENEW_LOCK_SCRIPT)
+
+            lost = asyncio.Event()
+            renewal = asyncio.create_task(self._keep_lock(token, lost))
+            try:
+                recipients = await get_session_manager().get_pending_recipients()
+                await asyncio.gather(*[self._scan(recipient, lost) for recipient in recipients])
+            finally:
+                renewal.cancel()
+                await self._release_lock(keys=[POLL_LOCK_KEY], args=[token])
+        except redis.RedisError as e:
+            logger.warning(f"Payment indexer poll skipped, Redis unavailable: {e}")
+
+    async def _keep_lock(self, token: str, lost: asyncio.Event) -> None:
+        """Renew the poll lock every third of its TTL; set `lost` once another worker has it"""
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            try:
+                if not await self._renew_lock(keys=[POLL_LOCK_KEY], args=[token, self.lock_ttl]):
+                    logger.warning("Payment indexer lost its poll lock, stopping this poll")
+                    lost.set()
+                    return
+            except redis.RedisError as e:
+                logger.warning(f"Payment indexer lock renewal failed: {e}")
+
+    async def _scan(self, wallet_address: str, lost: asyncio.Event) -> None:
+        from solana.rpc.commitment import Confirmed
+        from solders.pubkey import Pubkey
+        from solders.signature import Signature
+
+        try:
+            sessions = await get_session_manager().get_pending_sessions(wallet_address)
+            token_account = self.token_account(wallet_address)
+            if not sessions or token_account is None:
+                return
+
+            client = get_redis_client()
+            cursor_key = CURSOR_PREFIX + token_account
+            cursor = await client.get(cursor_key)
+
+            verifier = get_payment_verifier()
+            with SOLANA_RPC_DURATION.labels("getSignaturesForAddress").time():
+                response = await verifier.client.get_signatures_for_address(
+                    Pubkey.from_string(token_account),
+                    until=Signature.from_string(cursor) if cursor else None,
+                    limit=self.signature_limit,
+                    commitment=Confirmed
+                )
+            signatures = response.value  # newest first
+            if not signatures:
+                return
+
+            # Re-read the open sessions now: every listed transfer was paid
+            # for a session created before this point, so none is missed
+            sessions = await get_session_manager().get_pending_sessions(wallet_address)
+            wallets = await self._user_wallets(sessions)
+
+            # Oldest first, so sessions are matched in payment order
+            for info in reversed(signatures):
+                if lost.is_set():
+                    return  # another worker scans from the unchanged cursor
+                if info.err is not None:
+                    continue
+                block_time = datetime.utcfromtimestamp(info.block_time) if info.block_time else None
+                settled = await self._process(str(info.signature), token_account, block_time, sessions, wallets)
+                if settled is not None:
+                    sessions = [s for s in sessions if s.id != settled.id]
+                if not sessions:
+                    break
+
+            await client.set(cursor_key, str(signatures[0].signature))
+        except SettlementInProgress as e:
+            logger.info(f"Payment indexer scan of {wallet_address} paused, session {e} is being settled")
+        except Exception as e:
+            logger.error(f"Payment indexer scan of {wallet_address} failed: {e}")
+
+    @staticmethod
+    async def _user_wallets(sessions: List[PaymentSession]) -> Dict[str, str]:
+        """Wallet address of each session's user"""
+        wallets = {}
+        async with AsyncSessionLocal() as db:
+            for user_id in {session.user_id for session in sessions}:
+                user = await get_user_cache().get(user_id, db)
+                if user is not None:
+                    wallets[user_id] = user.wallet_address
+        return wallets
+
+    async def _process(
+        self,
+        signature: str,
+        token_account: str,
+        block_time: Optional[datetime],
+        sessions: List[PaymentSession],
+        wallets: Dict[str, str],
+    ) -> Optional[PaymentSession]:
+        registry = get_signature_registry()
+        parsed = await get_payment_verifier().get_parsed_transaction(signature)
+        if parsed is None:
+            return None
+
+        session = match_session(parsed, token_account, block_time, sessions, wallets)
+        if session is None:
+            return None
+
+        if not await registry.consume(signature, session.id):
+            return None  # already paid for another session
+
+        session_manager = get_session_manager()
+        if not await session_manager.claim_settlement(session.id):
+            # The verify endpoint got there first; if it has not finished,
+            # the scan stops here and leaves the cursor for the next poll
+            await await_other_settlement(session.id, signature)
+            return session
+
+        try:
+            await settle_claimed_session(session, signature)
+            logger.info(f"Payment indexer settled session {session.id} with {signature}")
+        except RobotLockedError:
+            logger.warning(f"Payment indexer settled session {session.id} but robot {session.robot_id} is locked")
+        return session
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            # Shielded so shutdown cannot cancel a settlement halfway through
+            await asyncio.shield(self.poll())
+
+    async def start(self) -> None:
+        """Start polling (called on startup)"""
+        if self._task is None and settings.PAYMENT_INDEXER_ENABLED:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop polling (called on shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global payment indexer instance
+payment_indexer = PaymentIndexer(
+    poll_interval=settings.PAYMENT_INDEXER_POLL_INTERVAL_SECONDS,
+    signature_limit=settings.PAYMENT_INDEXER_SIGNATURE_LIMIT,
+)
@@ -0,0 +1,148 @@
+import logging
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import get_robot_cache
+from app.core.read_routing import get_read_routing
+from app.core.security import invalidate_user
+from app.core.session import PaymentSession, get_session_manager
+from app.core.signature_registry import get_signature_registry
+from app.database import write_transaction
+from app.models.payment import PaymentSessionDB
+from app.services.payment_stats import record_paid_session
+
+logger = logging.getLogger(__name__)
+
+
+class RobotLockedError(Exception):
+    """The robot is locked by another user, so the paid session cannot start"""
+
+
+class SettlementInProgress(Exception):
+    """Another caller holds the session's settlement claim and has not finished"""
+
+
+async def settle_session(
+    db: AsyncSession,
+    session: PaymentSession,
+    tx_signature: str
+) -> PaymentSession:
+    """
+    Lock the robot for the rental, record the payment and mark the verified
+    session paid. The payment is committed before the session is marked paid
+    in Redis, so if any step fails the session stays unpaid and settling it
+    again completes the remaining steps. Shared by the verify endpoint and
+    the payment indexer; the caller must hold the session's settlement claim.
+    """
+    session_manager = get_session_manager()
+    paid_at = datetime.utcnow()
+
+    # Already recorded by an attempt that failed to mark the session paid
+    recorded = await db.get(PaymentSessionDB, session.id)
+    if recorded is None:
+        # Get robot to determine lock duration
+        robot = await get_robot_cache().get(session.robot_id, db)
+
+        # Determine lock duration from rental plan
+        duration_minutes = 10  # Default
+        if robot and robot.rental_plans and session.service_payload:
+            rental_plan_index = session.service_payload.get('rental_plan_index')
+            if rental_plan_index is not None and 0 <= rental_plan_index < len(robot.rental_plans):
+                selected_plan = robot.rental_plans[rental_plan_index]
+                duration_minutes = selected_plan.get('duration_minutes', 10)
+
+        # Lock the robot for exclusive use
+        lock_acquired = await session_manager.lock_robot(
+            robot_id=session.robot_id,
+            user_id=session.user_id,
+            duration_minutes=duration_minutes
+        )
+
+        if not lock_acquired:
+            # This shouldn't happen since we check before creating session;
+            # the transfer went through, so the session is paid regardless
+            await session_manager.mark_paid(session.id, tx_signature, paid_at)
+            raise RobotLockedError(session.robot_id)
+
+        try:
+            # Update the user's payment aggregates (before the session row is
+            # added, so a first-time backfill does not count it twice)
+            await record_paid_session(
+                db,
+                user_id=session.user_id,
+                robot_id=session.robot_id,
+                amount=session.amount,
+                paid_at=paid_at
+            )
+
+            # Save to database for historical records
+            db.add(PaymentSessionDB(
+                id=session.id,
+                user_id=session.user_id,
+                robot_id=session.robot_id,
+                amount=session.amount,
+                currency=session.currency,
+                recipient_address=session.recipient_address,
+                status="paid",
+                tx_signature=tx_signature,
+                service_payload=session.service_payload,
+                created_at=session.created_at,
+                expires_at=session.expires_at,
+                paid_at=paid_at
+            ))
+            await db.commit()
+        except BaseException:
+            await session_manager.unlock_robot(session.robot_id, session.user_id)
+            raise
+    else:
+        paid_at = recorded.paid_at or paid_at
+
+    # Mark session as paid
+    session = await session_manager.mark_paid(session.id, tx_signature, paid_at) or session
+    await invalidate_user(session.user_id)  # total_spent changed
+    # Settled by the indexer too, so the user may not have made a request
+    await get_read_routing().wrote(session.user_id)
+
+    return session
+
+
+async def settle_claimed_session(session: PaymentSession, tx_signature: str) -> PaymentSession:
+    """
+    Settle a session in its own write transaction. The caller must hold the
+    settlement claim and have consumed `tx_signature` for the session; if
+    settling fails (other than on a locked robot, where the session is
+    already paid) both are released so the verify endpoint or the indexer
+    can try again.
+    """
+    try:
+        async with write_transaction() as db:
+            return await settle_session(db, session, tx_signature)
+    except RobotLockedError:
+        raise
+    except BaseException:
+        logger.warning(f"Settling session {session.id} failed, releasing its claim and {tx_signature}")
+        await get_signature_registry().release(tx_signature, session.id)
+        await get_session_manager().release_settlement(session.id)
+        raise
+
+
+async def release_unused_signature(session: PaymentSession, tx_signature: str) -> None:
+    """
+    Release `tx_signature` if the paid session was settled with a different
+    transfer, so the consumed signature is not lost for good. The registry
+    only drops it if it is still consumed for this session.
+    """
+    if session.status == "paid" and session.tx_signature and session.tx_signature != tx_signature:
+        await get_signature_registry().release(tx_signature, session.id)
+
+
+async def await_other_settlement(session_id: str, tx_signature: str) -> None:
+    """
+    Called when another caller holds the settlement claim: returns if the
+    session is paid (releasing `tx_signature` if it paid with another one),
+    otherwise raises SettlementInProgress. The signature is kept while the
+    other settlement runs, since it may be settling with the same one.
+    """
+    session = await get_session_manager().get_session(session_id)
+    if session is None or session.status != "paid":
+        raise SettlementInProgress(session_id)
+    await release_unused_signature(session, tx_signature)
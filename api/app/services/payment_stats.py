@@ -0,0 +1,156 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import select, update, func, case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.payment import PaymentSessionDB, UserPaymentStats, UserRobotUsage
+from app.models.user import User
+from app.database import write_transaction
+
+
+async def _backfill_user_stats(db: AsyncSession, user_id: str) -> UserPaymentStats:
+    """
+    Build a user's aggregate from payment_sessions (runs once per user), and
+    reconcile the user row's total_spent with it
+    """
+    totals = (await db.execute(
+        select(
+            func.count(),
+            func.count().filter(PaymentSessionDB.status == "paid"),
+            func.coalesce(func.sum(PaymentSessionDB.amount).filter(PaymentSessionDB.status == "paid"), 0),
+            func.max(PaymentSessionDB.paid_at).filter(PaymentSessionDB.status == "paid"),
+        ).where(PaymentSessionDB.user_id == user_id)
+    )).one()
+
+    usage_rows = (await db.execute(
+        select(PaymentSessionDB.robot_id, func.count())
+        .where(
+            PaymentSessionDB.user_id == user_id,
+            PaymentSessionDB.status == "paid"
+        )
+        .group_by(PaymentSessionDB.robot_id)
+    )).all()
+
+    most_used_robot_id, most_used_robot_count = None, 0
+    for robot_id, count in usage_rows:
+        db.add(UserRobotUsage(user_id=user_id, robot_id=robot_id, session_count=count))
+        if count > most_used_robot_count:
+            most_used_robot_id, most_used_robot_count = robot_id, count
+
+    stats = UserPaymentStats(
+        user_id=user_id,
+        total_sessions=totals[0] or 0,
+        paid_sessions=totals[1] or 0,
+        total_spent=Decimal(str(totals[2] or 0)),
+        last_payment_at=totals[3],
+        most_used_robot_id=most_used_robot_id,
+        most_used_robot_count=most_used_robot_count,
+    )
+    db.add(stats)
+    await db.flush()
+
+    # From here on both totals are incremented together
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(total_spent=stats.total_spent)
+        .execution_options(synchronize_session=False)
+    )
+    return stats
+
+
+async def _ensure_user_stats(db: AsyncSession, user_id: str) -> UserPaymentStats:
+    """Return the user's aggregate row, creating it in `db`'s transaction if missing"""
+    stats = await db.get(UserPaymentStats, user_id)
+    if stats is None:
+        try:
+            async with db.begin_nested():
+                stats = await _backfill_user_stats(db, user_id)
+        except IntegrityError:
+            # A concurrent transaction created it first
+            stats = await db.get(UserPaymentStats, user_id, populate_existing=True)
+    return stats
+
+
+async def _increment_robot_usage(db: AsyncSession, user_id: str, robot_id: str) -> Optional[int]:
+    """Add one to the (user, robot) usage count; None if the row does not exist"""
+    result = await db.execute(
+        update(UserRobotUsage)
+        .where(UserRobotUsage.user_id == user_id, UserRobotUsage.robot_id == robot_id)
+        .values(session_count=UserRobotUsage.session_count + 1)
+        .returning(UserRobotUsage.session_count)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_user_stats(db: AsyncSession, user_id: str) -> UserPaymentStats:
+    """
+    Return the user's aggregate row, creating it on first access. `db` may
+    be read-only; the first-access backfill runs in its own write transaction
+    """
+    stats = await db.get(UserPaymentStats, user_id)
+    if stats is None:
+        # Checked again there: a lagging replica may not have the row yet
+        async with write_transaction() as writer:
+            stats = await _ensure_user_stats(writer, user_id)
+    return stats
+
+
+async def record_paid_session(
+    db: AsyncSession,
+    user_id: str,
+    robot_id: str,
+    amount: float,
+    paid_at: Optional[datetime],
+) -> None:
+    """
+    Fold one newly paid session into the user's aggregates.
+    Must run before the PaymentSessionDB row is added, so a first-time
+    backfill does not count it twice. Caller commits.
+    """
+    await _ensure_user_stats(db, user_id)
+    amount = Decimal(str(amount))
+    paid_at = paid_at or datetime.utcnow()
+
+    # Per-robot usage count
+    robot_count = await _increment_robot_usage(db, user_id, robot_id)
+    if robot_count is None:
+        try:
+            async with db.begin_nested():
+                db.add(UserRobotUsage(user_id=user_id, robot_id=robot_id, session_count=1))
+            robot_count = 1
+        except IntegrityError:
+            # A concurrent settlement for the same robot inserted it first
+            robot_count = await _increment_robot_usage(db, user_id, robot_id)
+
+    # Aggregate row; expressions read the stored values, so concurrent
+    # verifications for the same user do not overwrite each other
+    takes_lead = (UserPaymentStats.most_used_robot_id == robot_id) | (
+        UserPaymentStats.most_used_robot_count < robot_count
+    )
+    await db.execute(
+        update(UserPaymentStats)
+        .where(UserPaymentStats.user_id == user_id)
+        .values(
+            total_sessions=UserPaymentStats.total_sessions + 1,
+            paid_sessions=UserPaymentStats.paid_sessions + 1,
+            total_spent=UserPaymentStats.total_spent + amount,
+            last_payment_at=case(
+                (UserPaymentStats.last_payment_at.is_(None), paid_at),
+                (UserPaymentStats.last_payment_at < paid_at, paid_at),
+                else_=UserPaymentStats.last_payment_at
+            ),
+            most_used_robot_id=case((takes_lead, robot_id), else_=UserPaymentStats.most_used_robot_id),
+            most_used_robot_count=case((takes_lead, robot_count), else_=UserPaymentStats.most_used_robot_count),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    # Keep the denormalized balance on the user row in step
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(total_spent=func.coalesce(User.total_spent, 0) + amount)
+        .execution_options(synchronize_session=False)
+    )
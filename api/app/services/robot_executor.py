@@ -1,10 +1,12 @@
-import httpx
 import time
 from typing import Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from app.core.cache import get_robot_cache
+from app.core.instrumentation import ROBOT_CALL_DURATION
 from app.models.robot import Robot
-from app.models.payment import ExecutionLog
+from app.services.http_pool import RobotHTTPClientPool, build_robot_http_pool
+from app.services.metrics_engine import robot_metrics
+from app.services.write_behind import execution_writer
 from uuid import UUID
 
 
@@ -13,20 +15,38 @@ class RobotExecutor:
     Service to execute robot tasks by calling their endpoints
     """
 
+    def __init__(self):
+        self.http_pool: Optional[RobotHTTPClientPool] = None
+
+    async def start(self) -> None:
+        """Create the shared robot HTTP client pool (called on startup)"""
+        if self.http_pool is None:
+            self.http_pool = build_robot_http_pool()
+
+    async def close(self) -> None:
+        """Close pooled robot connections (called on shutdown)"""
+        if self.http_pool is not None:
+            await self.http_pool.close()
+            self.http_pool = None
+
     async def execute(
         self,
         robot_id: UUID,
         user_id: UUID,
         session_id: Optional[UUID],
         payload: Dict[str, Any],
-        db: AsyncSession
+        db: AsyncSession,
+        robot: Optional[Robot] = None
     ) -> Dict[str, Any]:
         """
-        Execute a robot task
+        Execute a robot task. `robot` may be passed in when the caller has
+        already loaded it; otherwise it is read from the robot cache.
         """
+        import httpx
+
         # Get robot details
-        result = await db.execute(select(Robot).where(Robot.id == robot_id))
-        robot = result.scalar_one_or_none()
+        if robot is None:
+            robot = await get_robot_cache().get(str(robot_id), db)
 
         if not robot:
             raise ValueError("Robot not found")
@@ -35,12 +55,11 @@ class RobotExecutor:
             raise ValueError(f"Robot is {robot.status}")
 
         start_time = time.time()
-        execution_log = ExecutionLog(
-            session_id=session_id,
-            robot_id=robot_id,
-            user_id=user_id,
-            status="pending"
-        )
+        log_ids = {
+            "robot_id": str(robot_id),
+            "user_id": str(user_id),
+            "session_id": str(session_id) if session_id else None,
+        }
 
         try:
             # Prepare headers
@@ -50,43 +69,36 @@ class RobotExecutor:
             if robot.control_api_key:
                 headers["X-API-Key"] = robot.control_api_key
 
-            # Call robot endpoint
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    robot.endpoint,
-                    json=payload,
-                    headers=headers
-                )
+            # Call robot endpoint over the pooled keep-alive client
+            if self.http_pool is None:
+                await self.start()
+            client = self.http_pool.get_client(robot.endpoint)
+            response = await client.post(
+                robot.endpoint,
+                json=payload,
+                headers=headers
+            )
 
-                response.raise_for_status()
-                result_data = response.json()
+            response.raise_for_status()
+            result_data = response.json()
 
             # Calculate execution time
             execution_time = time.time() - start_time
+            ROBOT_CALL_DURATION.labels("success").observe(execution_time)
 
-            # Update execution log
-            execution_log.status = "success"
-            execution_log.response_time = execution_time
-
-            # Update robot metrics
-            new_count = robot.execution_count + 1
-            new_avg_time = (
-                (robot.avg_response_time * robot.execution_count + execution_time) / new_count
+            # Log and metrics are written in the background, off the hot path
+            execution_writer.record(
+                **log_ids,
+                status="success",
+                response_time=execution_time
             )
-
-            await db.execute(
-                update(Robot)
-                .where(Robot.id == robot_id)
-                .values(
-                    execution_count=new_count,
-                    avg_response_time=new_avg_time,
-                    total_revenue=robot.total_revenue + robot.price
-                )
+            await robot_metrics.record(
+                log_ids["robot_id"],
+                success=True,
+                response_time=execution_time,
+                revenue=robot.price
             )
 
-            db.add(execution_log)
-            await db.commit()
-
             return {
                 "success": True,
                 "data": result_data,
@@ -95,26 +107,18 @@ class RobotExecutor:
 
         except httpx.HTTPError as e:
             execution_time = time.time() - start_time
-            execution_log.status = "error"
-            execution_log.response_time = execution_time
-            execution_log.error = str(e)
-
-            # Update robot success rate
-            total = robot.execution_count + 1
-            successes = robot.execution_count * robot.success_rate
-            new_success_rate = successes / total
-
-            await db.execute(
-                update(Robot)
-                .where(Robot.id == robot_id)
-                .values(
-                    execution_count=total,
-                    success_rate=new_success_rate
-                )
+            ROBOT_CALL_DURATION.labels("error").observe(execution_time)
+            execution_writer.record(
+                **log_ids,
+                status="error",
+                response_time=execution_time,
+                error=str(e)
+            )
+            await robot_metrics.record(
+                log_ids["robot_id"],
+                success=False,
+                response_time=execution_time
             )
-
-            db.add(execution_log)
-            await db.commit()
 
             return {
                 "success": False,
@@ -123,10 +127,11 @@ class RobotExecutor:
             }
 
         except Exception as e:
-            execution_log.status = "error"
-            execution_log.error = str(e)
-            db.add(execution_log)
-            await db.commit()
+            execution_writer.record(
+                **log_ids,
+                status="error",
+                error=str(e)
+            )
 
             return {
                 "success": False,
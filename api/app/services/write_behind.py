@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from app.config import settings
+from app.database import write_transaction
+from app.models.payment import ExecutionLog
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutionWriteBehind:
+    """
+    Write-behind buffer for execution logs.
+
+    RobotExecutor records each command here and returns immediately; a
+    background task flushes the buffer as one bulk insert of ExecutionLog rows
+    whenever `batch_size` logs are pending or every `flush_interval` seconds,
+    and once more on shutdown. Robot metrics are kept by RobotMetricsEngine.
+
+    A log the database rejects (constraint or data error) is found by
+    splitting the batch, then logged and dropped; logs that fail for other
+    reasons are retried on later flushes, up to `max_attempts` times.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_buffer: int, max_attempts: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_attempts = max_attempts
+        self._logs: List[Dict[str, Any]] = []
+        # log id -> failed flushes so far
+        self._attempts: Dict[str, int] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(
+        self,
+        robot_id: str,
+        user_id: str,
+        session_id: Optional[str],
+        status: str,
+        response_time: Optional[float] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """Buffer one execution (never blocks on the database)"""
+        self._logs.append({
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "robot_id": robot_id,
+            "user_id": user_id,
+            "status": status,
+            "response_time": response_time,
+            "error": error,
+            "executed_at": datetime.utcnow(),
+        })
+
+        if len(self._logs) > self.max_buffer:
+            # Database unavailable for too long: keep memory bounded
+            dropped = len(self._logs) - self.max_buffer
+            del self._logs[:dropped]
+            logger.error(f"Execution log buffer full, dropped {dropped} oldest logs")
+
+        if len(self._logs) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far"""
+        async with self._flush_lock:
+            if not self._logs:
+                return
+
+            logs, self._logs = self._logs, []
+
+            # Every log with failed attempts so far is in this batch
+            attempts, self._attempts = self._attempts, {}
+            retry, dropped = [], 0
+            for log in await self._write(logs):
+                failed = attempts.get(log["id"], 0) + 1
+                if failed < self.max_attempts:
+                    self._attempts[log["id"]] = failed
+                    retry.append(log)
+                else:
+                    dropped += 1
+
+            if dropped:
+                logger.error(f"Dropped {dropped} execution logs after {self.max_attempts} failed flushes")
+            self._logs[:0] = retry
+
+    async def _write(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert `logs` and return the ones to retry"""
+        try:
+            async with write_transaction() as db:
+                await db.execute(insert(ExecutionLog), logs)
+            return []
+        except (IntegrityError, DataError) as e:
+            # Retrying cannot help: split the batch until the bad rows are alone
+            if len(logs) == 1:
+                logger.error(f"Dropping execution log the database rejects: {logs[0]} ({e})")
+                return []
+            middle = len(logs) // 2
+            return await self._write(logs[:middle]) + await self._write(logs[middle:])
+        except Exception as e:
+            logger.error(f"Execution log flush failed, will retry: {e}")
+            return logs
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Shielded so shutdown cannot cancel a flush halfway through
+            await asyncio.shield(self.flush())
+
+    async def start(self) -> None:
+        """Start the background flusher (called on startup)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the flusher and write what is left (called on shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Global write-behind instance
+execution_writer = ExecutionWriteBehind(
+    batch_size=settings.EXECUTION_LOG_BATCH_SIZE,
+    flush_interval=settings.EXECUTION_LOG_FLUSH_INTERVAL_SECONDS,
+    max_buffer=settings.EXECUTION_LOG_MAX_BUFFER,
+    max_attempts=settings.EXECUTION_LOG_MAX_ATTEMPTS,
+)
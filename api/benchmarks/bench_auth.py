@@ -0,0 +1,68 @@
+"""
+Per-request authentication overhead: uncached vs cached get_current_user.
+
+Usage (from the api/ directory):
+    python benchmarks/bench_auth.py [iterations]
+
+Uses a throwaway SQLite database. Redis is optional: without it the user
+cache logs a warning on the first miss and keeps working in-process.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_db_file = Path(tempfile.mkdtemp()) / "bench_auth.db"
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file}"
+
+from jose import jwt  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.database import AsyncSessionLocal, init_db  # noqa: E402
+from app.core.security import create_access_token, get_current_user  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+async def uncached_auth(token: str, db) -> User:
+    """The previous get_current_user: JWT decode plus a user query every time"""
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    result = await db.execute(select(User).where(User.id == payload["sub"]))
+    return result.scalar_one()
+
+
+async def measure(label: str, fn, iterations: int) -> float:
+    async with AsyncSessionLocal() as db:
+        await fn(db)  # warm up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await fn(db)
+        elapsed = time.perf_counter() - start
+
+    per_request = elapsed / iterations * 1e6
+    print(f"{label:<10} {per_request:10.1f} µs/request  ({iterations} requests)")
+    return per_request
+
+
+async def main(iterations: int) -> None:
+    await init_db()
+
+    async with AsyncSessionLocal() as db:
+        user = User(wallet_address="BenchWallet1111111111111111111111111111111", role="user")
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+
+    token = create_access_token({"sub": user_id})
+
+    before = await measure("uncached", lambda db: uncached_auth(token, db), iterations)
+    after = await measure("cached", lambda db: get_current_user(token=token, db=db), iterations)
+    print(f"speedup    {before / after:10.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
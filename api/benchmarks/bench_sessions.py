@@ -0,0 +1,115 @@
+"""
+Payment session storage: JSON string (previous format) vs Redis hash.
+
+Reports memory per session (MEMORY USAGE) and read latency for a full
+session read and a status-only read.
+
+Usage (from the api/ directory):
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/bench_sessions.py [sessions] [reads]
+
+Writes and then deletes keys under bench:session:* in the given database.
+If the server does not support MEMORY USAGE, the encoded payload size is
+reported instead.
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import redis.asyncio as redis  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.core.session import PaymentSession, decode_session, encode_session  # noqa: E402
+
+PREFIX = "bench:session:"
+
+
+def make_session() -> PaymentSession:
+    now = datetime.utcnow()
+    return PaymentSession(
+        id=str(uuid.uuid4()),
+        user_id=str(uuid.uuid4()),
+        robot_id=str(uuid.uuid4()),
+        amount=1.5,
+        recipient_address="9xQeWvG816bUx9EPjHmaT23yvVM2ZWbrrpZb9PusVFin",
+        service_payload={"service": "move", "parameters": {"direction": "forward"}, "rental_plan_index": 0},
+        created_at=now,
+        expires_at=now + timedelta(minutes=settings.SESSION_EXPIRE_MINUTES),
+    )
+
+
+async def memory_per_key(client, keys, fallback_sizes) -> float:
+    try:
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.memory_usage(key)
+        return sum(await pipe.execute()) / len(keys)
+    except redis.ResponseError:
+        return sum(fallback_sizes) / len(fallback_sizes)
+
+
+async def measure(label: str, fn, keys, reads: int) -> None:
+    await fn(keys[0])  # warm up
+    start = time.perf_counter()
+    for i in range(reads):
+        await fn(keys[i % len(keys)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<26} {elapsed / reads * 1e6:10.1f} µs/read  ({reads} reads)")
+
+
+async def main(count: int, reads: int) -> None:
+    client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    ttl = settings.SESSION_EXPIRE_MINUTES * 60
+    sessions = [make_session() for _ in range(count)]
+
+    json_keys = [f"{PREFIX}json:{s.id}" for s in sessions]
+    hash_keys = [f"{PREFIX}hash:{s.id}" for s in sessions]
+    pipe = client.pipeline(transaction=False)
+    for session, json_key, hash_key in zip(sessions, json_keys, hash_keys):
+        pipe.setex(json_key, ttl, session.model_dump_json())
+        pipe.hset(hash_key, mapping=encode_session(session))
+        pipe.expire(hash_key, ttl)
+    await pipe.execute()
+
+    try:
+        json_sizes = [len(s.model_dump_json()) for s in sessions]
+        hash_sizes = [sum(len(k) + len(v) for k, v in encode_session(s).items()) for s in sessions]
+        print(f"Memory per session ({count} sessions):")
+        print(f"  json string  {await memory_per_key(client, json_keys, json_sizes):8.0f} bytes")
+        print(f"  hash         {await memory_per_key(client, hash_keys, hash_sizes):8.0f} bytes")
+        try:
+            print(f"  hash encoding: {await client.object('encoding', hash_keys[0])}")
+        except redis.ResponseError:
+            pass
+        print()
+
+        async def json_full(key):
+            return PaymentSession.model_validate_json(await client.get(key))
+
+        async def hash_full(key):
+            return decode_session(key.rsplit(":", 1)[1], await client.hgetall(key))
+
+        async def json_status(key):
+            return PaymentSession.model_validate_json(await client.get(key)).status
+
+        async def hash_status(key):
+            return await client.hget(key, "status")
+
+        await measure("json full read", json_full, json_keys, reads)
+        await measure("hash full read", hash_full, hash_keys, reads)
+        await measure("json status read", json_status, json_keys, reads)
+        await measure("hash status read (HGET)", hash_status, hash_keys, reads)
+    finally:
+        await client.delete(*json_keys, *hash_keys)
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    reads = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    asyncio.run(main(count, reads))
@@ -0,0 +1,114 @@
+"""
+Concurrent SQLite writes: untuned engine vs the SQLite profile.
+
+Runs the same workload twice on a throwaway database file: concurrent
+writers, each committing short read-then-write transactions (the shape of
+a payment settlement: read a row, insert a record, update a counter),
+while readers keep querying. The "default" run uses a plain aiosqlite
+engine with a rollback journal and a new connection per session (the
+driver's default); the "profile" run uses app.database.build_engine (WAL plus
+pragmas) for the readers and the single writer connection for the writes.
+
+Reports write throughput, failed transactions ("database is locked") and
+read latency percentiles.
+
+Usage (from the api/ directory):
+    python benchmarks/bench_sqlite_writes.py [writers] [transactions per writer] [readers]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from app.database import build_engine, make_sessionmaker  # noqa: E402
+
+SCHEMA = [
+    "CREATE TABLE counters (id INTEGER PRIMARY KEY, total INTEGER NOT NULL)",
+    "CREATE TABLE records (id INTEGER PRIMARY KEY AUTOINCREMENT, counter_id INTEGER, payload TEXT)",
+    "INSERT INTO counters (id, total) VALUES (1, 0), (2, 0), (3, 0), (4, 0)",
+]
+
+
+async def write(sessionmaker, writer: int, transactions: int, stats: Dict[str, int]) -> None:
+    counter_id = writer % 4 + 1
+    for i in range(transactions):
+        try:
+            async with sessionmaker() as db:
+                await db.execute(text("SELECT total FROM counters WHERE id = :id"), {"id": counter_id})
+                await db.execute(
+                    text("INSERT INTO records (counter_id, payload) VALUES (:id, :payload)"),
+                    {"id": counter_id, "payload": f"writer {writer} transaction {i}" * 4},
+                )
+                await db.execute(text("UPDATE counters SET total = total + 1 WHERE id = :id"), {"id": counter_id})
+                await db.commit()
+            stats["committed"] += 1
+        except OperationalError:
+            stats["failed"] += 1
+
+
+async def read(sessionmaker, stop: asyncio.Event, latencies: List[float]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        async with sessionmaker() as db:
+            await db.execute(text("SELECT COUNT(*), MAX(id) FROM records"))
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0)
+
+
+async def run(label: str, read_engine, write_engine, writers: int, transactions: int, readers: int) -> None:
+    async with write_engine.begin() as conn:
+        for statement in SCHEMA:
+            await conn.execute(text(statement))
+
+    read_sessions, write_sessions = make_sessionmaker(read_engine), make_sessionmaker(write_engine)
+    stats = {"committed": 0, "failed": 0}
+    latencies: List[float] = []
+    stop = asyncio.Event()
+
+    reader_tasks = [asyncio.create_task(read(read_sessions, stop, latencies)) for _ in range(readers)]
+    start = time.perf_counter()
+    await asyncio.gather(*(write(write_sessions, w, transactions, stats) for w in range(writers)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*reader_tasks)
+
+    await read_engine.dispose()
+    if write_engine is not read_engine:
+        await write_engine.dispose()
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+    print(
+        f"{label:<8} {stats['committed'] / elapsed:8.0f} writes/s  "
+        f"{stats['failed']:5d} failed  "
+        f"reads p50 {p50:6.2f} ms  p99 {p99:7.2f} ms  ({len(latencies)} reads, {elapsed:.2f} s)"
+    )
+
+
+async def main(writers: int, transactions: int, readers: int) -> None:
+    print(f"{writers} writers x {transactions} transactions, {readers} readers\n")
+    directory = Path(tempfile.mkdtemp())
+
+    url = f"sqlite+aiosqlite:///{directory / 'default.db'}"
+    engine = create_async_engine(url, connect_args={"check_same_thread": False})
+    await run("default", engine, engine, writers, transactions, readers)
+
+    url = f"sqlite+aiosqlite:///{directory / 'profile.db'}"
+    await run("profile", build_engine(url), build_engine(url, writer=True), writers, transactions, readers)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    writers, transactions, readers = args + [32, 50, 8][len(args):]
+    asyncio.run(main(writers, transactions, readers))
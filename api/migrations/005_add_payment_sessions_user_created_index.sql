@@ -0,0 +1,5 @@
+-- Composite index for listing a user's payment sessions newest first
+-- Serves GET /payments/sessions/my and its keyset (cursor) pagination
+
+CREATE INDEX IF NOT EXISTS ix_payment_sessions_user_created
+    ON payment_sessions (user_id, created_at);
@@ -0,0 +1,29 @@
+-- Per-user payment aggregates maintained by /payments/verify
+-- Rows are backfilled lazily from payment_sessions the first time a user's
+-- stats are read or updated (which also resets users.total_spent to the
+-- backfilled total), so only users.total_spent is migrated here.
+
+CREATE TABLE IF NOT EXISTS user_payment_stats (
+    user_id VARCHAR(36) PRIMARY KEY REFERENCES users(id),
+    total_sessions INTEGER NOT NULL DEFAULT 0,
+    paid_sessions INTEGER NOT NULL DEFAULT 0,
+    total_spent NUMERIC(20, 6) NOT NULL DEFAULT 0,
+    last_payment_at DATETIME,
+    most_used_robot_id VARCHAR(36),
+    most_used_robot_count INTEGER NOT NULL DEFAULT 0,
+    updated_at DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS user_robot_usage (
+    user_id VARCHAR(36) NOT NULL REFERENCES users(id),
+    robot_id VARCHAR(36) NOT NULL REFERENCES robots(id),
+    session_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, robot_id)
+);
+
+-- users.total_spent used to be incremented without ever being reconciled
+UPDATE users SET total_spent = (
+    SELECT COALESCE(SUM(amount), 0)
+    FROM payment_sessions
+    WHERE payment_sessions.user_id = users.id AND payment_sessions.status = 'paid'
+);
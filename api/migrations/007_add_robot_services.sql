@@ -0,0 +1,19 @@
+-- Normalized robot services for indexed catalog filtering
+-- Mirrors the robots.services JSON array, one row per (robot, service)
+
+CREATE TABLE IF NOT EXISTS robot_services (
+    robot_id VARCHAR(36) NOT NULL REFERENCES robots(id) ON DELETE CASCADE,
+    service VARCHAR(100) NOT NULL,
+    PRIMARY KEY (robot_id, service)
+);
+
+CREATE INDEX IF NOT EXISTS ix_robot_services_service_robot
+    ON robot_services (service, robot_id);
+
+CREATE INDEX IF NOT EXISTS ix_robots_status_created
+    ON robots (status, created_at, id);
+
+-- Backfill from the existing JSON column
+INSERT OR IGNORE INTO robot_services (robot_id, service)
+SELECT robots.id, json_each.value
+FROM robots, json_each(robots.services);
@@ -0,0 +1,6 @@
+-- Index payment transaction signatures
+-- Lets /payments/verify reject a signature that already paid for another
+-- session with one indexed lookup when the Redis registry has no entry
+
+CREATE INDEX IF NOT EXISTS ix_payment_sessions_tx_signature
+    ON payment_sessions (tx_signature);
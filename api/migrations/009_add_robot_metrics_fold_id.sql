@@ -0,0 +1,5 @@
+-- Last metrics fold applied to each robot's counters
+-- The fold records its id in the same UPDATE that adds its counters, so a
+-- fold retried after its Redis cleanup failed is not counted twice
+
+ALTER TABLE robots ADD COLUMN metrics_fold_id VARCHAR(36);
@@ -0,0 +1,48 @@
+"""
+Shared test setup: a throwaway SQLite database and an in-memory Redis
+(fakeredis with Lua support) stand in for the real services.
+
+Usage (from the api/ directory):
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+os.environ.update(
+    SECRET_KEY="test-secret",
+    DATABASE_URL=f"sqlite+aiosqlite:///{Path(tempfile.mkdtemp()) / 'test.db'}",
+    PAYMENT_INDEXER_ENABLED="false",
+    SOLANA_STATUS_POLL_INTERVAL_SECONDS="0.05",
+)
+
+import fakeredis  # noqa: E402
+import pytest  # noqa: E402
+import app.core.cache as cache  # noqa: E402
+import app.main  # noqa: E402,F401  (registers every model)
+from app.core.session import get_session_manager  # noqa: E402
+from app.database import init_db  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    # One event loop for the whole run: the engines and clients are global
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def database(anyio_backend):
+    await init_db()
+
+
+@pytest.fixture
+async def redis_client(anyio_backend):
+    if cache._redis_client is None:
+        cache._redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        get_session_manager().redis_client = cache._redis_client
+    await cache._redis_client.flushall()
+    return cache._redis_client
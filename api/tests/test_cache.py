@@ -0,0 +1,35 @@
+"""Record caches (app/core/cache.py)"""
+import asyncio
+import pytest
+from app.api.routes import robots
+from app.core.cache import ModelCache, get_robot_cache
+from app.models.robot import Robot
+
+pytestmark = pytest.mark.anyio
+
+
+async def eventually(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+async def test_catalog_counts_are_dropped_when_another_worker_changes_a_robot(redis_client):
+    # This worker's robot cache listens; the other worker only publishes
+    here = get_robot_cache()
+    other = ModelCache(Robot, namespace="robot", local_ttl=30, redis_ttl=300, maxsize=10)
+    seen = []
+    here.on_invalidate(seen.append)
+    await here.start()
+    try:
+        await eventually(lambda: None in seen)  # subscribed
+        robots._catalog_counts.set(("active", None), 7)
+
+        await other.invalidate("robot-1")
+
+        await eventually(lambda: "robot-1" in seen)
+        assert robots._catalog_counts.get(("active", None)) is None
+    finally:
+        await here.close()
+        here._callbacks.remove(seen.append)
@@ -0,0 +1,51 @@
+"""Request sessions (app/database.py)"""
+from contextlib import asynccontextmanager
+import pytest
+from solders.keypair import Keypair
+from sqlalchemy import select, update
+from app.database import AsyncSessionLocal, ReadOnlySessionError, get_db, get_read_db, get_write_db
+from app.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+
+@asynccontextmanager
+async def dependency(factory):
+    """Drive a FastAPI yield dependency the way a request would"""
+    gen = factory()
+    session = await gen.__anext__()
+    try:
+        yield session
+    except BaseException as e:
+        with pytest.raises(type(e)):
+            await gen.athrow(e)
+        raise
+    else:
+        with pytest.raises(StopAsyncIteration):
+            await gen.__anext__()
+
+
+async def test_get_db_rejects_flushed_writes(database):
+    wallet = str(Keypair().pubkey())
+    with pytest.raises(ReadOnlySessionError):
+        async with dependency(get_db) as db:
+            db.add(User(wallet_address=wallet, role="user"))
+
+    async with AsyncSessionLocal() as db:
+        assert (await db.execute(select(User).where(User.wallet_address == wallet))).scalar_one_or_none() is None
+
+
+@pytest.mark.parametrize("factory", [get_db, get_read_db])
+async def test_request_read_sessions_reject_write_statements(database, factory):
+    with pytest.raises(ReadOnlySessionError):
+        async with dependency(factory) as db:
+            await db.execute(update(User).values(role="admin"))
+
+
+async def test_write_db_commits_through_the_writer(database):
+    wallet = str(Keypair().pubkey())
+    async with dependency(get_write_db) as db:
+        db.add(User(wallet_address=wallet, role="user"))
+
+    async with AsyncSessionLocal() as db:
+        assert (await db.execute(select(User).where(User.wallet_address == wallet))).scalar_one() is not None
@@ -0,0 +1,49 @@
+"""Robot image storage (app/services/image_store.py, app/core/images.py)"""
+import asyncio
+import io
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+from starlette.datastructures import Headers
+from app.core import images
+from app.core.images import VariantIndex, variant_index
+from app.services.image_store import ImageStore
+
+pytestmark = pytest.mark.anyio
+
+DIGEST = "ab" * 32
+
+
+async def test_variants_made_by_another_worker_are_picked_up(tmp_path, monkeypatch, redis_client):
+    monkeypatch.setattr(images, "UPLOAD_DIR", tmp_path)
+    index = VariantIndex(recheck_seconds=0)
+    url = f"/uploads/robots/{DIGEST}.png"
+
+    # Unknown: the original is served while the disk is checked off the loop
+    assert index.variant_url(url, "thumb") == url
+    await asyncio.gather(*index._checking.values())
+    assert index.variant_url(url, "thumb") == url
+    await asyncio.gather(*index._checking.values())
+
+    images.last_variant_path(DIGEST).touch()
+    assert index.variant_url(url, "thumb") == url
+    await asyncio.gather(*index._checking.values())
+    assert index.variant_url(url, "thumb") == f"/uploads/robots/{DIGEST}_thumb.webp"
+
+
+async def test_upload_is_resized_in_a_spawned_pool(tmp_path, monkeypatch, redis_client):
+    monkeypatch.chdir(tmp_path)  # the spawned workers start in the same directory
+    png = io.BytesIO()
+    Image.new("RGB", (2000, 1000), "red").save(png, "PNG")
+    png.seek(0)
+    upload = UploadFile(png, filename="robot.png", headers=Headers({"content-type": "image/png"}))
+
+    store = ImageStore(max_bytes=10 * 1024 * 1024, workers=1)
+    url = await store.save_upload(upload)
+    await store.close()
+
+    assert store._pool is None
+    digest = url.rsplit("/", 1)[-1].split(".")[0]
+    assert variant_index.variant_url(url, "card") == f"/uploads/robots/{digest}_card.webp"
+    with Image.open(tmp_path / images.variant_path(digest, "card")) as card:
+        assert card.size == (480, 240)
@@ -0,0 +1,93 @@
+"""Robot metrics folding (app/services/metrics_engine.py)"""
+import pytest
+import redis.asyncio as redis
+from solders.keypair import Keypair
+from app.core.http_cache import get_robot_versions
+from app.database import AsyncSessionLocal
+from app.models.robot import Robot
+from app.models.user import User
+from app.services.metrics_engine import FOLD_ID_KEY, VERSION_DUE_KEY, RobotMetricsEngine, merge_metrics
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_robot() -> Robot:
+    async with AsyncSessionLocal() as db:
+        owner = User(wallet_address=str(Keypair().pubkey()), role="robot_owner")
+        db.add(owner)
+        await db.flush()
+        robot = Robot(
+            owner_id=owner.id,
+            name="Arm",
+            price=0.5,
+            wallet_address=str(Keypair().pubkey()),
+            services=["move"],
+            endpoint="http://robot.local/move",
+        )
+        db.add(robot)
+        await db.commit()
+        return robot
+
+
+async def stored(robot_id: str) -> Robot:
+    async with AsyncSessionLocal() as db:
+        return await db.get(Robot, robot_id)
+
+
+async def test_fold_retried_after_failed_cleanup_is_not_counted_twice(database, redis_client):
+    engine = RobotMetricsEngine(fold_interval=10, fold_batch=100, version_interval=60)
+    robot = await create_robot()
+    await engine.record(robot.id, True, 0.2)
+    await engine.record(robot.id, False, 0.4)
+
+    apply = engine._apply
+
+    async def apply_then_lose_redis(deltas, fold_id):
+        await apply(deltas, fold_id)
+        raise redis.ConnectionError("connection lost")
+
+    engine._apply = apply_then_lose_redis
+    await engine.fold()
+    assert await redis_client.get(FOLD_ID_KEY) is not None  # the fold was not cleared
+
+    # Committed but not cleared: the folding counters are already in the row
+    row = await stored(robot.id)
+    assert row.execution_count == 2
+    pending = await engine.get_pending(robot.id, row.metrics_fold_id)
+    assert pending.executions == 0
+
+    engine._apply = apply
+    await engine.record(robot.id, True, 0.3)
+    await engine.fold()  # retries the leftover fold, then takes the new counter
+    await engine.fold()
+
+    row = await stored(robot.id)
+    assert row.execution_count == 3
+    assert row.success_rate == pytest.approx(2 / 3)
+    assert await redis_client.get(FOLD_ID_KEY) is None
+    metrics = merge_metrics(
+        row.execution_count, row.avg_response_time, row.success_rate, row.total_revenue,
+        await engine.get_pending(robot.id, row.metrics_fold_id)
+    )
+    assert metrics["total_executions"] == 3
+
+
+async def test_folds_bump_versions_at_most_once_per_interval(database, redis_client):
+    engine = RobotMetricsEngine(fold_interval=10, fold_batch=100, version_interval=60)
+    robot = await create_robot()
+    versions = get_robot_versions()
+    initial = (await versions.validators(robot.id)).etag
+
+    await engine.record(robot.id, True, 0.2)
+    await engine.fold()
+    first = (await versions.validators(robot.id)).etag
+    assert first != initial
+
+    await engine.record(robot.id, True, 0.2)
+    await engine.fold()
+    assert (await versions.validators(robot.id)).etag == first
+    assert (await stored(robot.id)).execution_count == 2
+
+    await redis_client.delete(VERSION_DUE_KEY)  # the interval has passed
+    await engine.fold()
+    assert (await versions.validators(robot.id)).etag != first
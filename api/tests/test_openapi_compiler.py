@@ -0,0 +1,63 @@
+"""OpenAPI to interface_config compiler (app/services/openapi_compiler.py)"""
+import importlib.util
+from pathlib import Path
+from app.services.openapi_compiler import compile_interface, extract_spec
+
+SIMULATOR = Path(__file__).resolve().parents[2] / "hardware" / "test_robot_api.py"
+
+
+def simulator_spec():
+    """OpenAPI spec of the hardware robot simulator, as it ships"""
+    spec = importlib.util.spec_from_file_location("robot_simulator", SIMULATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return extract_spec(module.app.openapi())
+
+
+def test_simulator_spec_compiles_to_a_control_per_operation():
+    spec = simulator_spec()
+    config = compile_interface(spec, has_video=True, has_gps=False)
+    controls = {control["id"]: control for control in config["controls"]}
+
+    posts = [path for path, item in spec["paths"].items() if "post" in item]
+    assert sorted(control["endpoint"] for control in controls.values()) == sorted(posts)
+
+    # Plain str and unbounded int fields become a form, defaults prefilled
+    move = controls["move"]
+    assert move["type"] == "input"
+    assert move["fields"] == [
+        {"name": "direction", "label": "Direction", "input": "text", "required": True},
+        {"name": "speed", "label": "Speed", "input": "number", "required": False, "step": 1, "default": 50},
+    ]
+    assert [field["input"] for field in controls["rotate"]["fields"]] == ["text", "number"]
+    assert [field["name"] for field in controls["camera_move"]["fields"]] == ["pan", "tilt"]
+
+    assert controls["lights"]["type"] == "toggle"
+    assert controls["arm_gripper"] == {
+        "endpoint": "/arm/gripper", "method": "POST", "id": "arm_gripper",
+        "type": "toggle", "label": "Set Gripper", "param_name": "open",
+    }
+    assert controls["stop"]["type"] == "button"
+    assert controls["stop"]["icon"] == "AlertOctagon"
+
+
+def test_enum_buttons_fall_back_to_a_form_when_a_field_has_no_value():
+    spec = {
+        "openapi": "3.1.0",
+        "paths": {"/rotate": {"post": {"requestBody": {"content": {"application/json": {"schema": {
+            "type": "object",
+            "properties": {
+                "direction": {"enum": ["left", "right"]},
+                "degrees": {"type": "integer"},
+            },
+            "required": ["direction", "degrees"],
+        }}}}}}},
+    }
+    [control] = compile_interface(spec, has_video=False, has_gps=False)["controls"]
+
+    assert control["type"] == "input"
+    assert control["fields"] == [
+        {"name": "direction", "label": "Direction", "input": "select", "required": True,
+         "options": ["left", "right"], "default": "left"},
+        {"name": "degrees", "label": "Degrees", "input": "number", "required": True, "step": 1},
+    ]
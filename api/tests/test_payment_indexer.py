@@ -0,0 +1,224 @@
+"""Payment indexer against the fake Solana RPC (tools/fake_solana_rpc.py)"""
+import asyncio
+import httpx
+import pytest
+from solders.keypair import Keypair
+from app.core.blockchain import get_payment_verifier
+from app.core.session import PaymentSession, get_session_manager
+from app.database import AsyncSessionLocal
+from app.models.robot import Robot
+from app.models.user import User
+from app.services.payment_indexer import CURSOR_PREFIX, POLL_LOCK_KEY, PaymentIndexer
+from app.services.payment_settlement import SettlementInProgress
+from tools import fake_solana_rpc
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def rpc(database, redis_client):
+    """The payment verifier's RPC client, answered by the fake RPC"""
+    fake_solana_rpc._transactions.clear()
+    fake_solana_rpc._by_address.clear()
+    get_payment_verifier().client._provider.session = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_solana_rpc.app)
+    )
+
+
+def new_wallet() -> str:
+    return str(Keypair().pubkey())
+
+
+async def create_user() -> User:
+    async with AsyncSessionLocal() as db:
+        user = User(wallet_address=new_wallet(), role="user")
+        db.add(user)
+        await db.commit()
+        return user
+
+
+async def create_robot() -> Robot:
+    owner = await create_user()
+    async with AsyncSessionLocal() as db:
+        robot = Robot(
+            owner_id=owner.id,
+            name="Arm",
+            price=0.5,
+            wallet_address=new_wallet(),
+            services=["move"],
+            endpoint="http://robot.local/move",
+        )
+        db.add(robot)
+        await db.commit()
+        return robot
+
+
+async def open_session(user: User, robot: Robot, amount: float, rental_plan_index: int = None) -> PaymentSession:
+    payload = {"command": "move"}
+    if rental_plan_index is not None:
+        payload["rental_plan_index"] = rental_plan_index
+    admission = await get_session_manager().admit_execution(
+        None, user.id, robot.id, amount, robot.wallet_address, payload
+    )
+    assert admission.outcome == "created"
+    return admission.session
+
+
+async def transfer(robot: Robot, amount: float, payer: str = None, memo: str = None) -> str:
+    result = await fake_solana_rpc.inject_transfer(fake_solana_rpc.TransferRequest(
+        recipient=robot.wallet_address, amount=amount, payer=payer, memo=memo
+    ))
+    return result["signature"]
+
+
+async def status(session: PaymentSession) -> str:
+    return await get_session_manager().get_session_status(session.id)
+
+
+async def test_memo_names_the_session(rpc):
+    robot = await create_robot()
+    first = await open_session(await create_user(), robot, 0.5)
+    second = await open_session(await create_user(), robot, 0.5)
+
+    # Sent from a wallet that is not the user's: the memo is enough
+    await transfer(robot, 0.5, memo=second.id)
+    await PaymentIndexer(poll_interval=1, signature_limit=100).poll()
+
+    assert await status(second) == "paid"
+    assert await status(first) == "pending"
+
+
+async def test_unique_amount_from_the_users_wallet(rpc):
+    robot = await create_robot()
+    user = await create_user()
+    other = await open_session(await create_user(), robot, 0.5)
+    session = await open_session(user, robot, 0.7)
+
+    await transfer(robot, 0.7, payer=user.wallet_address)
+    await PaymentIndexer(poll_interval=1, signature_limit=100).poll()
+
+    assert await status(session) == "paid"
+    assert await status(other) == "pending"
+
+
+async def test_ambiguous_amount_is_left_for_verify(rpc, redis_client):
+    robot = await create_robot()
+    user = await create_user()
+    first = await open_session(user, robot, 0.5)
+    second = await open_session(user, robot, 0.5, rental_plan_index=0)
+
+    signature = await transfer(robot, 0.5, payer=user.wallet_address)
+    await PaymentIndexer(poll_interval=1, signature_limit=100).poll()
+
+    assert await status(first) == "pending"
+    assert await status(second) == "pending"
+    assert await redis_client.get(f"tx:consumed:{signature}") is None
+
+
+async def test_transfer_from_a_foreign_payer_is_not_matched(rpc, redis_client):
+    robot = await create_robot()
+    session = await open_session(await create_user(), robot, 0.5)
+
+    signature = await transfer(robot, 0.5, payer=new_wallet())
+    await PaymentIndexer(poll_interval=1, signature_limit=100).poll()
+
+    assert await status(session) == "pending"
+    # The signature stays free for the real payer's explicit verify
+    assert await redis_client.get(f"tx:consumed:{signature}") is None
+
+
+async def test_lost_claim_releases_a_signature_the_session_did_not_use(rpc, redis_client):
+    robot = await create_robot()
+    session = await open_session(await create_user(), robot, 0.5)
+    signature = await transfer(robot, 0.5, memo=session.id)
+    other = await transfer(robot, 0.5, memo=session.id)
+    indexer = PaymentIndexer(poll_interval=1, signature_limit=100)
+    token_account = indexer.token_account(robot.wallet_address)
+
+    # The verify endpoint holds the claim and has not finished: keep the signature
+    manager = get_session_manager()
+    assert await manager.claim_settlement(session.id)
+    with pytest.raises(SettlementInProgress):
+        await indexer._process(signature, token_account, None, [session], {})
+    assert await redis_client.get(f"tx:consumed:{signature}") == session.id
+
+    # It settled the session with the other transfer: this one is free again
+    await manager.mark_paid(session.id, other)
+    await indexer._process(signature, token_account, None, [session], {})
+    assert await redis_client.get(f"tx:consumed:{signature}") is None
+
+
+async def test_cursor_advances_past_processed_signatures(rpc, redis_client):
+    robot = await create_robot()
+    user = await create_user()
+    indexer = PaymentIndexer(poll_interval=1, signature_limit=100)
+    cursor_key = CURSOR_PREFIX + indexer.token_account(robot.wallet_address)
+    session = await open_session(user, robot, 0.5)
+
+    unrelated = await transfer(robot, 0.3, payer=new_wallet())
+    await indexer.poll()
+    assert await redis_client.get(cursor_key) == unrelated
+    assert await status(session) == "pending"
+
+    payment = await transfer(robot, 0.5, payer=user.wallet_address)
+    await indexer.poll()
+    assert await redis_client.get(cursor_key) == payment
+    assert await status(session) == "paid"
+
+
+class SlowIndexer(PaymentIndexer):
+    """Takes `delay` per signature, with a one-second poll lock"""
+
+    lock_ttl = 1
+
+    def __init__(self, delay: float, on_process=None):
+        super().__init__(poll_interval=1, signature_limit=100)
+        self.delay = delay
+        self.on_process = on_process
+        self.processed = 0
+
+    async def _process(self, *args):
+        self.processed += 1
+        if self.on_process is not None:
+            await self.on_process(self.processed)
+        await asyncio.sleep(self.delay)
+        return None
+
+
+async def test_poll_lock_is_renewed_while_scanning(rpc, redis_client):
+    robot = await create_robot()
+    await open_session(await create_user(), robot, 0.5)
+    for _ in range(4):
+        await transfer(robot, 0.3, payer=new_wallet())
+
+    ttls = []
+
+    async def record_ttl(_):
+        ttls.append(await redis_client.pttl(POLL_LOCK_KEY))
+
+    indexer = SlowIndexer(delay=0.5, on_process=record_ttl)
+    await indexer.poll()  # two seconds, twice the lock's TTL
+
+    assert indexer.processed == 4
+    assert all(ttl > 0 for ttl in ttls)
+    assert await redis_client.get(POLL_LOCK_KEY) is None  # released afterwards
+
+
+async def test_scan_stops_when_the_lock_is_taken_over(rpc, redis_client):
+    robot = await create_robot()
+    await open_session(await create_user(), robot, 0.5)
+    for _ in range(4):
+        await transfer(robot, 0.3, payer=new_wallet())
+    indexer = SlowIndexer(delay=0.5)
+    cursor_key = CURSOR_PREFIX + indexer.token_account(robot.wallet_address)
+
+    async def take_lock(processed):
+        if processed == 1:
+            await redis_client.set(POLL_LOCK_KEY, "other-worker")
+
+    indexer.on_process = take_lock
+    await indexer.poll()
+
+    assert indexer.processed < 4
+    assert await redis_client.get(cursor_key) is None  # the next owner rescans
+    assert await redis_client.get(POLL_LOCK_KEY) == "other-worker"
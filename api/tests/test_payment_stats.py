@@ -0,0 +1,109 @@
+"""Per-user payment aggregates (app/services/payment_stats.py)"""
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from solders.keypair import Keypair
+from app.database import AsyncSessionLocal, write_transaction
+from app.models.payment import PaymentSessionDB, UserPaymentStats, UserRobotUsage
+from app.models.robot import Robot
+from app.models.user import User
+from app.services import payment_stats
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_user_and_robot(total_spent: float = 0):
+    async with AsyncSessionLocal() as db:
+        user = User(wallet_address=str(Keypair().pubkey()), role="user", total_spent=total_spent)
+        db.add(user)
+        await db.flush()
+        robot = Robot(
+            owner_id=user.id,
+            name="Arm",
+            price=0.5,
+            wallet_address=str(Keypair().pubkey()),
+            services=["move"],
+            endpoint="http://robot.local/move",
+        )
+        db.add(robot)
+        await db.commit()
+        return user, robot
+
+
+async def add_paid_session(user: User, robot: Robot, amount: float) -> None:
+    async with write_transaction() as db:
+        db.add(PaymentSessionDB(
+            user_id=user.id,
+            robot_id=robot.id,
+            amount=amount,
+            recipient_address=robot.wallet_address,
+            status="paid",
+            service_payload={},
+            expires_at=datetime.utcnow(),
+            paid_at=datetime.utcnow(),
+        ))
+
+
+def created_concurrently(monkeypatch, model):
+    """Make the first lookup of `model` miss, as if another transaction inserted it right after"""
+    get = payment_stats.AsyncSession.get
+    missed = []
+
+    async def racing_get(self, entity, *args, **kwargs):
+        if entity is model and not missed:
+            missed.append(entity)
+            return None
+        return await get(self, entity, *args, **kwargs)
+
+    monkeypatch.setattr(payment_stats.AsyncSession, "get", racing_get)
+
+
+async def test_backfill_reconciles_the_users_total_spent(database):
+    user, robot = await create_user_and_robot(total_spent=99)
+    await add_paid_session(user, robot, 0.5)
+    await add_paid_session(user, robot, 0.25)
+
+    async with AsyncSessionLocal() as db:
+        stats = await payment_stats.get_user_stats(db, user.id)
+        assert stats.total_spent == Decimal("0.75")
+        assert (await db.get(User, user.id, populate_existing=True)).total_spent == Decimal("0.75")
+
+
+async def test_stats_row_created_by_a_concurrent_transaction(database, monkeypatch):
+    user, robot = await create_user_and_robot()
+    async with write_transaction() as db:
+        await payment_stats._ensure_user_stats(db, user.id)
+
+    created_concurrently(monkeypatch, UserPaymentStats)
+    async with write_transaction() as db:
+        await payment_stats.record_paid_session(db, user.id, robot.id, 0.5, None)
+
+    async with AsyncSessionLocal() as db:
+        stats = await db.get(UserPaymentStats, user.id)
+        assert stats.paid_sessions == 1
+        assert stats.total_spent == Decimal("0.5")
+
+
+async def test_usage_row_created_by_a_concurrent_transaction(database, monkeypatch):
+    user, robot = await create_user_and_robot()
+    async with write_transaction() as db:
+        await payment_stats._ensure_user_stats(db, user.id)
+        db.add(UserRobotUsage(user_id=user.id, robot_id=robot.id, session_count=1))
+
+    # The usage UPDATE misses, then the INSERT conflicts with the existing row
+    increment = payment_stats._increment_robot_usage
+    calls = []
+
+    async def racing_increment(db, user_id, robot_id):
+        calls.append(robot_id)
+        return None if len(calls) == 1 else await increment(db, user_id, robot_id)
+
+    monkeypatch.setattr(payment_stats, "_increment_robot_usage", racing_increment)
+    async with write_transaction() as db:
+        await payment_stats.record_paid_session(db, user.id, robot.id, 0.5, None)
+
+    async with AsyncSessionLocal() as db:
+        usage = await db.get(UserRobotUsage, (user.id, robot.id))
+        stats = await db.get(UserPaymentStats, user.id)
+        assert usage.session_count == 2
+        assert stats.most_used_robot_count == 2
@@ -0,0 +1,14 @@
+"""Startup imports (see tools/profile_startup.py)"""
+import os
+import subprocess
+import sys
+from tools.profile_startup import API_DIR, DEFERRED
+
+
+def test_heavy_modules_load_on_first_use():
+    # A fresh interpreter: this one has imported everything the tests use
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, app.main; print(*[m for m in {DEFERRED!r} if m in sys.modules])"],
+        cwd=API_DIR, env=dict(os.environ), capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.split() == []
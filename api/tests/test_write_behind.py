@@ -0,0 +1,54 @@
+"""Execution log write-behind (app/services/write_behind.py)"""
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from app.database import AsyncSessionLocal
+from app.models.payment import ExecutionLog
+from app.services import write_behind
+from app.services.write_behind import ExecutionWriteBehind
+
+pytestmark = pytest.mark.anyio
+
+
+async def count_logs(robot_id: str) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).where(ExecutionLog.robot_id == robot_id))
+
+
+async def test_rejected_log_is_dropped_without_blocking_the_batch(database):
+    writer = ExecutionWriteBehind(batch_size=100, flush_interval=60, max_buffer=1000, max_attempts=3)
+    for i in range(7):
+        writer.record("robot-bisect", "user-1", None, "success", 0.1)
+    writer.record(None, "user-1", None, "success", 0.1)  # robot_id is NOT NULL
+    for i in range(4):
+        writer.record("robot-bisect", "user-1", None, "error")
+
+    await writer.flush()
+
+    assert await count_logs("robot-bisect") == 11
+    assert writer._logs == []
+
+
+async def test_failing_logs_are_retried_then_dropped(database, monkeypatch):
+    writer = ExecutionWriteBehind(batch_size=100, flush_interval=60, max_buffer=1000, max_attempts=3)
+    writer.record("robot-retry", "user-1", None, "success", 0.1)
+
+    class Unavailable:
+        async def __aenter__(self):
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(write_behind, "write_transaction", Unavailable)
+    await writer.flush()
+    await writer.flush()
+    assert len(writer._logs) == 1  # kept for another attempt
+
+    writer.record("robot-retry", "user-1", None, "error")
+    await writer.flush()
+    assert len(writer._logs) == 1  # the first log used its three attempts
+
+    monkeypatch.undo()
+    await writer.flush()
+    assert await count_logs("robot-retry") == 1
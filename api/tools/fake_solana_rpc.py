@@ -0,0 +1,239 @@
+"""
+Local fake Solana JSON-RPC for exercising payment verification and the
+payment indexer without a cluster.
+
+Implements just the methods the API uses (getSignaturesForAddress,
+getSignatureStatuses, getTransaction with jsonParsed encoding) over an
+in-memory ledger of SPL token transfers. Every injected transfer is
+immediately finalized.
+
+Usage:
+    python tools/fake_solana_rpc.py --port 8899
+    SOLANA_RPC_URL=http://localhost:8899 uvicorn app.main:app
+
+    # Pay a session: transfer 0.5 rUSD to a robot wallet with the session id as memo
+    curl -X POST localhost:8899/fake/transfer -H 'Content-Type: application/json' \\
+        -d '{"recipient": "<robot wallet>", "amount": 0.5, "memo": "<session id>"}'
+
+    # Without a memo the indexer only matches a transfer from the user's own wallet
+    curl -X POST localhost:8899/fake/transfer -H 'Content-Type: application/json' \\
+        -d '{"recipient": "<robot wallet>", "amount": 0.5, "payer": "<user wallet>"}'
+"""
+import argparse
+import itertools
+import time
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, Request
+from pydantic import BaseModel
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from spl.token.instructions import get_associated_token_address
+
+DEFAULT_MINT = "8r2xLuDRsf6sVrdgTKoBM2gmWoixfXb5fzLyDqdEHtMX"
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+MEMO_PROGRAM_ID = "MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcHr"
+DECIMALS = 6
+
+app = FastAPI(title="Fake Solana RPC")
+
+_slots = itertools.count(1000)
+# signature -> transaction record
+_transactions: Dict[str, Dict[str, Any]] = {}
+# account address -> signatures touching it, oldest first
+_by_address: Dict[str, List[str]] = {}
+
+
+class TransferRequest(BaseModel):
+    recipient: str  # wallet address; the transfer goes to its associated token account
+    amount: float  # in rUSD
+    memo: Optional[str] = None
+    payer: Optional[str] = None  # sending wallet (a new one if not given)
+    mint: str = DEFAULT_MINT
+    failed: bool = False
+
+
+def token_account(wallet: str, mint: str) -> str:
+    return str(get_associated_token_address(Pubkey.from_string(wallet), Pubkey.from_string(mint)))
+
+
+@app.post("/fake/transfer")
+async def inject_transfer(transfer: TransferRequest):
+    """Record a finalized rUSD transfer and return its signature"""
+    payer = transfer.payer or str(Keypair().pubkey())
+    signature = str(Signature.new_unique())
+    source = token_account(payer, transfer.mint)
+    destination = token_account(transfer.recipient, transfer.mint)
+
+    _transactions[signature] = {
+        "slot": next(_slots),
+        "block_time": int(time.time()),
+        "payer": payer,
+        "source": source,
+        "destination": destination,
+        "mint": transfer.mint,
+        "amount": int(round(transfer.amount * 10 ** DECIMALS)),
+        "memo": transfer.memo,
+        "err": {"InstructionError": [0, "Custom"]} if transfer.failed else None,
+    }
+    for address in (source, destination, payer):
+        _by_address.setdefault(address, []).append(signature)
+
+    return {"signature": signature, "destination": destination}
+
+
+@app.post("/fake/reset")
+async def reset():
+    _transactions.clear()
+    _by_address.clear()
+    return {"ok": True}
+
+
+def _status(tx: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "slot": tx["slot"],
+        "confirmations": None,
+        "err": tx["err"],
+        "status": {"Err": tx["err"]} if tx["err"] else {"Ok": None},
+        "confirmationStatus": "finalized",
+    }
+
+
+def get_signatures_for_address(address: str, options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    options = options or {}
+    newest_first = list(reversed(_by_address.get(address, [])))
+
+    before = options.get("before")
+    if before in newest_first:
+        newest_first = newest_first[newest_first.index(before) + 1:]
+    until = options.get("until")
+    if until in newest_first:
+        newest_first = newest_first[:newest_first.index(until)]
+    newest_first = newest_first[:options.get("limit") or 1000]
+
+    return [
+        {
+            "signature": signature,
+            "slot": _transactions[signature]["slot"],
+            "err": _transactions[signature]["err"],
+            "memo": f"[{len(_transactions[signature]['memo'])}] {_transactions[signature]['memo']}"
+            if _transactions[signature]["memo"] else None,
+            "blockTime": _transactions[signature]["block_time"],
+            "confirmationStatus": "finalized",
+        }
+        for signature in newest_first
+    ]
+
+
+def get_signature_statuses(signatures: List[str], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {
+        "context": {"slot": max([tx["slot"] for tx in _transactions.values()], default=0)},
+        "value": [_status(_transactions[s]) if s in _transactions else None for s in signatures],
+    }
+
+
+def get_transaction(signature: str, options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    tx = _transactions.get(signature)
+    if tx is None:
+        return None
+
+    instructions = [{
+        "program": "spl-token",
+        "programId": TOKEN_PROGRAM_ID,
+        "parsed": {
+            "type": "transferChecked",
+            "info": {
+                "source": tx["source"],
+                "destination": tx["destination"],
+                "authority": tx["payer"],
+                "mint": tx["mint"],
+                "tokenAmount": {
+                    "amount": str(tx["amount"]),
+                    "decimals": DECIMALS,
+                    "uiAmount": tx["amount"] / 10 ** DECIMALS,
+                    "uiAmountString": str(tx["amount"] / 10 ** DECIMALS),
+                },
+            },
+        },
+        "stackHeight": None,
+    }]
+    if tx["memo"]:
+        instructions.append({
+            "program": "spl-memo",
+            "programId": MEMO_PROGRAM_ID,
+            "parsed": tx["memo"],
+            "stackHeight": None,
+        })
+
+    return {
+        "slot": tx["slot"],
+        "blockTime": tx["block_time"],
+        "version": 0,
+        "transaction": {
+            "signatures": [signature],
+            "message": {
+                "accountKeys": [
+                    {"pubkey": tx["payer"], "signer": True, "writable": True, "source": "transaction"},
+                    {"pubkey": tx["source"], "signer": False, "writable": True, "source": "transaction"},
+                    {"pubkey": tx["destination"], "signer": False, "writable": True, "source": "transaction"},
+                    {"pubkey": tx["mint"], "signer": False, "writable": False, "source": "transaction"},
+                    {"pubkey": TOKEN_PROGRAM_ID, "signer": False, "writable": False, "source": "transaction"},
+                ],
+                "recentBlockhash": str(Hash.default()),
+                "instructions": instructions,
+                "addressTableLookups": [],
+            },
+        },
+        "meta": {
+            "err": tx["err"],
+            "status": {"Err": tx["err"]} if tx["err"] else {"Ok": None},
+            "fee": 5000,
+            "preBalances": [0, 0, 0, 0, 0],
+            "postBalances": [0, 0, 0, 0, 0],
+            "innerInstructions": [],
+            "logMessages": [],
+            "preTokenBalances": [],
+            "postTokenBalances": [],
+            "rewards": [],
+            "loadedAddresses": {"writable": [], "readonly": []},
+            "computeUnitsConsumed": 6000,
+        },
+    }
+
+
+METHODS = {
+    "getSignaturesForAddress": get_signatures_for_address,
+    "getSignatureStatuses": get_signature_statuses,
+    "getTransaction": get_transaction,
+}
+
+
+def _handle(call: Dict[str, Any]) -> Dict[str, Any]:
+    method = METHODS.get(call.get("method"))
+    if method is None:
+        return {
+            "jsonrpc": "2.0",
+            "id": call.get("id"),
+            "error": {"code": -32601, "message": f"Method not found: {call.get('method')}"},
+        }
+    return {"jsonrpc": "2.0", "id": call.get("id"), "result": method(*call.get("params", []))}
+
+
+@app.post("/")
+async def rpc(request: Request):
+    """JSON-RPC endpoint (single calls and batches)"""
+    body = await request.json()
+    if isinstance(body, list):
+        return [_handle(call) for call in body]
+    return _handle(body)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
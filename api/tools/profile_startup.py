@@ -0,0 +1,116 @@
+"""
+Startup profile of the platform API.
+
+Imports app.main in a fresh interpreter with -X importtime and reports the
+total, the heaviest top-level packages (by self time), the slowest app
+modules (cumulative) and whether the modules meant to load on first use
+(DEFERRED) stayed out of startup. Then starts uvicorn and measures the time from
+process launch to the first successful GET /health, which includes
+interpreter start, imports and the lifespan startup.
+
+Usage (from the api/ directory):
+    python tools/profile_startup.py [--top 15] [--port 8765] [--skip-server]
+
+Uses the same environment (.env, DATABASE_URL, REDIS_URL) as the API.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+# Loaded on first use, never by `import app.main`: the AI interface SDK,
+# the Solana client, Pillow and the image variant process pool
+DEFERRED = ["anthropic", "solana", "solders", "PIL", "multiprocessing", "concurrent.futures.process"]
+
+
+def environment() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "profile-startup-secret")
+    return env
+
+
+def import_times() -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every module app.main imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=API_DIR, env=environment(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing app.main failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def report_imports(top: int) -> None:
+    rows = import_times()
+    total = next(cumulative for name, _, cumulative in rows if name == "app.main")
+    print(f"import app.main: {total / 1000:.0f} ms ({len(rows)} modules)")
+
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        packages[name.split(".")[0]] += self_us
+    print(f"\nHeaviest packages (self time, top {top}):")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<28} {self_us / 1000:8.1f} ms")
+
+    app_modules = [(name, cumulative) for name, _, cumulative in rows if name.startswith("app.") and name != "app.main"]
+    print(f"\nSlowest app modules (cumulative, top {top}):")
+    for name, cumulative in sorted(app_modules, key=lambda item: -item[1])[:top]:
+        print(f"  {name:<40} {cumulative / 1000:8.1f} ms")
+
+    loaded = {name for name, _, _ in rows}
+    print("\nDeferred until first use:")
+    for name in DEFERRED:
+        print(f"  {name:<28} {'LOADED AT STARTUP' if name in loaded else 'deferred'}")
+
+
+def report_health(port: int, timeout: float) -> None:
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=API_DIR, env=environment(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                sys.exit(f"uvicorn exited with {server.returncode}:\n{server.stderr.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        print(f"\nFirst successful /health after {time.perf_counter() - start:.2f} s")
+                        return
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.02)
+        print(f"\n/health did not answer within {timeout:.0f} s")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--top", type=int, default=15, help="rows per table")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for /health")
+    parser.add_argument("--skip-server", action="store_true", help="only profile imports")
+    args = parser.parse_args()
+
+    report_imports(args.top)
+    if not args.skip_server:
+        report_health(args.port, args.timeout)
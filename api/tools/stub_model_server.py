@@ -0,0 +1,79 @@
+"""
+Local stub of the Anthropic Messages API for exercising /robots/explore-api
+without calling Claude.
+
+Answers every POST /v1/messages with a fixed control interface wrapped in a
+```json``` block, after an optional artificial latency. GET /stats reports
+how many model calls were made and the peak number served at once, which
+shows the interface config cache and the concurrency limit at work.
+
+Usage:
+    python tools/stub_model_server.py --port 8900 --latency 2
+    ANTHROPIC_BASE_URL=http://localhost:8900 ANTHROPIC_API_KEY=stub uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import uuid
+from fastapi import FastAPI, Request
+
+INTERFACE_CONFIG = {
+    "controls": [
+        {"type": "button", "label": "Forward", "action": "move", "params": {"direction": "forward"}},
+        {"type": "button", "label": "Backward", "action": "move", "params": {"direction": "backward"}},
+        {"type": "slider", "label": "Speed", "action": "set_speed", "min": 0, "max": 100, "default": 50},
+        {"type": "toggle", "label": "Lights", "action": "lights", "default": False},
+    ],
+    "layout": "grid",
+}
+
+app = FastAPI(title="Stub model server")
+app.state.latency = 0.0
+
+_stats = {"calls": 0, "active": 0, "peak_concurrency": 0}
+
+
+@app.post("/v1/messages")
+async def messages(request: Request):
+    body = await request.json()
+    _stats["calls"] += 1
+    _stats["active"] += 1
+    _stats["peak_concurrency"] = max(_stats["peak_concurrency"], _stats["active"])
+    try:
+        await asyncio.sleep(app.state.latency)
+    finally:
+        _stats["active"] -= 1
+
+    return {
+        "id": f"msg_{uuid.uuid4().hex}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", "stub"),
+        "content": [{"type": "text", "text": f"```json\n{json.dumps(INTERFACE_CONFIG, indent=2)}\n```"}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 1, "output_tokens": 1},
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return _stats
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    _stats.update(calls=0, active=0, peak_concurrency=0)
+    return _stats
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per model call")
+    args = parser.parse_args()
+    app.state.latency = args.latency
+    uvicorn.run(app, host=args.host, port=args.port)
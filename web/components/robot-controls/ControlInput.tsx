@@ -0,0 +1,182 @@
+'use client'
+
+import React, { useState } from 'react'
+import { Send } from 'lucide-react'
+
+export interface InputField {
+  name: string
+  label: string
+  input: 'text' | 'number' | 'select' | 'checkbox'
+  required: boolean
+  default?: any
+  min?: number
+  max?: number
+  step?: number
+  options?: any[]
+  unit?: string
+}
+
+interface ControlInputProps {
+  id: string
+  label: string
+  endpoint: string
+  method: string
+  fields: InputField[]
+  params: Record<string, any>
+  apiBaseUrl?: string
+  onExecute?: (result: any) => void
+  disabled?: boolean
+  previewMode?: boolean
+}
+
+const initialValue = (field: InputField) => {
+  if (field.default !== undefined) return field.default
+  if (field.input === 'checkbox') return false
+  if (field.input === 'select') return field.options?.[0] ?? ''
+  return ''
+}
+
+export const ControlInput: React.FC<ControlInputProps> = ({
+  id,
+  label,
+  endpoint,
+  method,
+  fields,
+  params,
+  apiBaseUrl,
+  onExecute,
+  disabled = false,
+  previewMode = false
+}) => {
+  const [values, setValues] = useState<Record<string, any>>(
+    () => Object.fromEntries(fields.map(field => [field.name, initialValue(field)]))
+  )
+  const [loading, setLoading] = useState(false)
+  const [lastResult, setLastResult] = useState<any>(null)
+
+  // Empty optional fields are left out; numbers are sent as numbers
+  const body = () => {
+    const payload: Record<string, any> = { ...params }
+    for (const field of fields) {
+      const value = values[field.name]
+      if (value === '' || value === undefined) continue
+      payload[field.name] = field.input === 'number' ? Number(value) : value
+    }
+    return payload
+  }
+
+  const missing = fields.some(field => field.required && values[field.name] === '')
+
+  const handleSubmit = async (event: React.FormEvent) => {
+    event.preventDefault()
+    if (previewMode || !apiBaseUrl) {
+      console.log('Preview mode - would execute:', { endpoint, method, params: body() })
+      return
+    }
+
+    setLoading(true)
+    try {
+      const url = `${apiBaseUrl}${endpoint}`
+      const response = await fetch(url, {
+        method,
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(body())
+      })
+
+      const result = await response.json()
+      setLastResult(result)
+      onExecute?.(result)
+    } catch (error) {
+      console.error('Error executing input control:', error)
+      setLastResult({ error: String(error) })
+    } finally {
+      setLoading(false)
+    }
+  }
+
+  const inputClass = 'w-full px-2 py-1 rounded bg-black/30 border border-white/20 text-white text-sm'
+
+  return (
+    <form
+      onSubmit={handleSubmit}
+      className={`
+        p-4 rounded-lg border backdrop-blur-sm space-y-2
+        ${previewMode
+          ? 'bg-cyan-500/10 border-cyan-500/30'
+          : 'bg-cyan-500/20 border-cyan-500/40'
+        }
+      `}
+    >
+      <span className="font-medium text-white">{label}</span>
+
+      {fields.map(field => (
+        <label key={field.name} className="block text-xs text-white/70 space-y-1">
+          <span>
+            {field.label}
+            {field.unit && ` (${field.unit})`}
+            {field.required && ' *'}
+          </span>
+          {field.input === 'select' ? (
+            <select
+              value={String(values[field.name])}
+              onChange={e => setValues({
+                ...values,
+                [field.name]: field.options?.find(option => String(option) === e.target.value)
+              })}
+              disabled={disabled}
+              className={inputClass}
+            >
+              {field.options?.map(option => (
+                <option key={String(option)} value={String(option)}>{String(option)}</option>
+              ))}
+            </select>
+          ) : field.input === 'checkbox' ? (
+            <input
+              type="checkbox"
+              checked={Boolean(values[field.name])}
+              onChange={e => setValues({ ...values, [field.name]: e.target.checked })}
+              disabled={disabled}
+              className="ml-2"
+            />
+          ) : (
+            <input
+              type={field.input}
+              value={values[field.name]}
+              min={field.min}
+              max={field.max}
+              step={field.step ?? 'any'}
+              onChange={e => setValues({ ...values, [field.name]: e.target.value })}
+              disabled={disabled}
+              className={inputClass}
+            />
+          )}
+        </label>
+      ))}
+
+      <button
+        type="submit"
+        disabled={disabled || loading || missing || previewMode}
+        className={`
+          w-full p-2 rounded border flex items-center justify-center gap-2
+          bg-cyan-500/20 border-cyan-500/40 hover:bg-cyan-500/30
+          ${disabled || loading || missing ? 'opacity-40 cursor-not-allowed' : ''}
+        `}
+      >
+        <Send className={`w-4 h-4 ${loading ? 'animate-pulse' : ''}`} />
+        <span className="font-medium">Send</span>
+      </button>
+
+      {!previewMode && lastResult && (
+        <div className="text-xs p-2 rounded bg-black/20 border border-white/10">
+          {lastResult.error ? (
+            <span className="text-red-400">❌ {lastResult.error}</span>
+          ) : (
+            <span className="text-green-400">✓ {lastResult.message || 'Success'}</span>
+          )}
+        </div>
+      )}
+    </form>
+  )
+}
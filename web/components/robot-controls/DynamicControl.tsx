@@ -5,10 +5,11 @@ import { ControlButton } from './ControlButton'
 import { ControlSlider } from './ControlSlider'
 import { ControlJoystick } from './ControlJoystick'
 import { ControlToggle } from './ControlToggle'
+import { ControlInput, InputField } from './ControlInput'
 
 export interface Control {
   id: string
-  type: 'button' | 'slider' | 'joystick' | 'toggle'
+  type: 'button' | 'slider' | 'joystick' | 'toggle' | 'input'
   label: string
   endpoint: string
   method: string
@@ -21,6 +22,7 @@ export interface Control {
   axes?: string[]
   range?: Record<string, number[]>
   icon?: string
+  fields?: InputField[]
 }
 
 interface DynamicControlProps {
@@ -121,6 +123,26 @@ export const DynamicControl: React.FC<DynamicControlProps> = ({
         />
       )
 
+    case 'input':
+      if (!control.fields) {
+        console.error('Input control missing required fields:', control)
+        return null
+      }
+      return (
+        <ControlInput
+          id={control.id}
+          label={control.label}
+          endpoint={control.endpoint}
+          method={control.method}
+          fields={control.fields}
+          params={control.params || {}}
+          apiBaseUrl={apiBaseUrl}
+          onExecute={handleExecute}
+          disabled={disabled}
+          previewMode={previewMode}
+        />
+      )
+
     default:
       console.error('Unknown control type:', control.type)
       return null
@@ -23,6 +23,7 @@ export const InterfacePreview: React.FC<InterfacePreviewProps> = ({ config, prev
     slider: config.controls.filter(c => c.type === 'slider'),
     joystick: config.controls.filter(c => c.type === 'joystick'),
     toggle: config.controls.filter(c => c.type === 'toggle'),
+    input: config.controls.filter(c => c.type === 'input'),
   }
 
   return (
@@ -58,6 +59,10 @@ export const InterfacePreview: React.FC<InterfacePreviewProps> = ({ config, prev
                 <div className="w-2 h-2 rounded-full bg-yellow-500"></div>
                 <span className="text-white/60">{controlsByType.toggle.length} Toggles</span>
               </div>
+              <div className="flex items-center gap-2">
+                <div className="w-2 h-2 rounded-full bg-cyan-500"></div>
+                <span className="text-white/60">{controlsByType.input.length} Inputs</span>
+              </div>
             </div>
           </div>
         </div>
@@ -82,13 +82,17 @@ export interface SessionData {
 export interface MySessionsResponse {
   sessions: SessionData[];
   total: number;
+  next_cursor?: string | null;
 }
 
 /**
- * Get all sessions for the current user
+ * Get sessions for the current user, newest first.
+ * Pass `next_cursor` from the previous page as `cursor` to load more.
  */
-export async function getMySessions(status?: string): Promise<MySessionsResponse> {
-  const params = status ? { status } : {};
+export async function getMySessions(status?: string, cursor?: string): Promise<MySessionsResponse> {
+  const params: Record<string, string> = {};
+  if (status) params.status = status;
+  if (cursor) params.cursor = cursor;
   const response = await apiClient.get<MySessionsResponse>('/payments/sessions/my', { params });
   return response.data;
 }